@@ -0,0 +1,34 @@
+"""Add coverage lookup index for eligibility checks
+
+Revision ID: 006_coverage_status_index
+Revises: 005_chat_tables
+Create Date: 2025-10-24 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_coverage_status_index'
+down_revision = '005_chat_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves "latest active coverage for a patient" lookups; inactive
+    # policies never match the eligibility query, so they are left out
+    op.create_index(
+        'coverage_patient_active_effective_idx',
+        'coverage',
+        ['patient_id', sa.text('effective_date DESC')],
+        postgresql_where=sa.text('active')
+    )
+    
+    print("✅ Created coverage lookup index")
+
+
+def downgrade() -> None:
+    op.drop_index('coverage_patient_active_effective_idx', table_name='coverage')
+    
+    print("✅ Dropped coverage lookup index")
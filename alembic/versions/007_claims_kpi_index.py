@@ -0,0 +1,32 @@
+"""Add claims index for KPI range aggregation
+
+Revision ID: 007_claims_kpi_index
+Revises: 006_coverage_status_index
+Create Date: 2025-10-25 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '007_claims_kpi_index'
+down_revision = '006_coverage_status_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves the submission-date range scan (optionally per payer) behind
+    # the analytics KPI aggregation
+    op.create_index(
+        'claims_submission_payer_status_idx',
+        'claims',
+        ['submission_date', 'insurance_company', 'status']
+    )
+    
+    print("✅ Created claims KPI index")
+
+
+def downgrade() -> None:
+    op.drop_index('claims_submission_payer_status_idx', table_name='claims')
+    
+    print("✅ Dropped claims KPI index")
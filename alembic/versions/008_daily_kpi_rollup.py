@@ -0,0 +1,67 @@
+"""Add daily KPI rollup table
+
+Revision ID: 008_daily_kpi_rollup
+Revises: 007_claims_kpi_index
+Create Date: 2025-10-25 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_daily_kpi_rollup'
+down_revision = '007_claims_kpi_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Claim KPI totals per submission day and payer; the analytics KPI
+    # endpoint sums these instead of scanning claims
+    op.create_table(
+        'daily_kpi_rollup',
+        sa.Column('day', sa.Date, nullable=False),
+        sa.Column('payer_id', sa.String(100), nullable=False),
+        sa.Column('charges', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('payments', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('submitted', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('approved', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('denied', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('pending', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('paid', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('collection_days', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('refreshed_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('day', 'payer_id')
+    )
+    
+    # Backfill the full claim history; afterwards the app refreshes only
+    # days with changed claims (same aggregation as
+    # src/api/routes/analytics.py)
+    op.execute("""
+        INSERT INTO daily_kpi_rollup
+            (day, payer_id, charges, payments, submitted, approved, denied, pending,
+             paid, collection_days, refreshed_at)
+        SELECT CAST(submission_date AS DATE),
+               COALESCE(insurance_company, ''),
+               COALESCE(SUM(total_charges), 0),
+               COALESCE(SUM(actual_payment), 0),
+               COUNT(*),
+               COUNT(*) FILTER (WHERE status = 'approved'),
+               COUNT(*) FILTER (WHERE status = 'denied'),
+               COUNT(*) FILTER (WHERE status = 'pending'),
+               COUNT(*) FILTER (WHERE actual_payment > 0),
+               COALESCE(SUM(FLOOR(EXTRACT(EPOCH FROM payment_date - submission_date) / 86400))
+                        FILTER (WHERE actual_payment > 0 AND payment_date IS NOT NULL), 0),
+               NOW() AT TIME ZONE 'UTC'
+        FROM claims
+        WHERE submission_date IS NOT NULL
+        GROUP BY 1, 2
+    """)
+    
+    print("✅ Created and backfilled daily_kpi_rollup table")
+
+
+def downgrade() -> None:
+    op.drop_table('daily_kpi_rollup')
+    
+    print("✅ Dropped daily_kpi_rollup table")
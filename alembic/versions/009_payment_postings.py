@@ -0,0 +1,49 @@
+"""Add payment postings table
+
+Revision ID: 009_payment_postings
+Revises: 008_daily_kpi_rollup
+Create Date: 2025-10-25 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '009_payment_postings'
+down_revision = '008_daily_kpi_rollup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create payment_postings table; ERA postings are bulk loaded with COPY
+    op.create_table(
+        'payment_postings',
+        sa.Column('posting_id', sa.String(64), primary_key=True),
+        sa.Column('era_id', sa.String(50), nullable=True),
+        sa.Column('claim_id', sa.String(50), nullable=False),
+        sa.Column('payment_type', sa.String(20), nullable=False),
+        sa.Column('payment_date', sa.DateTime, nullable=False),
+        sa.Column('payment_amount', sa.Numeric(12, 2), nullable=False),
+        sa.Column('payment_method', sa.String(20), nullable=False),
+        sa.Column('check_number', sa.String(50), nullable=True),
+        sa.Column('adjustments', postgresql.JSON, nullable=True),
+        sa.Column('patient_balance', sa.Numeric(12, 2), nullable=False),
+        sa.Column('insurance_balance', sa.Numeric(12, 2), nullable=False),
+        sa.Column('total_balance', sa.Numeric(12, 2), nullable=False),
+        sa.Column('posted_by', sa.String(100), nullable=False),
+        sa.Column('posted_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+    )
+    
+    # Create indexes for payment_postings
+    op.create_index('idx_payment_postings_claim', 'payment_postings', ['claim_id'])
+    op.create_index('idx_payment_postings_era', 'payment_postings', ['era_id'])
+    
+    print("✅ Created payment_postings table and indexes")
+
+
+def downgrade() -> None:
+    op.drop_table('payment_postings')
+    
+    print("✅ Dropped payment_postings table")
@@ -0,0 +1,38 @@
+"""Add partial claims indexes per status
+
+Revision ID: 010_claims_status_partial_indexes
+Revises: 009_payment_postings
+Create Date: 2025-10-25 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_claims_status_partial_indexes'
+down_revision = '009_payment_postings'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('approved', 'denied', 'pending')
+
+
+def upgrade() -> None:
+    # One small index per status, so per-status counts over a submission
+    # date range are index-only scans instead of a scan of every claim
+    for status in STATUSES:
+        op.create_index(
+            f'claims_{status}_submission_idx',
+            'claims',
+            ['submission_date'],
+            postgresql_where=sa.text(f"status = '{status}'")
+        )
+    
+    print("✅ Created claims status partial indexes")
+
+
+def downgrade() -> None:
+    for status in STATUSES:
+        op.drop_index(f'claims_{status}_submission_idx', table_name='claims')
+    
+    print("✅ Dropped claims status partial indexes")
@@ -0,0 +1,44 @@
+"""Add trigram indexes for medical code search
+
+Revision ID: 011_code_search_indexes
+Revises: 010_claims_status_partial_indexes
+Create Date: 2025-10-26 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '011_code_search_indexes'
+down_revision = '010_claims_status_partial_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Descriptions are matched through the existing to_tsvector GIN indexes;
+    # these serve the substring match on the code itself
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    
+    op.create_index(
+        'idx_icd10_code_trgm',
+        'icd10_codes',
+        ['code'],
+        postgresql_using='gin',
+        postgresql_ops={'code': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'idx_cpt_code_trgm',
+        'cpt_codes',
+        ['code'],
+        postgresql_using='gin',
+        postgresql_ops={'code': 'gin_trgm_ops'}
+    )
+    
+    print("✅ Created medical code trigram indexes")
+
+
+def downgrade() -> None:
+    op.drop_index('idx_cpt_code_trgm', table_name='cpt_codes')
+    op.drop_index('idx_icd10_code_trgm', table_name='icd10_codes')
+    
+    print("✅ Dropped medical code trigram indexes")
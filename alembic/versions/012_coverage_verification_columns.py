@@ -0,0 +1,33 @@
+"""Add subscriber and verification columns to coverage
+
+Revision ID: 012_coverage_verification_columns
+Revises: 011_code_search_indexes
+Create Date: 2025-10-27 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012_coverage_verification_columns'
+down_revision = '011_code_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Member ID shown with eligibility results, and the outcome of the last
+    # HCX eligibility check written by flush_verifications
+    op.add_column('coverage', sa.Column('subscriber_id', sa.String(100), nullable=True))
+    op.add_column('coverage', sa.Column('last_verified', sa.DateTime(), nullable=True))
+    op.add_column('coverage', sa.Column('verification_status', sa.String(50), nullable=True))
+    
+    print("✅ Added coverage verification columns")
+
+
+def downgrade() -> None:
+    op.drop_column('coverage', 'verification_status')
+    op.drop_column('coverage', 'last_verified')
+    op.drop_column('coverage', 'subscriber_id')
+    
+    print("✅ Dropped coverage verification columns")
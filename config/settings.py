@@ -145,6 +145,11 @@ class Settings(BaseSettings):
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         )
     
+    @property
+    def async_database_url(self) -> str:
+        """Construct asyncpg database URL for AsyncEngine"""
+        return self.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    
     @property
     def redis_url(self) -> str:
         """Construct Redis URL"""
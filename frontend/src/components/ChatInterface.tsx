@@ -30,6 +30,9 @@ import { apiService } from '@/services/api.service'
 import { useChatStore } from '@/store/chat.store'
 import { Message } from '@/types/chat.types'
 
+const wait = (ms: number): Promise<void> =>
+  ms > 0 ? new Promise((resolve) => setTimeout(resolve, ms)) : Promise.resolve()
+
 export const ChatInterface: React.FC = () => {
   const [inputValue, setInputValue] = useState('')
   const [isRecording, setIsRecording] = useState(false)
@@ -39,6 +42,11 @@ export const ChatInterface: React.FC = () => {
 
   const messagesEndRef = useRef<HTMLDivElement>(null)
 
+  // Incoming messages are shown in arrival order. The server sends an
+  // agent's replies together, each with a display_delay_ms to wait after
+  // the previous one, so multi-message replies appear one at a time.
+  const displayQueue = useRef<Promise<void>>(Promise.resolve())
+
   const {
     messages,
     isConnected,
@@ -60,12 +68,16 @@ export const ChatInterface: React.FC = () => {
         websocketService.onMessage((message: Message) => {
           console.log('📨 New message:', message)
           
-          if (message.type === 'typing') {
-            setIsTyping(message.is_typing || false, message.agent_name)
-          } else {
-            addMessage(message)
-            setIsTyping(false)
-          }
+          displayQueue.current = displayQueue.current
+            .then(() => wait(message.display_delay_ms ?? 0))
+            .then(() => {
+              if (message.type === 'typing') {
+                setIsTyping(message.is_typing || false, message.agent_name)
+              } else {
+                addMessage(message)
+                setIsTyping(false)
+              }
+            })
         })
 
         websocketService.onConnect(() => {
@@ -14,6 +14,7 @@ export interface Message {
   actions?: Action[]
   attachments?: Attachment[]
   workflow_id?: string
+  display_delay_ms?: number
   timestamp: string
   is_typing?: boolean
 }
@@ -5,10 +5,47 @@ Validates Denial Management, Payment Posting, Analytics, and Medical Codes
 """
 import sys
 import os
+import importlib
+import importlib.util
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# (label, module, public names) checked by the import probes
+IMPORT_PROBES = [
+    ("Denial Management Agent", "src.agents.denial_management",
+     ("DenialManagementAgent", "DenialAnalysisTool", "AppealGeneratorTool")),
+    ("Payment Posting Agent", "src.agents.payment_posting",
+     ("PaymentPostingAgent", "ERAProcessorTool", "PaymentPostingTool")),
+    ("Analytics Dashboard", "src.api.routes.analytics",
+     ("router", "KPIMetrics", "PayerPerformance")),
+    ("Medical Code Models", "src.models.medical_codes",
+     ("ICD10Code", "CPTCode", "MedicalNecessityRule", "DenialCode", "PaymentCode")),
+    ("Enhanced Medical Tools", "src.tools.enhanced_medical_tools",
+     ("EnhancedICD10LookupTool", "EnhancedCPTLookupTool",
+      "EnhancedMedicalNecessityTool", "ChargeCalculatorTool")),
+    ("Medical Code Service", "src.services.medical_codes",
+     ("MedicalCodeService",)),
+]
+
+
+def probe(module_name, names):
+    """
+    Check that a module is importable and exposes the given names
+    
+    find_spec() is a cheap path lookup, so a missing module is reported
+    without executing it; only reachable modules are actually imported.
+    
+    Returns:
+        (ok, missing) where missing is "not found" or a list of absent names
+    """
+    if importlib.util.find_spec(module_name) is None:
+        return False, "not found"
+    module = importlib.import_module(module_name)
+    missing = [name for name in names if not hasattr(module, name)]
+    return not missing, missing
+
+
 def validate_phase3():
     """Validate Phase 3 implementation"""
     print("🏥 HEALTHCARE RCM SYSTEM - PHASE 3 VALIDATION")
@@ -19,102 +56,22 @@ def validate_phase3():
     tests_passed = 0
     tests_failed = 0
     
-    # Test 1: Denial Management Agent
-    print("=" * 60)
-    print("TEST 1: Denial Management Agent")
-    print("=" * 60)
-    try:
-        from src.agents.denial_management import (
-            DenialManagementAgent,
-            DenialAnalysisTool,
-            AppealGeneratorTool
-        )
-        print("✅ Denial Management Agent: Imported successfully")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Denial Management Agent: Import failed - {e}")
-        tests_failed += 1
-    print("")
-    
-    # Test 2: Payment Posting Agent
-    print("=" * 60)
-    print("TEST 2: Payment Posting Agent")
-    print("=" * 60)
-    try:
-        from src.agents.payment_posting import (
-            PaymentPostingAgent,
-            ERAProcessorTool,
-            PaymentPostingTool
-        )
-        print("✅ Payment Posting Agent: Imported successfully")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Payment Posting Agent: Import failed - {e}")
-        tests_failed += 1
-    print("")
-    
-    # Test 3: Analytics Dashboard
-    print("=" * 60)
-    print("TEST 3: Analytics Dashboard")
-    print("=" * 60)
-    try:
-        from src.api.routes.analytics import router, KPIMetrics, PayerPerformance
-        print("✅ Analytics Dashboard: Imported successfully")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Analytics Dashboard: Import failed - {e}")
-        tests_failed += 1
-    print("")
-    
-    # Test 4: Medical Code Models
-    print("=" * 60)
-    print("TEST 4: Medical Code Models")
-    print("=" * 60)
-    try:
-        from src.models.medical_codes import (
-            ICD10Code,
-            CPTCode,
-            MedicalNecessityRule,
-            DenialCode,
-            PaymentCode
-        )
-        print("✅ Medical Code Models: Imported successfully")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Medical Code Models: Import failed - {e}")
-        tests_failed += 1
-    print("")
-    
-    # Test 5: Enhanced Medical Tools
-    print("=" * 60)
-    print("TEST 5: Enhanced Medical Tools")
-    print("=" * 60)
-    try:
-        from src.tools.enhanced_medical_tools import (
-            EnhancedICD10LookupTool,
-            EnhancedCPTLookupTool,
-            EnhancedMedicalNecessityTool,
-            ChargeCalculatorTool
-        )
-        print("✅ Enhanced Medical Tools: Imported successfully")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Enhanced Medical Tools: Import failed - {e}")
-        tests_failed += 1
-    print("")
-    
-    # Test 6: Medical Code Service
-    print("=" * 60)
-    print("TEST 6: Medical Code Service")
-    print("=" * 60)
-    try:
-        from src.services.medical_codes import MedicalCodeService
-        print("✅ Medical Code Service: Imported successfully")
-        tests_passed += 1
-    except Exception as e:
-        print(f"❌ Medical Code Service: Import failed - {e}")
-        tests_failed += 1
-    print("")
+    for number, (label, module_name, names) in enumerate(IMPORT_PROBES, 1):
+        print("=" * 60)
+        print(f"TEST {number}: {label}")
+        print("=" * 60)
+        try:
+            ok, missing = probe(module_name, names)
+            if ok:
+                print(f"✅ {label}: Imported successfully")
+                tests_passed += 1
+            else:
+                print(f"❌ {label}: Import failed - missing {missing}")
+                tests_failed += 1
+        except Exception as e:
+            print(f"❌ {label}: Import failed - {e}")
+            tests_failed += 1
+        print("")
     
     # Test 7: Phase 3 README
     print("=" * 60)
@@ -3,6 +3,7 @@ Claim Submission Agent
 Handles claim creation, validation, and submission to HCX
 """
 
+import functools
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime, date
@@ -10,7 +11,7 @@ import uuid
 
 from praisonai_agents import Agent, Task
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from src.models.claim import Claim, ClaimItem, ClaimDiagnosis
 from src.models.patient import Patient
@@ -21,6 +22,26 @@ from fhir.resources.claim import Claim as FHIRClaim
 
 logger = logging.getLogger(__name__)
 
+_BACKSTORY = (
+    "You are an expert medical biller with 20+ years of experience "
+    "in claim submission and adjudication. You understand payer requirements, "
+    "coding rules, and common rejection reasons. You ensure every claim is "
+    "complete, accurate, and compliant before submission."
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_claims_agent() -> Agent:
+    """Build the PraisonAI claims agent once and share it across instances"""
+    return Agent(
+        name="Claims Specialist",
+        role="Medical Claims Expert",
+        goal="Create accurate claims and submit them successfully to payers via HCX",
+        backstory=_BACKSTORY,
+        verbose=True,
+        allow_delegation=False
+    )
+
 
 class ClaimSubmissionAgent:
     """
@@ -44,18 +65,8 @@ class ClaimSubmissionAgent:
         self.hcx_client = HCXClient()
         self.hcx_submit_tool = HCXClaimSubmitTool()
         
-        # Initialize PraisonAI agent
-        self.agent = Agent(
-            name="Claims Specialist",
-            role="Medical Claims Expert",
-            goal="Create accurate claims and submit them successfully to payers via HCX",
-            backstory="""You are an expert medical biller with 20+ years of experience 
-            in claim submission and adjudication. You understand payer requirements, 
-            coding rules, and common rejection reasons. You ensure every claim is 
-            complete, accurate, and compliant before submission.""",
-            verbose=True,
-            allow_delegation=False
-        )
+        # Shared PraisonAI agent
+        self.agent = _get_claims_agent()
     
     async def create_claim(
         self,
@@ -127,11 +138,12 @@ class ClaimSubmissionAgent:
             
             db_session.add(claim)
             await db_session.flush()
+            claim_id = claim.id
             
             # Add diagnoses
             for idx, diag in enumerate(diagnoses, 1):
                 diagnosis = ClaimDiagnosis(
-                    claim_id=claim.id,
+                    claim_id=claim_id,
                     diagnosis_code=diag['code'],
                     diagnosis_type=diag.get('type', 'primary' if idx == 1 else 'secondary'),
                     sequence=idx
@@ -141,23 +153,24 @@ class ClaimSubmissionAgent:
             # Add items
             for idx, item_data in enumerate(items, 1):
                 item = ClaimItem(
-                    claim_id=claim.id,
+                    claim_id=claim_id,
                     sequence=idx,
                     procedure_code=item_data['procedure_code'],
                     procedure_description=item_data.get('description', ''),
                     service_date=service_date,
                     quantity=item_data.get('quantity', 1),
-                    unit_price=item_data.get('unit_price', 0),
-                    total_price=item_data.get('unit_price', 0) * item_data.get('quantity', 1)
+                    unit_price=item_data.get('unit_price', 0)
                 )
                 db_session.add(item)
             
+            # Everything reported below is captured before the commit expires
+            # the instances, so the committed claim is not reloaded
+            patient_name = f"{patient.first_name} {patient.last_name}"
             await db_session.commit()
-            await db_session.refresh(claim)
             
             message = f"✅ **Claim Created Successfully!**\n\n"
             message += f"**Claim Number:** {claim_number}\n"
-            message += f"**Patient:** {patient.first_name} {patient.last_name}\n"
+            message += f"**Patient:** {patient_name}\n"
             message += f"**Service Date:** {service_date.strftime('%Y-%m-%d')}\n"
             message += f"**Diagnoses:** {len(diagnoses)}\n"
             message += f"**Items:** {len(items)}\n"
@@ -171,7 +184,7 @@ class ClaimSubmissionAgent:
             return {
                 'success': True,
                 'message': message,
-                'claim_id': claim.id,
+                'claim_id': claim_id,
                 'claim_number': claim_number,
                 'total_charge': total_charge
             }
@@ -319,6 +332,7 @@ class ClaimSubmissionAgent:
         """
         logger.info(f"🚀 Submitting claim {claim_id} to HCX")
         
+        in_flight = False
         try:
             # Validate first
             validation = await self.validate_claim(claim_id, db_session)
@@ -330,22 +344,31 @@ class ClaimSubmissionAgent:
             
             # Get claim
             claim = await db_session.get(Claim, claim_id)
+            claim_number = claim.claim_number
             
-            # Submit using HCX tool
-            result = await self.hcx_submit_tool.submit_claim(
-                claim_id=claim_id,
-                db_session=db_session
-            )
+            # Mark the claim as in flight before it reaches HCX, so a claim
+            # HCX has seen is never left without a status row
+            claim.status = 'submitting'
+            await db_session.commit()
+            in_flight = True
+            
+            result = await self.hcx_submit_tool.submit_claim(claim_id=claim_id)
             
             if result.get('success'):
                 # Update claim status
-                claim.status = 'submitted'
-                claim.submission_date = datetime.utcnow()
-                claim.hcx_claim_id = result.get('hcx_claim_id')
+                await db_session.execute(
+                    update(Claim)
+                    .where(Claim.id == claim_id)
+                    .values(
+                        status='submitted',
+                        submission_date=datetime.utcnow(),
+                        hcx_claim_id=result.get('hcx_claim_id')
+                    )
+                )
                 await db_session.commit()
                 
                 message = f"✅ **Claim Submitted Successfully!**\n\n"
-                message += f"**Claim Number:** {claim.claim_number}\n"
+                message += f"**Claim Number:** {claim_number}\n"
                 message += f"**HCX Claim ID:** {result.get('hcx_claim_id')}\n"
                 message += f"**Submission Time:** {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}\n"
                 message += f"**Status:** Submitted\n\n"
@@ -362,7 +385,11 @@ class ClaimSubmissionAgent:
                 }
             else:
                 # Update status to failed
-                claim.status = 'submission_failed'
+                await db_session.execute(
+                    update(Claim)
+                    .where(Claim.id == claim_id)
+                    .values(status='submission_failed')
+                )
                 await db_session.commit()
                 
                 return {
@@ -372,11 +399,26 @@ class ClaimSubmissionAgent:
         
         except Exception as e:
             logger.error(f"❌ HCX submission failed: {e}", exc_info=True)
+            if in_flight:
+                await self._mark_submission_failed(claim_id, db_session)
             return {
                 'success': False,
                 'message': f"Error submitting to HCX: {str(e)}"
             }
     
+    async def _mark_submission_failed(self, claim_id: str, db_session: AsyncSession) -> None:
+        """Move a claim left 'submitting' by an error to 'submission_failed'"""
+        try:
+            await db_session.rollback()
+            await db_session.execute(
+                update(Claim)
+                .where(Claim.id == claim_id)
+                .values(status='submission_failed')
+            )
+            await db_session.commit()
+        except Exception as e:
+            logger.error(f"❌ Could not mark claim {claim_id} as submission_failed: {e}")
+    
     async def get_claim_status(
         self,
         claim_id: str,
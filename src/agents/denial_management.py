@@ -2,29 +2,91 @@
 Denial Management Agent
 Analyzes denied claims, categorizes denial reasons, and generates appeals
 """
-from praisonaiagents import Agent, Task, Tool
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
-from pydantic import BaseModel, Field
+from typing import TYPE_CHECKING, Dict, Any, List, Mapping, Optional, Tuple
+from types import MappingProxyType
+from enum import IntEnum
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from datetime import date, datetime, timedelta
+from pydantic import BaseModel, ConfigDict, Field
+import csv
+import functools
 import json
 import logging
+import string
+import sys
+import time
+
+if TYPE_CHECKING:
+    from praisonaiagents import Agent
+
+try:
+    from praisonaiagents import Tool
+except ImportError:
+    class Tool:
+        """Minimal stand-in so the tools can score denials without praisonaiagents"""
+        name = ""
+        description = ""
+        
+        def __init__(self, *args, **kwargs):
+            pass
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 
 # ===== Data Models =====
 
-class DenialCategory(str):
-    """Denial reason categories"""
-    MISSING_INFO = "missing_information"
-    AUTH_REQUIRED = "authorization_required"
-    NOT_COVERED = "service_not_covered"
-    CODING_ERROR = "coding_error"
-    TIMELY_FILING = "timely_filing"
-    DUPLICATE = "duplicate_claim"
-    MEDICAL_NECESSITY = "medical_necessity"
-    ELIGIBILITY = "eligibility_issue"
-    OTHER = "other"
+class DenialCategory(IntEnum):
+    """
+    Denial reason categories
+    
+    Members index the per-category lookup tuples directly; the wire names
+    used in JSON are in _CATEGORY_STR.
+    """
+    MISSING_INFO = 0
+    AUTH_REQUIRED = 1
+    NOT_COVERED = 2
+    CODING_ERROR = 3
+    TIMELY_FILING = 4
+    DUPLICATE = 5
+    MEDICAL_NECESSITY = 6
+    ELIGIBILITY = 7
+    OTHER = 8
+
+
+# JSON names of the categories, in DenialCategory order
+_CATEGORY_STR = (
+    "missing_information",
+    "authorization_required",
+    "service_not_covered",
+    "coding_error",
+    "timely_filing",
+    "duplicate_claim",
+    "medical_necessity",
+    "eligibility_issue",
+    "other",
+)
+
+# Incoming JSON category name -> DenialCategory
+_CATEGORY_BY_STR = {name: DenialCategory(index) for index, name in enumerate(_CATEGORY_STR)}
 
 
 class DenialAnalysis(BaseModel):
@@ -42,12 +104,35 @@ class DenialAnalysis(BaseModel):
     estimated_recovery_amount: float
     priority: str  # high, medium, low
     
-    class Config:
-        use_enum_values = True
+    model_config = ConfigDict(use_enum_values=True, frozen=True)
+
+
+@dataclass(slots=True, frozen=True)
+class DenialAnalysisRecord:
+    """
+    Unvalidated twin of DenialAnalysis used on the tool hot path
+    
+    The tool builds every field itself, so it skips Pydantic validation;
+    DenialAnalysis remains the model for validating external input.
+    """
+    claim_id: str
+    denial_code: str
+    denial_reason: str
+    category: str
+    root_cause: str
+    correctable: bool
+    appeal_recommended: bool
+    appeal_success_probability: float
+    required_actions: List[str]
+    required_documentation: List[str]
+    estimated_recovery_amount: float
+    priority: str  # high, medium, low
 
 
 class AppealLetter(BaseModel):
     """Generated appeal letter"""
+    model_config = ConfigDict(frozen=True)
+    
     claim_id: str
     appeal_type: str  # reconsideration, redetermination, appeal
     recipient_name: str
@@ -61,6 +146,8 @@ class AppealLetter(BaseModel):
 
 class DenialMetrics(BaseModel):
     """Denial management metrics"""
+    model_config = ConfigDict(frozen=True)
+    
     total_denials: int
     appeals_submitted: int
     appeals_won: int
@@ -73,6 +160,448 @@ class DenialMetrics(BaseModel):
     avg_appeal_turnaround_days: float
 
 
+# ===== Reference Data =====
+
+def _frozen(mapping: Dict[str, Any]) -> Mapping[str, Any]:
+    """Read-only view of a lookup table with interned keys"""
+    return MappingProxyType({sys.intern(key): value for key, value in mapping.items()})
+
+
+# Standard denial codes and their meanings, shared by every tool instance
+_DENIAL_CODES: Mapping[str, Dict[str, Any]] = _frozen({
+    # Common CARC (Claim Adjustment Reason Codes)
+    "16": {
+        "description": "Claim/service lacks information needed for adjudication",
+        "category": DenialCategory.MISSING_INFO,
+        "correctable": True,
+        "common_fix": "Submit additional documentation"
+    },
+    "18": {
+        "description": "Duplicate claim/service",
+        "category": DenialCategory.DUPLICATE,
+        "correctable": False,
+        "common_fix": "Verify not duplicate, provide proof if error"
+    },
+    "29": {
+        "description": "Time limit for filing has expired",
+        "category": DenialCategory.TIMELY_FILING,
+        "correctable": False,
+        "common_fix": "Document extenuating circumstances"
+    },
+    "50": {
+        "description": "Non-covered service",
+        "category": DenialCategory.NOT_COVERED,
+        "correctable": False,
+        "common_fix": "Appeal with medical necessity justification"
+    },
+    "96": {
+        "description": "Non-covered charge(s)",
+        "category": DenialCategory.NOT_COVERED,
+        "correctable": False,
+        "common_fix": "Provide coverage policy exception"
+    },
+    "109": {
+        "description": "Claim/service not covered by this payer",
+        "category": DenialCategory.ELIGIBILITY,
+        "correctable": True,
+        "common_fix": "Verify patient eligibility at service date"
+    },
+    "197": {
+        "description": "Precertification/authorization absent",
+        "category": DenialCategory.AUTH_REQUIRED,
+        "correctable": True,
+        "common_fix": "Submit retroactive authorization"
+    },
+    "4": {
+        "description": "Procedure code inconsistent with modifier",
+        "category": DenialCategory.CODING_ERROR,
+        "correctable": True,
+        "common_fix": "Correct coding and resubmit"
+    }
+})
+
+# Payer-specific appeal guidelines
+_APPEAL_GUIDELINES: Mapping[str, Dict[str, Any]] = _frozen({
+    "allianz_egypt": {
+        "first_level": "reconsideration",
+        "deadline_days": 30,
+        "submission_method": "electronic",
+        "required_docs": ("appeal_letter", "clinical_notes", "medical_records")
+    },
+    "metlife_egypt": {
+        "first_level": "reconsideration",
+        "deadline_days": 60,
+        "submission_method": "portal",
+        "required_docs": ("appeal_letter", "supporting_documentation")
+    },
+    "axa_egypt": {
+        "first_level": "appeal",
+        "deadline_days": 45,
+        "submission_method": "email",
+        "required_docs": ("appeal_letter", "medical_justification")
+    },
+    "hio_egypt": {
+        "first_level": "administrative_review",
+        "deadline_days": 90,
+        "submission_method": "paper",
+        "required_docs": ("official_appeal_form", "medical_records", "physician_statement")
+    }
+})
+# Used for payers without specific guidelines; contributes no documents
+_EMPTY_GUIDELINES: Mapping[str, Any] = MappingProxyType({
+    "deadline_days": 30,
+    "submission_method": "appropriate channel",
+    "required_docs": ()
+})
+
+# Root cause for common denial codes
+_ROOT_CAUSE_BY_CODE: Mapping[str, str] = _frozen({
+    "16": "Missing or incomplete documentation at time of service",
+    "197": "Missing or incomplete documentation at time of service",
+    "18": "Duplicate submission or billing error",
+    "29": "Claim submitted after payer's filing deadline",
+    "4": "Incorrect coding or modifier usage",
+    "50": "Service not covered under patient's plan",
+    "96": "Service not covered under patient's plan",
+    "109": "Patient not eligible for coverage on service date",
+})
+
+# Documentation required for every appeal, plus per-category additions
+_BASE_DOCS = ("appeal_letter", "original_claim")
+
+# Indexed by DenialCategory
+_CATEGORY_DOCS: Tuple[Tuple[str, ...], ...] = (
+    ("complete_medical_records", "lab_results", "imaging_reports"),  # MISSING_INFO
+    ("clinical_notes", "physician_order", "medical_justification"),  # AUTH_REQUIRED
+    ("coverage_policy", "exception_justification"),  # NOT_COVERED
+    ("corrected_claim", "coding_rationale"),  # CODING_ERROR
+    (),  # TIMELY_FILING
+    (),  # DUPLICATE
+    ("physician_statement", "clinical_guidelines", "peer_reviewed_literature"),  # MEDICAL_NECESSITY
+    ("eligibility_verification", "insurance_card_copy"),  # ELIGIBILITY
+    (),  # OTHER
+)
+
+# Historical appeal success rate, indexed by DenialCategory
+_BASE_SUCCESS_RATE: Tuple[float, ...] = (
+    0.85,  # MISSING_INFO
+    0.70,  # AUTH_REQUIRED
+    0.30,  # NOT_COVERED
+    0.80,  # CODING_ERROR
+    0.20,  # TIMELY_FILING
+    0.40,  # DUPLICATE
+    0.60,  # MEDICAL_NECESSITY
+    0.65,  # ELIGIBILITY
+    0.50,  # OTHER
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _viability_core(
+    category: DenialCategory,
+    amount_bucket: int,
+    correctable: bool,
+    high_value: bool
+) -> Tuple[bool, float]:
+    """
+    Appeal recommendation and success probability for a denial
+    
+    Pure in its arguments, so batches of similar denials share results.
+    amount_bucket is 0 below 1000 EGP, 2 above 10000 EGP and 1 otherwise;
+    high_value means the claim is above 5000 EGP.
+    """
+    success_probability = _BASE_SUCCESS_RATE[category]
+    
+    # Adjust for claim amount (higher amounts worth more effort)
+    if amount_bucket == 2:
+        success_probability *= 1.1
+    elif amount_bucket == 0:
+        success_probability *= 0.9
+    
+    # Cap at 0.95
+    success_probability = min(success_probability, 0.95)
+    
+    # Recommend appeal if:
+    # 1. Correctable AND
+    # 2. Success probability > 50% OR claim amount > 5000 EGP
+    recommend = correctable and (success_probability > 0.5 or high_value)
+    
+    return recommend, success_probability
+
+
+if NUMPY_AVAILABLE:
+    _BASE_SUCCESS_RATE_ARR = np.array(_BASE_SUCCESS_RATE, dtype=np.float64)
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True)
+    def _batch_core(categories, amounts, correctable, rates):
+        """Compiled, parallel version of the batch_assess NumPy expressions"""
+        n = categories.shape[0]
+        recommend = np.empty(n, dtype=np.bool_)
+        success_probability = np.empty(n, dtype=np.float64)
+        for i in prange(n):
+            amount = amounts[i]
+            probability = rates[categories[i]]
+            if amount > 10000:
+                probability *= 1.1
+            elif amount < 1000:
+                probability *= 0.9
+            probability = min(probability, 0.95)
+            success_probability[i] = probability
+            recommend[i] = correctable[i] and (probability > 0.5 or amount > 5000)
+        return recommend, success_probability
+
+
+def batch_assess(
+    categories: Any,
+    amounts: Any,
+    correctable: Any
+) -> Tuple[Any, Any]:
+    """
+    Vectorized _viability_core over a worklist of denials
+    
+    Args:
+        categories: DenialCategory values, one per denial
+        amounts: Claim amounts
+        correctable: Whether each denial is correctable
+    
+    Returns:
+        (recommend, success_probability) arrays, or lists when NumPy is
+        not installed
+    """
+    if not NUMPY_AVAILABLE:
+        results = [
+            _viability_core(DenialCategory(category), _amount_bucket(amount), bool(fixable), amount > 5000)
+            for category, amount, fixable in zip(categories, amounts, correctable)
+        ]
+        return [r[0] for r in results], [r[1] for r in results]
+    
+    categories = np.asarray(categories, dtype=np.int8)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    correctable = np.asarray(correctable, dtype=bool)
+    
+    if NUMBA_AVAILABLE:
+        return _batch_core(categories, amounts, correctable, _BASE_SUCCESS_RATE_ARR)
+    
+    success_probability = np.take(_BASE_SUCCESS_RATE_ARR, categories)
+    success_probability *= np.where(amounts > 10000, 1.1, np.where(amounts < 1000, 0.9, 1.0))
+    np.minimum(success_probability, 0.95, out=success_probability)
+    
+    recommend = correctable & ((success_probability > 0.5) | (amounts > 5000))
+    return recommend, success_probability
+
+
+def _amount_bucket(claim_amount: float) -> int:
+    """Bucket a claim amount by the thresholds the viability assessment uses"""
+    if claim_amount > 10000:
+        return 2
+    if claim_amount < 1000:
+        return 0
+    return 1
+
+
+_NOT_RECOMMENDED_ACTIONS = (
+    "Close denial - appeal not recommended",
+    "Analyze for process improvement"
+)
+
+
+_DEFAULT_ACTIONS = ("Prepare comprehensive appeal with all supporting documentation",)
+
+# Standard appeal actions, indexed by DenialCategory
+_ACTIONS_BY_CATEGORY: Tuple[Tuple[str, ...], ...] = (
+    (  # MISSING_INFO
+        "Gather missing documentation from medical records",
+        "Request additional information from provider if needed",
+        "Submit appeal with complete documentation"
+    ),
+    (  # AUTH_REQUIRED
+        "Check if retroactive authorization possible",
+        "Gather clinical documentation justifying medical necessity",
+        "Submit retroactive authorization request"
+    ),
+    _DEFAULT_ACTIONS,  # NOT_COVERED
+    (  # CODING_ERROR
+        "Review coding with certified coder",
+        "Correct codes and modifiers",
+        "Resubmit corrected claim"
+    ),
+    _DEFAULT_ACTIONS,  # TIMELY_FILING
+    _DEFAULT_ACTIONS,  # DUPLICATE
+    (  # MEDICAL_NECESSITY
+        "Obtain detailed physician notes and justification",
+        "Review payer's medical policy for service",
+        "Prepare medical necessity appeal with clinical rationale"
+    ),
+    _DEFAULT_ACTIONS,  # ELIGIBILITY
+    _DEFAULT_ACTIONS,  # OTHER
+)
+
+# Base plus category documentation, deduplicated, indexed by DenialCategory
+_DOCS_BY_CATEGORY: Tuple[Tuple[str, ...], ...] = tuple(
+    tuple(dict.fromkeys(_BASE_DOCS + category_docs)) for category_docs in _CATEGORY_DOCS
+)
+
+
+def _category_actions(category: DenialCategory) -> List[str]:
+    """Standard appeal actions for a denial category"""
+    return list(_ACTIONS_BY_CATEGORY[category])
+
+
+def _payer_action(guidelines: Mapping[str, Any]) -> str:
+    """Payer-specific submission action"""
+    return f"Submit appeal within {guidelines['deadline_days']} days via {guidelines['submission_method']}"
+
+
+def _required_docs(category: DenialCategory, guidelines: Mapping[str, Any]) -> List[str]:
+    """Required appeal documentation for a category and payer"""
+    docs = _DOCS_BY_CATEGORY[category]
+    
+    # Add payer-specific docs
+    payer_docs = guidelines["required_docs"]
+    if payer_docs:
+        return list(dict.fromkeys(docs + payer_docs))
+    
+    return list(docs)
+
+
+_CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
+
+def _parse_template(template: str) -> tuple:
+    """Split a str.format template into (literal, field, spec, conversion) parts once"""
+    return tuple(string.Formatter().parse(template))
+
+
+def _fast_format(parsed: tuple, **values: Any) -> str:
+    """Render a template pre-parsed by _parse_template without re-parsing it"""
+    parts = []
+    for literal, field, spec, conversion in parsed:
+        parts.append(literal)
+        if field is not None:
+            value = values[field]
+            if conversion:
+                value = _CONVERSIONS[conversion](value)
+            parts.append(format(value, spec))
+    return "".join(parts)
+
+
+def _bind_template(parsed: tuple, **values: Any) -> tuple:
+    """
+    Partially apply a pre-parsed template
+    
+    Fields present in values are rendered into the surrounding literals;
+    the result is a parsed template with only the remaining fields.
+    """
+    bound = []
+    literal_parts = []
+    for literal, field, spec, conversion in parsed:
+        literal_parts.append(literal)
+        if field is None:
+            continue
+        if field in values:
+            value = values[field]
+            if conversion:
+                value = _CONVERSIONS[conversion](value)
+            literal_parts.append(format(value, spec))
+        else:
+            bound.append(("".join(literal_parts), field, spec, conversion))
+            literal_parts = []
+    if literal_parts:
+        bound.append(("".join(literal_parts), None, None, None))
+    return tuple(bound)
+
+
+# Appeal letter fields that are the same for every letter
+_LETTER_STATIC_FIELDS = {
+    "contact_info": "billing@hospital.com",
+    "applicable_law": "Egyptian Insurance Law",
+    "sender_name": "Billing Director",
+    "sender_title": "Director of Revenue Cycle Management",
+    "organization_name": "Hospital Name",
+    "contact_information": "Phone: +20 xxx | Email: billing@hospital.com",
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _today_cached(epoch_hour: int) -> date:
+    """Today's date, recomputed at most once per wall-clock hour (epoch_hour is the cache key)"""
+    return date.today()
+
+
+_CARC_RARC_CSV = Path(__file__).parent / "data" / "carc_rarc_codes.csv"
+
+# Trie node key holding (denial_info, is_prefix) for codes ending at the node
+_TERMINAL = ""
+
+
+@functools.lru_cache(maxsize=1)
+def _carc_trie() -> Dict[str, Any]:
+    """
+    Build the CARC/RARC code trie from the shipped CSV on first use
+    
+    Each row is either an exact code or a prefix rule (e.g. RARC "N"
+    remarks); terminal nodes carry the denial info for that row.
+    """
+    root: Dict[str, Any] = {}
+    try:
+        with open(_CARC_RARC_CSV, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                node = root
+                for char in row["code"]:
+                    node = node.setdefault(char, {})
+                node[_TERMINAL] = (
+                    {
+                        "description": row["description"],
+                        "category": _CATEGORY_BY_STR[row["category"]],
+                        "correctable": row["correctable"] == "true",
+                        "common_fix": row["common_fix"]
+                    },
+                    row["match"] == "prefix"
+                )
+    except OSError as e:
+        logger.warning(f"CARC/RARC code table not available: {e}")
+    return root
+
+
+def _classify_denial_code(denial_code: str) -> Optional[Dict[str, Any]]:
+    """Exact or longest-prefix match of a denial code against the CARC/RARC trie"""
+    node = _carc_trie()
+    match = None
+    last = len(denial_code) - 1
+    for index, char in enumerate(denial_code):
+        node = node.get(char)
+        if node is None:
+            break
+        entry = node.get(_TERMINAL)
+        if entry is not None and (entry[1] or index == last):
+            match = entry[0]
+    return match
+
+
+# Appeal letter body template, indexed by DenialCategory
+_TEMPLATE_BY_CATEGORY: Tuple[str, ...] = (
+    "missing_info",  # MISSING_INFO
+    "authorization",  # AUTH_REQUIRED
+    "medical_necessity",  # NOT_COVERED
+    "medical_necessity",  # CODING_ERROR
+    "medical_necessity",  # TIMELY_FILING
+    "medical_necessity",  # DUPLICATE
+    "medical_necessity",  # MEDICAL_NECESSITY
+    "medical_necessity",  # ELIGIBILITY
+    "medical_necessity",  # OTHER
+)
+
+
+def _tool_error(context: str, error: Exception) -> Dict[str, Any]:
+    """Log a tool failure and build its error result"""
+    logger.error(f"{context}: {error}", exc_info=True)
+    return {
+        "status": "error",
+        "error": str(error)
+    }
+
+
 # ===== Tools =====
 
 class DenialAnalysisTool(Tool):
@@ -82,171 +611,141 @@ class DenialAnalysisTool(Tool):
     description = """Analyze a denied claim to identify root cause, determine if correctable,
     and recommend appeal strategy. Returns detailed analysis with action items."""
     
+    # Classify codes missing from _DENIAL_CODES with the CARC/RARC trie
+    # instead of treating them all as OTHER
+    use_prefix_classifier = False
+    
     def __init__(self, knowledge_base: Dict[str, Any]):
         super().__init__()
         self.knowledge_base = knowledge_base
-        self.denial_codes = self._load_denial_codes()
-        self.appeal_guidelines = self._load_appeal_guidelines()
+        self.denial_codes = _DENIAL_CODES
+        self.appeal_guidelines = _APPEAL_GUIDELINES
     
-    def _load_denial_codes(self) -> Dict[str, Dict]:
-        """Load standard denial codes and their meanings"""
-        return {
-            # Common CARC (Claim Adjustment Reason Codes)
-            "16": {
-                "description": "Claim/service lacks information needed for adjudication",
-                "category": DenialCategory.MISSING_INFO,
-                "correctable": True,
-                "common_fix": "Submit additional documentation"
-            },
-            "18": {
-                "description": "Duplicate claim/service",
-                "category": DenialCategory.DUPLICATE,
-                "correctable": False,
-                "common_fix": "Verify not duplicate, provide proof if error"
-            },
-            "29": {
-                "description": "Time limit for filing has expired",
-                "category": DenialCategory.TIMELY_FILING,
-                "correctable": False,
-                "common_fix": "Document extenuating circumstances"
-            },
-            "50": {
-                "description": "Non-covered service",
-                "category": DenialCategory.NOT_COVERED,
-                "correctable": False,
-                "common_fix": "Appeal with medical necessity justification"
-            },
-            "96": {
-                "description": "Non-covered charge(s)",
-                "category": DenialCategory.NOT_COVERED,
-                "correctable": False,
-                "common_fix": "Provide coverage policy exception"
-            },
-            "109": {
-                "description": "Claim/service not covered by this payer",
-                "category": DenialCategory.ELIGIBILITY,
-                "correctable": True,
-                "common_fix": "Verify patient eligibility at service date"
-            },
-            "197": {
-                "description": "Precertification/authorization absent",
-                "category": DenialCategory.AUTH_REQUIRED,
-                "correctable": True,
-                "common_fix": "Submit retroactive authorization"
-            },
-            "4": {
-                "description": "Procedure code inconsistent with modifier",
-                "category": DenialCategory.CODING_ERROR,
-                "correctable": True,
-                "common_fix": "Correct coding and resubmit"
-            }
-        }
-    
-    def _load_appeal_guidelines(self) -> Dict[str, Any]:
-        """Load payer-specific appeal guidelines"""
+    def _run(self, query: str) -> Dict[str, Any]:
+        """Analyze denial"""
+        try:
+            data = _json_loads(query)
+        except ValueError as e:
+            return _tool_error("Denial analysis failed: invalid query", e)
+        
+        try:
+            analysis = self._analyze_fused(data)
+        except (KeyError, TypeError, ValueError) as e:
+            return _tool_error("Denial analysis failed", e)
+        
         return {
-            "allianz_egypt": {
-                "first_level": "reconsideration",
-                "deadline_days": 30,
-                "submission_method": "electronic",
-                "required_docs": ["appeal_letter", "clinical_notes", "medical_records"]
-            },
-            "metlife_egypt": {
-                "first_level": "reconsideration",
-                "deadline_days": 60,
-                "submission_method": "portal",
-                "required_docs": ["appeal_letter", "supporting_documentation"]
-            },
-            "axa_egypt": {
-                "first_level": "appeal",
-                "deadline_days": 45,
-                "submission_method": "email",
-                "required_docs": ["appeal_letter", "medical_justification"]
-            },
-            "hio_egypt": {
-                "first_level": "administrative_review",
-                "deadline_days": 90,
-                "submission_method": "paper",
-                "required_docs": ["official_appeal_form", "medical_records", "physician_statement"]
-            }
+            "status": "success",
+            "analysis": asdict(analysis)
         }
     
-    def _run(self, query: str) -> Dict[str, Any]:
-        """Analyze denial"""
+    def batch_analyze(self, denials: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Analyze a worklist of denials
+        
+        Takes the same per-denial fields as the tool query and computes the
+        appeal viability for the whole batch in one vectorized pass.
+        """
         try:
-            data = json.loads(query)
-            
-            claim_id = data["claim_id"]
-            denial_code = data["denial_code"]
-            denial_reason = data.get("denial_reason", "")
-            claim_amount = float(data.get("claim_amount", 0))
-            payer = data.get("payer", "")
-            service_date = data.get("service_date")
-            
-            # Look up denial code
-            denial_info = self.denial_codes.get(
-                denial_code,
-                {
-                    "description": denial_reason,
-                    "category": DenialCategory.OTHER,
-                    "correctable": True,
-                    "common_fix": "Review and appeal with additional information"
-                }
-            )
-            
-            # Determine root cause
-            root_cause = self._determine_root_cause(
-                denial_code,
-                denial_reason,
-                data.get("claim_data", {})
-            )
-            
-            # Assess appeal viability
-            appeal_assessment = self._assess_appeal_viability(
-                denial_info,
-                claim_amount,
-                service_date
-            )
-            
-            # Generate action items
-            actions = self._generate_actions(
-                denial_info,
-                appeal_assessment,
-                payer
-            )
-            
-            # Determine required documentation
-            required_docs = self._determine_required_docs(
-                denial_info["category"],
-                payer
-            )
-            
-            analysis = DenialAnalysis(
-                claim_id=claim_id,
-                denial_code=denial_code,
-                denial_reason=denial_info["description"],
-                category=denial_info["category"],
-                root_cause=root_cause,
-                correctable=denial_info["correctable"],
-                appeal_recommended=appeal_assessment["recommend"],
-                appeal_success_probability=appeal_assessment["success_probability"],
-                required_actions=actions,
-                required_documentation=required_docs,
-                estimated_recovery_amount=claim_amount if appeal_assessment["recommend"] else 0,
-                priority=self._determine_priority(claim_amount, appeal_assessment["success_probability"])
+            denial_infos = [
+                self._lookup_denial(data["denial_code"], data.get("denial_reason", ""))
+                for data in denials
+            ]
+            recommend, success_probability = batch_assess(
+                [info["category"] for info in denial_infos],
+                [float(data.get("claim_amount", 0)) for data in denials],
+                [info["correctable"] for info in denial_infos]
             )
             
-            return {
-                "status": "success",
-                "analysis": analysis.dict()
-            }
+            analyses = [
+                asdict(self._analyze_fused(
+                    data,
+                    (bool(recommend[i]), float(success_probability[i]))
+                ))
+                for i, data in enumerate(denials)
+            ]
             
-        except Exception as e:
-            logger.error(f"Denial analysis failed: {e}", exc_info=True)
-            return {
-                "status": "error",
-                "error": str(e)
+        except (KeyError, TypeError, ValueError) as e:
+            return _tool_error("Batch denial analysis failed", e)
+        
+        return {
+            "status": "success",
+            "analyses": analyses
+        }
+    
+    def _lookup_denial(self, denial_code: str, denial_reason: str) -> Dict[str, Any]:
+        """Look up denial code, falling back to a generic correctable denial"""
+        denial_info = self.denial_codes.get(denial_code)
+        if denial_info is None and self.use_prefix_classifier:
+            denial_info = _classify_denial_code(denial_code)
+        if denial_info is None:
+            denial_info = {
+                "description": denial_reason,
+                "category": DenialCategory.OTHER,
+                "correctable": True,
+                "common_fix": "Review and appeal with additional information"
             }
+        return denial_info
+    
+    def _analyze_fused(
+        self,
+        data: Dict[str, Any],
+        viability: Optional[Tuple[bool, float]] = None
+    ) -> DenialAnalysisRecord:
+        """
+        Build the full analysis in one pass
+        
+        Same logic as the _determine_root_cause, _assess_appeal_viability,
+        _generate_actions and _determine_required_docs helpers, but the denial
+        info and payer guidelines are looked up once and shared as locals.
+        viability may carry a precomputed (recommend, success_probability).
+        """
+        denial_code = data["denial_code"]
+        denial_reason = data.get("denial_reason", "")
+        claim_amount = float(data.get("claim_amount", 0))
+        
+        # Look up denial code
+        denial_info = self._lookup_denial(denial_code, denial_reason)
+        category = denial_info["category"]
+        correctable = denial_info["correctable"]
+        guidelines = self.appeal_guidelines.get(data.get("payer", ""), _EMPTY_GUIDELINES)
+        
+        # Determine root cause
+        root_cause = _ROOT_CAUSE_BY_CODE.get(denial_code)
+        if root_cause is None:
+            root_cause = f"Denial code {denial_code}: {denial_reason}"
+        
+        # Assess appeal viability
+        if viability is None:
+            viability = _viability_core(
+                category,
+                _amount_bucket(claim_amount),
+                correctable,
+                claim_amount > 5000
+            )
+        recommend, success_probability = viability
+        
+        # Generate action items
+        if recommend:
+            actions = _category_actions(category)
+            if guidelines is not _EMPTY_GUIDELINES:
+                actions.append(_payer_action(guidelines))
+        else:
+            actions = list(_NOT_RECOMMENDED_ACTIONS)
+        
+        return DenialAnalysisRecord(
+            claim_id=data["claim_id"],
+            denial_code=denial_code,
+            denial_reason=denial_info["description"],
+            category=_CATEGORY_STR[category],
+            root_cause=root_cause,
+            correctable=correctable,
+            appeal_recommended=recommend,
+            appeal_success_probability=success_probability,
+            required_actions=actions,
+            required_documentation=_required_docs(category, guidelines),
+            estimated_recovery_amount=claim_amount if recommend else 0,
+            priority=self._determine_priority(claim_amount, success_probability)
+        )
     
     def _determine_root_cause(
         self,
@@ -255,21 +754,10 @@ class DenialAnalysisTool(Tool):
         claim_data: Dict
     ) -> str:
         """Determine root cause of denial"""
-        # Pattern matching for common root causes
-        if denial_code in ["16", "197"]:
-            return "Missing or incomplete documentation at time of service"
-        elif denial_code in ["18"]:
-            return "Duplicate submission or billing error"
-        elif denial_code in ["29"]:
-            return "Claim submitted after payer's filing deadline"
-        elif denial_code in ["4"]:
-            return "Incorrect coding or modifier usage"
-        elif denial_code in ["50", "96"]:
-            return "Service not covered under patient's plan"
-        elif denial_code in ["109"]:
-            return "Patient not eligible for coverage on service date"
-        else:
+        root_cause = _ROOT_CAUSE_BY_CODE.get(denial_code)
+        if root_cause is None:
             return f"Denial code {denial_code}: {denial_reason}"
+        return root_cause
     
     def _assess_appeal_viability(
         self,
@@ -278,36 +766,11 @@ class DenialAnalysisTool(Tool):
         service_date: Optional[str]
     ) -> Dict[str, Any]:
         """Assess whether appeal is worth pursuing"""
-        base_success_rate = {
-            DenialCategory.MISSING_INFO: 0.85,
-            DenialCategory.AUTH_REQUIRED: 0.70,
-            DenialCategory.CODING_ERROR: 0.80,
-            DenialCategory.MEDICAL_NECESSITY: 0.60,
-            DenialCategory.NOT_COVERED: 0.30,
-            DenialCategory.TIMELY_FILING: 0.20,
-            DenialCategory.DUPLICATE: 0.40,
-            DenialCategory.ELIGIBILITY: 0.65,
-            DenialCategory.OTHER: 0.50
-        }
-        
-        category = denial_info["category"]
-        success_probability = base_success_rate.get(category, 0.50)
-        
-        # Adjust for claim amount (higher amounts worth more effort)
-        if claim_amount > 10000:
-            success_probability *= 1.1
-        elif claim_amount < 1000:
-            success_probability *= 0.9
-        
-        # Cap at 0.95
-        success_probability = min(success_probability, 0.95)
-        
-        # Recommend appeal if:
-        # 1. Correctable AND
-        # 2. Success probability > 50% OR claim amount > 5000 EGP
-        recommend = (
-            denial_info["correctable"] and
-            (success_probability > 0.5 or claim_amount > 5000)
+        recommend, success_probability = _viability_core(
+            denial_info["category"],
+            _amount_bucket(claim_amount),
+            denial_info["correctable"],
+            claim_amount > 5000
         )
         
         return {
@@ -323,72 +786,21 @@ class DenialAnalysisTool(Tool):
         payer: str
     ) -> List[str]:
         """Generate required actions"""
-        actions = []
-        
         if not appeal_assessment["recommend"]:
-            actions.append("Close denial - appeal not recommended")
-            actions.append("Analyze for process improvement")
-            return actions
+            return list(_NOT_RECOMMENDED_ACTIONS)
         
-        # Standard actions based on category
-        category = denial_info["category"]
-        
-        if category == DenialCategory.MISSING_INFO:
-            actions.extend([
-                "Gather missing documentation from medical records",
-                "Request additional information from provider if needed",
-                "Submit appeal with complete documentation"
-            ])
-        elif category == DenialCategory.AUTH_REQUIRED:
-            actions.extend([
-                "Check if retroactive authorization possible",
-                "Gather clinical documentation justifying medical necessity",
-                "Submit retroactive authorization request"
-            ])
-        elif category == DenialCategory.CODING_ERROR:
-            actions.extend([
-                "Review coding with certified coder",
-                "Correct codes and modifiers",
-                "Resubmit corrected claim"
-            ])
-        elif category == DenialCategory.MEDICAL_NECESSITY:
-            actions.extend([
-                "Obtain detailed physician notes and justification",
-                "Review payer's medical policy for service",
-                "Prepare medical necessity appeal with clinical rationale"
-            ])
-        else:
-            actions.append("Prepare comprehensive appeal with all supporting documentation")
+        actions = _category_actions(denial_info["category"])
         
         # Add payer-specific action
-        guidelines = self.appeal_guidelines.get(payer, {})
-        if guidelines:
-            deadline_days = guidelines.get("deadline_days", 30)
-            actions.append(f"Submit appeal within {deadline_days} days via {guidelines.get('submission_method', 'appropriate channel')}")
+        guidelines = self.appeal_guidelines.get(payer, _EMPTY_GUIDELINES)
+        if guidelines is not _EMPTY_GUIDELINES:
+            actions.append(_payer_action(guidelines))
         
         return actions
     
-    def _determine_required_docs(self, category: str, payer: str) -> List[str]:
+    def _determine_required_docs(self, category: DenialCategory, payer: str) -> List[str]:
         """Determine required documentation"""
-        base_docs = ["appeal_letter", "original_claim"]
-        
-        category_docs = {
-            DenialCategory.MISSING_INFO: ["complete_medical_records", "lab_results", "imaging_reports"],
-            DenialCategory.AUTH_REQUIRED: ["clinical_notes", "physician_order", "medical_justification"],
-            DenialCategory.CODING_ERROR: ["corrected_claim", "coding_rationale"],
-            DenialCategory.MEDICAL_NECESSITY: ["physician_statement", "clinical_guidelines", "peer_reviewed_literature"],
-            DenialCategory.NOT_COVERED: ["coverage_policy", "exception_justification"],
-            DenialCategory.ELIGIBILITY: ["eligibility_verification", "insurance_card_copy"],
-        }
-        
-        docs = base_docs + category_docs.get(category, [])
-        
-        # Add payer-specific docs
-        payer_guidelines = self.appeal_guidelines.get(payer, {})
-        if payer_guidelines:
-            docs.extend(payer_guidelines.get("required_docs", []))
-        
-        return list(set(docs))  # Remove duplicates
+        return _required_docs(category, self.appeal_guidelines.get(payer, _EMPTY_GUIDELINES))
     
     def _determine_priority(self, amount: float, success_probability: float) -> str:
         """Determine appeal priority"""
@@ -412,6 +824,14 @@ class AppealGenerationTool(Tool):
     def __init__(self):
         super().__init__()
         self.templates = self._load_templates()
+        self._parsed_templates = {
+            key: _parse_template(template) for key, template in self.templates.items()
+        }
+        # The sender block of the closing never changes; fill it in once
+        self._parsed_templates["closing"] = _bind_template(
+            self._parsed_templates["closing"],
+            **_LETTER_STATIC_FIELDS
+        )
     
     def _load_templates(self) -> Dict[str, str]:
         """Load appeal letter templates"""
@@ -494,23 +914,30 @@ Enclosures: {enclosures}
     def _run(self, query: str) -> Dict[str, Any]:
         """Generate appeal letter"""
         try:
-            data = json.loads(query)
-            
+            data = _json_loads(query)
+        except ValueError as e:
+            return _tool_error("Appeal generation failed: invalid query", e)
+        
+        try:
             analysis = data["denial_analysis"]
             patient_info = data["patient_info"]
             payer_info = data["payer_info"]
             claim_info = data["claim_info"]
             
             # Determine appeal type and select template
-            category = analysis["category"]
+            category = _CATEGORY_BY_STR.get(analysis["category"], DenialCategory.OTHER)
             template_key = self._select_template(category)
             
+            # Shared by the body and the enclosures line
+            joined_docs = ", ".join(analysis["required_documentation"])
+            
             # Generate letter body
             body = self._generate_body(
                 template_key,
                 analysis,
                 patient_info,
-                claim_info
+                claim_info,
+                joined_docs
             )
             
             # Generate complete letter
@@ -519,11 +946,15 @@ Enclosures: {enclosures}
                 patient_info,
                 payer_info,
                 claim_info,
-                body
+                body,
+                joined_docs
             )
             
-            # Calculate deadline
-            deadline = datetime.now() + timedelta(days=payer_info.get("appeal_deadline_days", 30))
+            # Calculate deadline (day-granular, midnight local time)
+            deadline = datetime.combine(
+                _today_cached(int(time.time() // 3600)) + timedelta(days=payer_info.get("appeal_deadline_days", 30)),
+                datetime.min.time()
+            )
             
             appeal_letter = AppealLetter(
                 claim_id=analysis["claim_id"],
@@ -535,48 +966,42 @@ Enclosures: {enclosures}
                 supporting_documentation=analysis["required_documentation"],
                 deadline=deadline
             )
-            
-            return {
-                "status": "success",
-                "appeal_letter": appeal_letter.dict()
-            }
-            
-        except Exception as e:
-            logger.error(f"Appeal generation failed: {e}", exc_info=True)
-            return {
-                "status": "error",
-                "error": str(e)
-            }
+        except (KeyError, TypeError, ValueError) as e:
+            return _tool_error("Appeal generation failed", e)
+        
+        return {
+            "status": "success",
+            "appeal_letter": appeal_letter.model_dump(mode="json")
+        }
     
-    def _select_template(self, category: str) -> str:
+    def _select_template(self, category: DenialCategory) -> str:
         """Select appropriate template based on denial category"""
-        template_map = {
-            DenialCategory.MISSING_INFO: "missing_info",
-            DenialCategory.MEDICAL_NECESSITY: "medical_necessity",
-            DenialCategory.AUTH_REQUIRED: "authorization",
-        }
-        return template_map.get(category, "medical_necessity")
+        return _TEMPLATE_BY_CATEGORY[category]
     
     def _generate_body(
         self,
         template_key: str,
         analysis: Dict,
         patient_info: Dict,
-        claim_info: Dict
+        claim_info: Dict,
+        joined_docs: Optional[str] = None
     ) -> str:
         """Generate letter body from template"""
-        template = self.templates.get(template_key, "")
+        template = self._parsed_templates.get(template_key, ())
+        if joined_docs is None:
+            joined_docs = ", ".join(analysis["required_documentation"])
         
         # Populate template with actual data
-        body = template.format(
+        body = _fast_format(
+            template,
             clinical_presentation=claim_info.get("clinical_presentation", ""),
             medical_justification=claim_info.get("medical_justification", ""),
             supporting_evidence=claim_info.get("supporting_evidence", ""),
-            documentation_list=", ".join(analysis["required_documentation"]),
+            documentation_list=joined_docs,
             circumstances=claim_info.get("circumstances", ""),
             clinical_documentation=claim_info.get("clinical_notes", ""),
             original_submission=claim_info.get("original_submission_summary", ""),
-            additional_docs=", ".join(analysis["required_documentation"])
+            additional_docs=joined_docs
         )
         
         return body
@@ -587,10 +1012,15 @@ Enclosures: {enclosures}
         patient_info: Dict,
         payer_info: Dict,
         claim_info: Dict,
-        body: str
+        body: str,
+        joined_docs: Optional[str] = None
     ) -> str:
         """Assemble complete letter"""
-        header = self.templates["header"].format(
+        if joined_docs is None:
+            joined_docs = ", ".join(analysis["required_documentation"])
+        
+        header = _fast_format(
+            self._parsed_templates["header"],
             recipient_name=payer_info["appeals_department"],
             recipient_address=payer_info["appeals_address"],
             claim_id=analysis["claim_id"],
@@ -599,16 +1029,11 @@ Enclosures: {enclosures}
             denial_date=claim_info.get("denial_date", "")
         )
         
-        closing = self.templates["closing"].format(
+        closing = _fast_format(
+            self._parsed_templates["closing"],
             amount=claim_info.get("claim_amount", 0),
-            contact_info="billing@hospital.com",
             response_days=payer_info.get("response_days", 30),
-            applicable_law="Egyptian Insurance Law",
-            sender_name="Billing Director",
-            sender_title="Director of Revenue Cycle Management",
-            organization_name="Hospital Name",
-            contact_information="Phone: +20 xxx | Email: billing@hospital.com",
-            enclosures=", ".join(analysis["required_documentation"])
+            enclosures=joined_docs
         )
         
         return header + "\n" + body + "\n" + closing
@@ -616,8 +1041,10 @@ Enclosures: {enclosures}
 
 # ===== Agent Definition =====
 
-def create_denial_management_agent(tools: List[Tool]) -> Agent:
+def create_denial_management_agent(tools: List[Tool]) -> "Agent":
     """Create denial management agent"""
+    from praisonaiagents import Agent
+    
     return Agent(
         name="DenialManagementAgent",
         role="Denial Management Specialist",
@@ -3,21 +3,404 @@ Insurance Verification Agent
 Verifies insurance coverage and eligibility via HCX
 """
 
+import asyncio
+import functools
+import inspect
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Callable, Dict, Any, Optional, Sequence, Tuple
 from datetime import datetime, date
 
+import httpx
+from cachetools import TTLCache
 from praisonai_agents import Agent, Task
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy import Row, and_, select, update
+from sqlalchemy.exc import SQLAlchemyError
 
 from src.models.patient import Patient
 from src.models.coverage import Coverage
 from src.integrations.hcx.client import HCXClient
 from src.tools.hcx_tools import HCXEligibilityTool
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = NUMPY_AVAILABLE
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Failures reported back to the caller as an error message; anything else
+# is a bug and propagates. Tracebacks are only logged at DEBUG level.
+_HANDLED_ERRORS = (SQLAlchemyError, httpx.HTTPError, asyncio.TimeoutError, ValueError)
+
+# Patient coinsurance share (80/20 split)
+COINSURANCE_RATE = 0.20
+
+# Coverage columns read by verify_eligibility and get_coverage_details;
+# selecting them as rows avoids building full ORM objects for display
+@functools.lru_cache(maxsize=1)
+def _eligibility_columns() -> tuple:
+    """Coverage columns verify_eligibility reads, built on first use"""
+    return (
+        Coverage.id,
+        Coverage.policy_number,
+        Coverage.insurance_company,
+        Coverage.subscriber_id,
+        Coverage.effective_date,
+        Coverage.termination_date,
+        Coverage.copay,
+        Coverage.deductible,
+        Coverage.deductible_met,
+        Coverage.out_of_pocket_max,
+        Coverage.out_of_pocket_met,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _detail_columns() -> tuple:
+    """Coverage columns get_coverage_details streams, built on first use"""
+    return (
+        Coverage.id,
+        Coverage.insurance_company,
+        Coverage.policy_number,
+        Coverage.active,
+        Coverage.effective_date,
+        Coverage.termination_date,
+        Coverage.copay,
+        Coverage.deductible,
+        Coverage.deductible_met,
+        Coverage.last_verified,
+        Coverage.subscriber_id,
+    )
+
+
+# Patient and coverage columns for the remaining lookups. They are selected
+# as rows, not entities, so no partially loaded Patient or Coverage ends up
+# in the caller's session for a later get() on the same session to return
+@functools.lru_cache(maxsize=1)
+def _patient_columns() -> tuple:
+    """Patient columns the chat messages use, built on first use"""
+    return (
+        Patient.patient_id,
+        Patient.first_name,
+        Patient.last_name,
+        Patient.date_of_birth,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _estimate_columns() -> tuple:
+    """Coverage columns the responsibility estimates read, built on first use"""
+    return (
+        Coverage.copay,
+        Coverage.deductible,
+        Coverage.deductible_met,
+        Coverage.out_of_pocket_max,
+        Coverage.out_of_pocket_met,
+    )
+
+
+# Status badge shown per policy in get_coverage_details; anything else
+# (terminated, cancelled, ...) falls back to ❌
+STATUS_EMOJI = {'active': '✅', 'inactive': '⏸️'}
+
+# Eligibility response fields in the order _eligibility_parser returns
+# them, with the expression used when the payer's response omits the key
+# (d is the response dict, c the coverage row)
+_ELIGIBILITY_FIELDS = (
+    ('is_active', 'False'),
+    ('coverage_percentage', '80'),
+    ('copay_amount', 'c.copay'),
+    ('deductible_amount', 'c.deductible'),
+    ('deductible_met', 'c.deductible_met'),
+    ('out_of_pocket_max', 'c.out_of_pocket_max'),
+    ('out_of_pocket_met', 'c.out_of_pocket_met'),
+    ('requires_authorization', 'False'),
+)
+
+# Generated parsers keyed by (payer_name, response keys)
+_payer_parsers: Dict[tuple, Callable[[dict, Any], tuple]] = {}
+
+
+def _eligibility_parser(payer_name: str, eligibility_data: dict) -> Callable[[dict, Any], tuple]:
+    """
+    Return a parser specialized for one payer's eligibility response shape
+    
+    A payer's responses carry the same keys call after call, so the parser
+    is generated once per (payer, key set) as straight-line code: present
+    keys are read by subscript and absent ones compile to their fallback,
+    replacing a dict.get per field.
+    """
+    key = (payer_name, tuple(eligibility_data))
+    parser = _payer_parsers.get(key)
+    if parser is None:
+        fields = ", ".join(
+            f"d[{name!r}]" if name in eligibility_data else fallback
+            for name, fallback in _ELIGIBILITY_FIELDS
+        )
+        namespace: Dict[str, Any] = {}
+        exec(compile(f"def parse(d, c):\n    return ({fields},)\n", "<eligibility parser>", "exec"), namespace)
+        parser = _payer_parsers[key] = namespace['parse']
+    return parser
+
+
+# Queued verification updates written per flush_verifications commit
+VERIFICATION_FLUSH_SIZE = 50
+
+# Seconds a queued verification may wait for a batch to fill; after that
+# the next eligibility check (or flush_periodically) writes it anyway
+VERIFICATION_FLUSH_INTERVAL = 30.0
+
+# Queued verifications kept while flushes keep failing; beyond this the
+# oldest are dropped (the next successful check queues them again)
+VERIFICATION_QUEUE_LIMIT = 100 * VERIFICATION_FLUSH_SIZE
+
+# Common procedures requiring authorization: emergency/critical care codes
+# and the surgical CPT ranges (10000-59999). The lead digit is tested by
+# set membership; single-character strings carry cached hashes, which
+# benchmarks faster in CPython than an ord()-indexed byte table.
+HIGH_COST_PROCEDURES = frozenset({'99285', '99291', '99292'})
+SURGICAL_LEAD_DIGITS = frozenset('12345')
+
+# Fixed message tails
+_NOT_ELIGIBLE_FOOTER = (
+    "❌ **Patient is NOT eligible**\n\n"
+    "**Possible reasons:**\n"
+    "• Coverage period expired\n"
+    "• Policy terminated\n"
+    "• Incorrect information\n\n"
+    "**Next steps:**\n"
+    "• Update coverage information\n"
+    "• Contact insurance company\n"
+    "• Verify patient details\n"
+)
+
+_AUTH_NEXT_STEPS = (
+    "\n"
+    "**Next steps:**\n"
+    "1. Submit authorization request\n"
+    "2. Provide clinical documentation\n"
+    "3. Wait for approval (typically 1-3 business days)\n"
+    "4. Obtain authorization number\n"
+)
+
+_ESTIMATE_NOTE = (
+    "⚠️ **Note:** This is an estimate. Actual amounts may vary based on:\n"
+    "• In-network vs. out-of-network\n"
+    "• Contracted rates with provider\n"
+    "• Claim adjudication\n"
+)
+
+def _compute_responsibility(
+    total_charges: float,
+    copay: float,
+    deductible_amount: float,
+    deductible_met: float,
+    oop_max: float,
+    oop_met: float
+) -> Tuple[float, float, float, float, float, float]:
+    """
+    Split a charge between patient and payer
+    
+    Plain float arithmetic so the same kernel can be compiled by Numba for
+    batch quoting. Pass float('inf') for an uncapped out-of-pocket maximum.
+    
+    Returns:
+        (deductible_applied, coinsurance_amount, insurance_pays,
+        patient_pays, deductible_remaining_after, oop_remaining_after)
+    """
+    deductible_remaining = max(0.0, deductible_amount - deductible_met)
+    
+    # Apply deductible first
+    amount_after_deductible = max(0.0, total_charges - deductible_remaining)
+    deductible_applied = min(total_charges, deductible_remaining)
+    
+    # Apply coinsurance
+    coinsurance_amount = amount_after_deductible * COINSURANCE_RATE
+    insurance_pays = amount_after_deductible * (1.0 - COINSURANCE_RATE)
+    patient_pays = copay + deductible_applied + coinsurance_amount
+    
+    # Cap at the out-of-pocket maximum
+    oop_remaining = oop_max - oop_met
+    if patient_pays > oop_remaining:
+        patient_pays = oop_remaining
+        insurance_pays = total_charges - patient_pays - copay
+    
+    return (
+        deductible_applied,
+        coinsurance_amount,
+        insurance_pays,
+        patient_pays,
+        max(0.0, deductible_remaining - deductible_applied),
+        max(0.0, oop_remaining - patient_pays),
+    )
+
+
+if NUMBA_AVAILABLE:
+    _compute_responsibility_jit = njit(cache=True)(_compute_responsibility)
+    
+    @njit(cache=True, parallel=True)
+    def _batch_responsibility(total_charges, copay, deductible_amount, deductible_met, oop_max, oop_met):
+        """Compiled, parallel _compute_responsibility over aligned arrays"""
+        n = total_charges.shape[0]
+        out = np.empty((6, n), dtype=np.float64)
+        for i in prange(n):
+            result = _compute_responsibility_jit(
+                total_charges[i], copay[i], deductible_amount[i],
+                deductible_met[i], oop_max[i], oop_met[i]
+            )
+            for j in range(6):
+                out[j, i] = result[j]
+        return out
+
+
+def estimate_responsibility_batch(
+    total_charges: Sequence[float],
+    copay: Sequence[float],
+    deductible_amount: Sequence[float],
+    deductible_met: Sequence[float],
+    oop_max: Sequence[float],
+    oop_met: Sequence[float]
+) -> Any:
+    """
+    Run _compute_responsibility over many quotes at once
+    
+    All arguments are aligned sequences of floats, one entry per quote;
+    use float('inf') for an uncapped out-of-pocket maximum.
+    
+    Returns:
+        A 6 x n float array (rows in _compute_responsibility order), or a
+        list of six lists when NumPy is not installed
+    """
+    columns = (total_charges, copay, deductible_amount, deductible_met, oop_max, oop_met)
+    
+    if NUMBA_AVAILABLE:
+        return _batch_responsibility(*(np.asarray(c, dtype=np.float64) for c in columns))
+    
+    rows = [_compute_responsibility(*quote) for quote in zip(*columns)]
+    if NUMPY_AVAILABLE:
+        return np.array(rows, dtype=np.float64).reshape(-1, 6).T
+    return [list(column) for column in zip(*rows)] if rows else [[] for _ in range(6)]
+
+
+@functools.lru_cache(maxsize=4096)
+def _fmt_date(d: date) -> str:
+    """Format a date for messages; coverage and birth dates repeat heavily"""
+    return d.isoformat()
+
+
+@functools.lru_cache(maxsize=4096)
+def _fmt_datetime(dt: datetime) -> str:
+    """Format a timestamp to the minute for messages"""
+    return dt.isoformat(' ', 'minutes')
+
+
+# estimate_patient_responsibility_bulk result keys, in
+# _compute_responsibility output order
+_BULK_ESTIMATE_KEYS = (
+    'deductible',
+    'coinsurance',
+    'insurance_pays',
+    'patient_pays',
+    'deductible_remaining',
+    'oop_remaining',
+)
+
+# Session factory used when a method is called without a db_session
+_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+
+
+def configure_sessionmaker(
+    sessionmaker: async_sessionmaker[AsyncSession]
+) -> async_sessionmaker[AsyncSession]:
+    """
+    Set the module session factory used when no db_session is passed
+    
+    Pass the app's factory (src.services.database.AsyncSessionLocal) so
+    these sessions share its pool instead of opening a second one.
+    """
+    global _sessionmaker
+    _sessionmaker = sessionmaker
+    return _sessionmaker
+
+
+async def warm_pool(engine: AsyncEngine) -> None:
+    """
+    Open every pooled connection up front and hand them back to the pool
+    
+    Called once at startup (src.api.main) so the first eligibility checks
+    do not pay for connection setup. A database that is not reachable yet
+    is logged, not raised; connections are then opened on first use.
+    """
+    results = await asyncio.gather(
+        *(engine.connect().start() for _ in range(engine.pool.size())),
+        return_exceptions=True
+    )
+    connections = [r for r in results if not isinstance(r, BaseException)]
+    await asyncio.gather(*(connection.close() for connection in connections))
+    if len(connections) < len(results):
+        error = next(r for r in results if isinstance(r, BaseException))
+        logger.warning("⚠️ Connection pool warm-up failed: %s", error)
+
+
+def _with_session(method):
+    """
+    Open a session from the module factory when db_session is None
+    
+    A session passed by the caller is used as-is and left open.
+    """
+    signature = inspect.signature(method)
+    
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        if bound.arguments.get('db_session') is not None:
+            return await method(*args, **kwargs)
+        if _sessionmaker is None:
+            raise RuntimeError(
+                "No db_session given and configure_sessionmaker() has not been called"
+            )
+        async with _sessionmaker() as db_session:
+            bound.arguments['db_session'] = db_session
+            return await method(*bound.args, **bound.kwargs)
+    
+    return wrapper
+
+
+_BACKSTORY = (
+    "You are an expert insurance verifier with 10+ years of experience "
+    "in eligibility verification, benefits coordination, and authorization requirements. "
+    "You ensure accurate coverage information before services are rendered, preventing "
+    "claim denials and patient billing issues."
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_hcx_tools() -> Tuple[HCXClient, HCXEligibilityTool]:
+    """Build the HCX client and eligibility tool once and share them across instances"""
+    return HCXClient(), HCXEligibilityTool()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_verification_agent() -> Agent:
+    """Build the PraisonAI verification agent once and share it across instances"""
+    return Agent(
+        name="Insurance Verification Specialist",
+        role="Insurance Verification Expert",
+        goal="Verify patient insurance coverage and benefits in real-time via HCX",
+        backstory=_BACKSTORY,
+        verbose=True,
+        allow_delegation=False
+    )
+
 
 class InsuranceVerificationAgent:
     """
@@ -37,29 +420,27 @@ class InsuranceVerificationAgent:
         self.agent_type = "verification"
         self.avatar = "💳"
         
-        # Initialize HCX tools
-        self.hcx_client = HCXClient()
-        self.hcx_eligibility_tool = HCXEligibilityTool()
-        
-        # Initialize PraisonAI agent
-        self.agent = Agent(
-            name="Insurance Verification Specialist",
-            role="Insurance Verification Expert",
-            goal="Verify patient insurance coverage and benefits in real-time via HCX",
-            backstory="""You are an expert insurance verifier with 10+ years of experience 
-            in eligibility verification, benefits coordination, and authorization requirements. 
-            You ensure accurate coverage information before services are rendered, preventing 
-            claim denials and patient billing issues.""",
-            verbose=True,
-            allow_delegation=False
-        )
+        # HCX client, tool and PraisonAI agent are shared across instances
+        self.hcx_client, self.hcx_eligibility_tool = _get_hcx_tools()
+        self.agent = _get_verification_agent()
+        
+        # Successful HCX eligibility responses keyed by (coverage_id, service
+        # date), plus one [lock, holders] entry per in-flight key so
+        # concurrent identical checks share a single HCX call
+        self._elig_cache = TTLCache(maxsize=10_000, ttl=300)
+        self._elig_locks: Dict[tuple, list] = {}
+        
+        # (coverage_id, verified_at) pairs not yet written to the database
+        self._pending_verifications: list[tuple[Any, datetime]] = []
+        self._last_flush = time.monotonic()
     
+    @_with_session
     async def verify_eligibility(
         self,
         patient_id: str,
         coverage_id: Optional[str],
         service_date: date,
-        db_session: AsyncSession
+        db_session: Optional[AsyncSession] = None
     ) -> Dict[str, Any]:
         """
         Verify insurance eligibility via HCX
@@ -68,7 +449,7 @@ class InsuranceVerificationAgent:
             patient_id: Patient ID
             coverage_id: Optional coverage ID (or will use active coverage)
             service_date: Date of service
-            db_session: Database session
+            db_session: Database session (opened from the module pool if omitted)
         
         Returns:
             Eligibility verification results
@@ -76,26 +457,17 @@ class InsuranceVerificationAgent:
         logger.info(f"💳 Verifying eligibility for patient {patient_id}")
         
         try:
-            # Get patient
-            patient = await db_session.get(Patient, patient_id)
+            # Get patient and coverage in one round-trip
+            patient, coverage = await self._fetch_patient_and_coverage(
+                patient_id, coverage_id, db_session
+            )
+            
             if not patient:
                 return {
                     'success': False,
                     'message': f"❌ Patient not found: {patient_id}"
                 }
             
-            # Get coverage
-            if coverage_id:
-                coverage = await db_session.get(Coverage, coverage_id)
-            else:
-                # Find active coverage
-                stmt = select(Coverage).where(
-                    Coverage.patient_id == patient_id,
-                    Coverage.status == 'active'
-                ).order_by(Coverage.coverage_start_date.desc())
-                result = await db_session.execute(stmt)
-                coverage = result.scalars().first()
-            
             if not coverage:
                 return {
                     'success': False,
@@ -107,11 +479,8 @@ class InsuranceVerificationAgent:
                 }
             
             # Check HCX eligibility
-            result = await self.hcx_eligibility_tool.check_eligibility(
-                patient_id=patient_id,
-                coverage_id=coverage.id,
-                service_date=service_date,
-                db_session=db_session
+            result = await self._check_eligibility_cached(
+                patient_id, coverage, service_date
             )
             
             if not result.get('success'):
@@ -123,71 +492,37 @@ class InsuranceVerificationAgent:
             # Parse eligibility response
             eligibility_data = result.get('eligibility_data', {})
             
-            # Update coverage with latest info
-            if eligibility_data:
-                coverage.last_verified = datetime.utcnow()
-                coverage.verification_status = 'verified'
-                await db_session.commit()
-            
-            # Build response message
-            is_eligible = eligibility_data.get('is_active', False)
-            
-            if is_eligible:
-                message = f"✅ **Insurance Coverage Active**\n\n"
-            else:
-                message = f"❌ **Insurance Coverage Inactive**\n\n"
-            
-            message += f"**Patient:** {patient.first_name} {patient.last_name}\n"
-            message += f"**Policy Number:** {coverage.policy_number}\n"
-            message += f"**Payer:** {coverage.payer_name}\n"
-            message += f"**Member ID:** {coverage.subscriber_id}\n\n"
-            
-            message += f"**Coverage Period:**\n"
-            message += f"• Start: {coverage.coverage_start_date.strftime('%Y-%m-%d')}\n"
-            message += f"• End: {coverage.coverage_end_date.strftime('%Y-%m-%d')}\n\n"
+            parse = _eligibility_parser(coverage.insurance_company, eligibility_data)
+            (
+                is_eligible,
+                coverage_pct,
+                copay,
+                deductible,
+                deductible_met,
+                oop_max,
+                oop_met,
+                requires_auth
+            ) = parse(eligibility_data, coverage)
             
-            if is_eligible:
-                message += f"**Benefits:**\n"
-                
-                # Coverage percentage
-                coverage_pct = eligibility_data.get('coverage_percentage', 80)
-                message += f"• Coverage: {coverage_pct}%\n"
-                
-                # Copay
-                copay = eligibility_data.get('copay_amount', coverage.copay_amount)
-                if copay:
-                    message += f"• Copay: {copay:.2f} EGP\n"
+            async with asyncio.TaskGroup() as tg:
+                # Queue the coverage update; written in batches by
+                # flush_verifications once a batch fills or the interval
+                # elapses. A due flush is started first so its round-trip
+                # overlaps with building the message.
+                if eligibility_data:
+                    self._pending_verifications.append((coverage.id, datetime.utcnow()))
+                    if (
+                        len(self._pending_verifications) >= VERIFICATION_FLUSH_SIZE
+                        or time.monotonic() - self._last_flush >= VERIFICATION_FLUSH_INTERVAL
+                    ):
+                        tg.create_task(self._flush_quietly())
+                        await asyncio.sleep(0)
                 
-                # Deductible
-                deductible = eligibility_data.get('deductible_amount', coverage.deductible_amount)
-                deductible_met = eligibility_data.get('deductible_met', coverage.deductible_met)
-                if deductible:
-                    message += f"• Deductible: {deductible:.2f} EGP ({deductible_met:.2f} met)\n"
-                
-                # Out of pocket max
-                oop_max = eligibility_data.get('out_of_pocket_max', coverage.out_of_pocket_max)
-                oop_met = eligibility_data.get('out_of_pocket_met', coverage.out_of_pocket_met)
-                if oop_max:
-                    message += f"• Out-of-Pocket Max: {oop_max:.2f} EGP ({oop_met:.2f} met)\n"
-                
-                message += f"\n**Authorization:**\n"
-                requires_auth = eligibility_data.get('requires_authorization', False)
-                if requires_auth:
-                    message += "⚠️ Prior authorization required for certain services\n"
-                else:
-                    message += "✅ No prior authorization required\n"
-                
-                message += f"\n✅ **Patient is eligible for services on {service_date.strftime('%Y-%m-%d')}**"
-            else:
-                message += "❌ **Patient is NOT eligible**\n\n"
-                message += "**Possible reasons:**\n"
-                message += "• Coverage period expired\n"
-                message += "• Policy terminated\n"
-                message += "• Incorrect information\n\n"
-                message += "**Next steps:**\n"
-                message += "• Update coverage information\n"
-                message += "• Contact insurance company\n"
-                message += "• Verify patient details\n"
+                message = self._format_eligibility_message(
+                    patient, coverage, service_date,
+                    is_eligible, coverage_pct, copay, deductible, deductible_met,
+                    oop_max, oop_met, requires_auth
+                )
             
             return {
                 'success': True,
@@ -195,34 +530,243 @@ class InsuranceVerificationAgent:
                 'message': message,
                 'coverage_data': {
                     'policy_number': coverage.policy_number,
-                    'payer': coverage.payer_name,
+                    'payer': coverage.insurance_company,
                     'is_active': is_eligible,
                     'copay': copay if is_eligible else None,
                     'deductible': deductible if is_eligible else None,
                     'deductible_met': deductible_met if is_eligible else None,
                     'coverage_percentage': coverage_pct if is_eligible else None,
-                    'requires_authorization': eligibility_data.get('requires_authorization', False)
+                    'requires_authorization': requires_auth
                 }
             }
         
-        except Exception as e:
-            logger.error(f"❌ Eligibility verification failed: {e}", exc_info=True)
+        except _HANDLED_ERRORS as e:
+            logger.error("❌ Eligibility verification failed: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return {
                 'success': False,
                 'message': f"Error verifying eligibility: {str(e)}"
             }
     
-    async def get_coverage_details(
+    def _format_eligibility_message(
+        self,
+        patient: Row,
+        coverage: Row,
+        service_date: date,
+        is_eligible: bool,
+        coverage_pct: Any,
+        copay: Any,
+        deductible: Any,
+        deductible_met: Any,
+        oop_max: Any,
+        oop_met: Any,
+        requires_auth: bool
+    ) -> str:
+        """Build the verify_eligibility chat message"""
+        parts = [
+            "✅ **Insurance Coverage Active**\n\n" if is_eligible
+            else "❌ **Insurance Coverage Inactive**\n\n",
+            f"**Patient:** {patient.first_name} {patient.last_name}\n",
+            f"**Policy Number:** {coverage.policy_number}\n",
+            f"**Payer:** {coverage.insurance_company}\n",
+            f"**Member ID:** {coverage.subscriber_id}\n\n",
+            "**Coverage Period:**\n",
+            f"• Start: {_fmt_date(coverage.effective_date)}\n",
+            f"• End: {_fmt_date(coverage.termination_date)}\n\n",
+        ]
+        
+        if is_eligible:
+            parts.append("**Benefits:**\n")
+        
+            # Coverage percentage
+            parts.append(f"• Coverage: {coverage_pct}%\n")
+        
+            # Copay
+            if copay:
+                parts.append(f"• Copay: {copay:.2f} EGP\n")
+        
+            # Deductible
+            if deductible:
+                parts.append(f"• Deductible: {deductible:.2f} EGP ({deductible_met:.2f} met)\n")
+        
+            # Out of pocket max
+            if oop_max:
+                parts.append(f"• Out-of-Pocket Max: {oop_max:.2f} EGP ({oop_met:.2f} met)\n")
+        
+            parts.append("\n**Authorization:**\n")
+            if requires_auth:
+                parts.append("⚠️ Prior authorization required for certain services\n")
+            else:
+                parts.append("✅ No prior authorization required\n")
+        
+            parts.append(f"\n✅ **Patient is eligible for services on {_fmt_date(service_date)}**")
+        else:
+            parts.append(_NOT_ELIGIBLE_FOOTER)
+        
+        return "".join(parts)
+    
+    async def _flush_quietly(self) -> None:
+        """
+        flush_verifications for use alongside a response or in the background
+        
+        A failed flush keeps its updates queued for the next attempt, so it
+        is logged rather than failing the eligibility check or ending the
+        background flush.
+        """
+        try:
+            await self.flush_verifications()
+        except _HANDLED_ERRORS as e:
+            logger.warning("⚠️ Coverage verification flush failed: %s", e)
+        except Exception:
+            logger.exception("❌ Coverage verification flush failed")
+    
+    async def flush_verifications(self) -> int:
+        """
+        Mark all queued coverages as verified in one statement and commit
+        
+        The queue is shared by every request, so it is written on its own
+        session from the module factory rather than on a caller's session,
+        whose pending changes the commit would otherwise include.
+        
+        Returns:
+            Number of coverages updated
+        """
+        pending, self._pending_verifications = self._pending_verifications, []
+        self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        
+        try:
+            if _sessionmaker is None:
+                raise RuntimeError("configure_sessionmaker() has not been called")
+            async with _sessionmaker() as db_session:
+                await db_session.execute(
+                    update(Coverage),
+                    [
+                        {'id': coverage_id, 'last_verified': verified_at, 'verification_status': 'verified'}
+                        for coverage_id, verified_at in pending
+                    ]
+                )
+                await db_session.commit()
+        except BaseException:
+            # Keep the updates for the next flush, also when cancelled
+            # mid-write (e.g. the background flush at shutdown), up to
+            # VERIFICATION_QUEUE_LIMIT
+            queue = self._pending_verifications
+            queue[:0] = pending
+            if len(queue) > VERIFICATION_QUEUE_LIMIT:
+                dropped = len(queue) - VERIFICATION_QUEUE_LIMIT
+                del queue[:dropped]
+                logger.warning(f"⚠️ Dropped {dropped} queued coverage verifications")
+            raise
+        
+        logger.info(f"✅ Recorded {len(pending)} coverage verifications")
+        return len(pending)
+    
+    async def flush_periodically(self, interval: float = VERIFICATION_FLUSH_INTERVAL) -> None:
+        """
+        Flush queued verifications every interval seconds until cancelled
+        
+        Run as a background task so updates queued during a lull are not
+        held until the next eligibility check. configure_sessionmaker() must
+        have been called. Failures are logged and retried on the next pass.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            if self._pending_verifications:
+                await self._flush_quietly()
+    
+    async def _check_eligibility_cached(
         self,
         patient_id: str,
+        coverage: Row,
+        service_date: date
+    ) -> Dict[str, Any]:
+        """
+        Check eligibility via HCX, reusing a recent successful response
+        
+        The already-loaded coverage row is handed to the tool so it does not
+        query it again. Failed checks are not cached so they are retried on
+        the next call.
+        """
+        key = (coverage.id, _fmt_date(service_date))
+        cached = self._elig_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # The entry is dropped only once no caller holds or waits on it, so
+        # a later caller cannot get a fresh lock while waiters remain
+        entry = self._elig_locks.get(key)
+        if entry is None:
+            entry = self._elig_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                # Another caller may have filled the cache while we waited
+                cached = self._elig_cache.get(key)
+                if cached is not None:
+                    return cached
+                result = await self.hcx_eligibility_tool.check_eligibility(
+                    patient_id=patient_id,
+                    coverage_id=coverage.id,
+                    service_date=service_date,
+                    coverage=coverage
+                )
+                if result.get('success'):
+                    self._elig_cache[key] = result
+                return result
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._elig_locks[key]
+    
+    async def _fetch_patient_and_coverage(
+        self,
+        patient_id: str,
+        coverage_id: Optional[str],
         db_session: AsyncSession
+    ) -> Tuple[Optional[Row], Optional[Row]]:
+        """
+        Load the patient with the requested coverage, or their latest active one
+        
+        A single outer-joined SELECT returns the patient columns alongside
+        the coverage columns verify_eligibility reports; the one row serves
+        as both the patient and the coverage record.
+        """
+        if coverage_id:
+            on_clause = Coverage.id == int(coverage_id)
+        else:
+            # Find active coverage
+            on_clause = and_(
+                Coverage.patient_id == Patient.patient_id,
+                Coverage.active.is_(True)
+            )
+        stmt = (
+            select(*_patient_columns(), *_eligibility_columns())
+            .outerjoin(Coverage, on_clause)
+            .where(Patient.patient_id == patient_id)
+            .order_by(Coverage.effective_date.desc())
+            .limit(1)
+        )
+        with db_session.no_autoflush:
+            row = (await db_session.execute(stmt)).first()
+        if row is None:
+            return None, None
+        return row, row if row.id is not None else None
+    
+    @_with_session
+    async def get_coverage_details(
+        self,
+        patient_id: str,
+        db_session: Optional[AsyncSession] = None,
+        only_active: bool = False
     ) -> Dict[str, Any]:
         """
         Get detailed coverage information for patient
         
         Args:
             patient_id: Patient ID
-            db_session: Database session
+            db_session: Database session (opened from the module pool if omitted)
+            only_active: Only return the five most recent active coverages
         
         Returns:
             Coverage details
@@ -231,19 +775,76 @@ class InsuranceVerificationAgent:
         
         try:
             # Get patient
-            patient = await db_session.get(Patient, patient_id)
+            patient = (await db_session.execute(
+                select(*_patient_columns()).where(Patient.patient_id == patient_id)
+            )).first()
             if not patient:
                 return {
                     'found': False,
                     'message': f"❌ Patient not found: {patient_id}"
                 }
             
-            # Get all coverages
-            stmt = select(Coverage).where(
+            # Stream all coverages so long histories are formatted as rows
+            # arrive instead of being materialized up front
+            stmt = select(*_detail_columns()).where(
                 Coverage.patient_id == patient_id
-            ).order_by(Coverage.coverage_start_date.desc())
-            result = await db_session.execute(stmt)
-            coverages = result.scalars().all()
+            ).order_by(Coverage.effective_date.desc())
+            if only_active:
+                stmt = stmt.where(Coverage.active.is_(True)).limit(5)
+            with db_session.no_autoflush:
+                result = await db_session.stream(stmt.execution_options(yield_per=50))
+            
+            parts = []
+            coverages = []
+            append = parts.append
+            idx = 0
+            # Rows unpack in _detail_columns() order
+            async for (
+                coverage_id,
+                payer_name,
+                policy_number,
+                is_active,
+                start_date,
+                end_date,
+                copay,
+                deductible,
+                deductible_met,
+                last_verified,
+                subscriber_id
+            ) in result:
+                idx += 1
+                if idx == 1:
+                    parts.extend((
+                        "📋 **Insurance Coverage Details**\n\n",
+                        f"**Patient:** {patient.first_name} {patient.last_name}\n",
+                        f"**DOB:** {_fmt_date(patient.date_of_birth)}\n",
+                        f"**Member ID:** {subscriber_id}\n\n",
+                    ))
+                
+                status = 'active' if is_active else 'inactive'
+                
+                append(f"**Policy {idx}:** {STATUS_EMOJI.get(status, '❌')}\n")
+                append(f"• **Payer:** {payer_name}\n")
+                append(f"• **Policy #:** {policy_number}\n")
+                append(f"• **Status:** {status.title()}\n")
+                append(f"• **Period:** {_fmt_date(start_date)} to {_fmt_date(end_date)}\n")
+                
+                if is_active:
+                    append(f"• **Copay:** {copay:.2f} EGP\n")
+                    append(f"• **Deductible:** {deductible:.2f} EGP ({deductible_met:.2f} met)\n")
+                
+                if last_verified:
+                    append(f"• **Last Verified:** {_fmt_datetime(last_verified)}\n")
+                
+                append("\n")
+                
+                coverages.append({
+                    'coverage_id': coverage_id,
+                    'payer_name': payer_name,
+                    'policy_number': policy_number,
+                    'status': status,
+                    'is_active': is_active
+                })
             
             if not coverages:
                 return {
@@ -254,57 +855,26 @@ class InsuranceVerificationAgent:
                                "Please add insurance information to proceed."
                 }
             
-            message = f"📋 **Insurance Coverage Details**\n\n"
-            message += f"**Patient:** {patient.first_name} {patient.last_name}\n"
-            message += f"**DOB:** {patient.date_of_birth.strftime('%Y-%m-%d')}\n"
-            message += f"**Member ID:** {coverages[0].subscriber_id}\n\n"
-            
-            for idx, coverage in enumerate(coverages, 1):
-                status_emoji = "✅" if coverage.status == 'active' else "⏸️" if coverage.status == 'inactive' else "❌"
-                
-                message += f"**Policy {idx}:** {status_emoji}\n"
-                message += f"• **Payer:** {coverage.payer_name}\n"
-                message += f"• **Policy #:** {coverage.policy_number}\n"
-                message += f"• **Status:** {coverage.status.title()}\n"
-                message += f"• **Period:** {coverage.coverage_start_date.strftime('%Y-%m-%d')} to {coverage.coverage_end_date.strftime('%Y-%m-%d')}\n"
-                
-                if coverage.status == 'active':
-                    message += f"• **Copay:** {coverage.copay_amount:.2f} EGP\n"
-                    message += f"• **Deductible:** {coverage.deductible_amount:.2f} EGP ({coverage.deductible_met:.2f} met)\n"
-                
-                if coverage.last_verified:
-                    message += f"• **Last Verified:** {coverage.last_verified.strftime('%Y-%m-%d %H:%M')}\n"
-                
-                message += "\n"
-            
             return {
                 'found': True,
-                'message': message,
-                'coverages': [
-                    {
-                        'coverage_id': c.id,
-                        'payer_name': c.payer_name,
-                        'policy_number': c.policy_number,
-                        'status': c.status,
-                        'is_active': c.status == 'active'
-                    }
-                    for c in coverages
-                ]
+                'message': "".join(parts),
+                'coverages': coverages
             }
         
-        except Exception as e:
-            logger.error(f"❌ Failed to get coverage details: {e}", exc_info=True)
+        except _HANDLED_ERRORS as e:
+            logger.error("❌ Failed to get coverage details: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return {
                 'found': False,
                 'message': f"Error retrieving coverage: {str(e)}"
             }
     
+    @_with_session
     async def check_authorization_requirements(
         self,
         service_type: str,
         procedure_codes: list[str],
         coverage_id: str,
-        db_session: AsyncSession
+        db_session: Optional[AsyncSession] = None
     ) -> Dict[str, Any]:
         """
         Check if prior authorization is required
@@ -313,7 +883,7 @@ class InsuranceVerificationAgent:
             service_type: Type of service (inpatient, outpatient, etc.)
             procedure_codes: List of CPT codes
             coverage_id: Coverage ID
-            db_session: Database session
+            db_session: Database session (opened from the module pool if omitted)
         
         Returns:
             Authorization requirements
@@ -321,67 +891,123 @@ class InsuranceVerificationAgent:
         logger.info(f"🔐 Checking authorization requirements for {service_type}")
         
         try:
-            coverage = await db_session.get(Coverage, coverage_id)
-            if not coverage:
+            payer_name = await db_session.scalar(
+                select(Coverage.insurance_company).where(Coverage.id == int(coverage_id))
+            )
+            if payer_name is None:
                 return {
                     'found': False,
                     'message': f"❌ Coverage not found: {coverage_id}"
                 }
             
-            # In production, this would query HCX or payer-specific rules
-            # For now, we'll use common authorization requirements
-            
-            requires_auth = False
-            auth_procedures = []
-            
-            # Common procedures requiring authorization
-            high_cost_procedures = ['99285', '99291', '99292']  # Emergency/critical care
-            surgical_procedures = [c for c in procedure_codes if c.startswith(('1', '2', '3', '4', '5'))]
-            
-            for code in procedure_codes:
-                if code in high_cost_procedures or code in surgical_procedures:
-                    requires_auth = True
-                    auth_procedures.append(code)
-            
-            message = f"🔐 **Authorization Requirements**\n\n"
-            message += f"**Service Type:** {service_type.title()}\n"
-            message += f"**Payer:** {coverage.payer_name}\n"
-            message += f"**Procedures:** {', '.join(procedure_codes)}\n\n"
-            
-            if requires_auth:
-                message += "⚠️ **Prior Authorization Required**\n\n"
-                message += f"**Procedures requiring auth:**\n"
-                for code in auth_procedures:
-                    message += f"• {code}\n"
-                message += "\n"
-                message += "**Next steps:**\n"
-                message += "1. Submit authorization request\n"
-                message += "2. Provide clinical documentation\n"
-                message += "3. Wait for approval (typically 1-3 business days)\n"
-                message += "4. Obtain authorization number\n"
-            else:
-                message += "✅ **No Prior Authorization Required**\n\n"
-                message += "You may proceed with scheduling the service."
-            
+            return self._authorization_result(
+                service_type, procedure_codes, payer_name
+            )
+        
+        except _HANDLED_ERRORS as e:
+            logger.error("❌ Authorization check failed: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return {
-                'found': True,
-                'requires_authorization': requires_auth,
-                'message': message,
-                'procedures_requiring_auth': auth_procedures
+                'found': False,
+                'message': f"Error checking authorization: {str(e)}"
             }
+    
+    @_with_session
+    async def check_authorization_requirements_bulk(
+        self,
+        requests: list[tuple[str, list[str], str]],
+        db_session: Optional[AsyncSession] = None
+    ) -> list[Dict[str, Any]]:
+        """
+        Check authorization requirements for many services at once
         
-        except Exception as e:
-            logger.error(f"❌ Authorization check failed: {e}", exc_info=True)
-            return {
+        All referenced coverages are loaded with a single IN query.
+        
+        Args:
+            requests: (service_type, procedure_codes, coverage_id) tuples
+            db_session: Database session (opened from the module pool if omitted)
+        
+        Returns:
+            One check_authorization_requirements result per request, in order
+        """
+        logger.info(f"🔐 Checking authorization requirements for {len(requests)} services")
+        
+        try:
+            # Coverage ids arrive as strings; the column is an integer key
+            coverage_ids = {int(coverage_id) for _, _, coverage_id in requests}
+            result = await db_session.execute(
+                select(Coverage.id, Coverage.insurance_company).where(Coverage.id.in_(coverage_ids))
+            )
+            payer_by_id = dict(result.all())
+        
+        except _HANDLED_ERRORS as e:
+            logger.error("❌ Bulk authorization check failed: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
+            error = {
                 'found': False,
                 'message': f"Error checking authorization: {str(e)}"
             }
+            return [error] * len(requests)
+        
+        results = []
+        for service_type, procedure_codes, coverage_id in requests:
+            payer_name = payer_by_id.get(int(coverage_id))
+            if payer_name is None:
+                results.append({
+                    'found': False,
+                    'message': f"❌ Coverage not found: {coverage_id}"
+                })
+            else:
+                results.append(self._authorization_result(
+                    service_type, procedure_codes, payer_name
+                ))
+        return results
     
+    def _authorization_result(
+        self,
+        service_type: str,
+        procedure_codes: list[str],
+        payer_name: str
+    ) -> Dict[str, Any]:
+        """Decide which procedures need prior authorization and describe it"""
+        # In production, this would query HCX or payer-specific rules
+        # For now, we'll use common authorization requirements
+        
+        auth_procedures = [
+            code for code in procedure_codes
+            if code in HIGH_COST_PROCEDURES
+            or (code and code[0] in SURGICAL_LEAD_DIGITS)
+        ]
+        requires_auth = bool(auth_procedures)
+        
+        parts = [
+            "🔐 **Authorization Requirements**\n\n",
+            f"**Service Type:** {service_type.title()}\n",
+            f"**Payer:** {payer_name}\n",
+            f"**Procedures:** {', '.join(procedure_codes)}\n\n",
+        ]
+        
+        if requires_auth:
+            parts.append("⚠️ **Prior Authorization Required**\n\n")
+            parts.append("**Procedures requiring auth:**\n")
+            for code in auth_procedures:
+                parts.append(f"• {code}\n")
+            parts.append(_AUTH_NEXT_STEPS)
+        else:
+            parts.append("✅ **No Prior Authorization Required**\n\n")
+            parts.append("You may proceed with scheduling the service.")
+        
+        return {
+            'found': True,
+            'requires_authorization': requires_auth,
+            'message': "".join(parts),
+            'procedures_requiring_auth': auth_procedures
+        }
+    
+    @_with_session
     async def estimate_patient_responsibility(
         self,
         total_charges: float,
         coverage_id: str,
-        db_session: AsyncSession
+        db_session: Optional[AsyncSession] = None
     ) -> Dict[str, Any]:
         """
         Estimate patient's financial responsibility
@@ -389,7 +1015,7 @@ class InsuranceVerificationAgent:
         Args:
             total_charges: Total charges for service
             coverage_id: Coverage ID
-            db_session: Database session
+            db_session: Database session (opened from the module pool if omitted)
         
         Returns:
             Estimated patient responsibility
@@ -397,7 +1023,9 @@ class InsuranceVerificationAgent:
         logger.info(f"💰 Estimating patient responsibility for {total_charges:.2f} EGP")
         
         try:
-            coverage = await db_session.get(Coverage, coverage_id)
+            coverage = (await db_session.execute(
+                select(*_estimate_columns()).where(Coverage.id == int(coverage_id))
+            )).first()
             if not coverage:
                 return {
                     'found': False,
@@ -405,48 +1033,37 @@ class InsuranceVerificationAgent:
                 }
             
             # Calculate patient responsibility
-            copay = coverage.copay_amount or 0
-            deductible_remaining = max(0, (coverage.deductible_amount or 0) - (coverage.deductible_met or 0))
-            
-            # Apply deductible first
-            amount_after_deductible = max(0, total_charges - deductible_remaining)
-            deductible_applied = min(total_charges, deductible_remaining)
-            
-            # Apply coinsurance (assuming 80/20 split - 20% patient responsibility)
-            coinsurance_rate = 0.20
-            coinsurance_amount = amount_after_deductible * coinsurance_rate
-            
-            # Insurance pays
-            insurance_pays = amount_after_deductible * (1 - coinsurance_rate)
-            
-            # Total patient responsibility
-            patient_pays = copay + deductible_applied + coinsurance_amount
-            
-            # Check out-of-pocket max
-            oop_remaining = (coverage.out_of_pocket_max or float('inf')) - (coverage.out_of_pocket_met or 0)
-            if patient_pays > oop_remaining:
-                patient_pays = oop_remaining
-                insurance_pays = total_charges - patient_pays - copay
-            
-            message = f"💰 **Estimated Patient Responsibility**\n\n"
-            message += f"**Total Charges:** {total_charges:,.2f} EGP\n\n"
-            
-            message += f"**Breakdown:**\n"
-            message += f"• Copay: {copay:,.2f} EGP\n"
-            message += f"• Deductible: {deductible_applied:,.2f} EGP\n"
-            message += f"• Coinsurance (20%): {coinsurance_amount:,.2f} EGP\n"
-            message += f"• **Patient Pays:** {patient_pays:,.2f} EGP\n\n"
-            
-            message += f"• **Insurance Pays:** {insurance_pays:,.2f} EGP\n\n"
-            
-            message += f"**Remaining Benefits:**\n"
-            message += f"• Deductible Remaining: {max(0, deductible_remaining - deductible_applied):,.2f} EGP\n"
-            message += f"• Out-of-Pocket Max Remaining: {max(0, oop_remaining - patient_pays):,.2f} EGP\n\n"
+            copay = float(coverage.copay or 0)
+            (
+                deductible_applied,
+                coinsurance_amount,
+                insurance_pays,
+                patient_pays,
+                deductible_remaining_after,
+                oop_remaining_after
+            ) = _compute_responsibility(
+                float(total_charges),
+                copay,
+                float(coverage.deductible or 0),
+                float(coverage.deductible_met or 0),
+                float(coverage.out_of_pocket_max or 'inf'),
+                float(coverage.out_of_pocket_met or 0)
+            )
             
-            message += "⚠️ **Note:** This is an estimate. Actual amounts may vary based on:\n"
-            message += "• In-network vs. out-of-network\n"
-            message += "• Contracted rates with provider\n"
-            message += "• Claim adjudication\n"
+            message = "".join((
+                "💰 **Estimated Patient Responsibility**\n\n",
+                f"**Total Charges:** {total_charges:,.2f} EGP\n\n",
+                "**Breakdown:**\n",
+                f"• Copay: {copay:,.2f} EGP\n",
+                f"• Deductible: {deductible_applied:,.2f} EGP\n",
+                f"• Coinsurance (20%): {coinsurance_amount:,.2f} EGP\n",
+                f"• **Patient Pays:** {patient_pays:,.2f} EGP\n\n",
+                f"• **Insurance Pays:** {insurance_pays:,.2f} EGP\n\n",
+                "**Remaining Benefits:**\n",
+                f"• Deductible Remaining: {deductible_remaining_after:,.2f} EGP\n",
+                f"• Out-of-Pocket Max Remaining: {oop_remaining_after:,.2f} EGP\n\n",
+                _ESTIMATE_NOTE,
+            ))
             
             return {
                 'found': True,
@@ -461,9 +1078,67 @@ class InsuranceVerificationAgent:
                 }
             }
         
-        except Exception as e:
-            logger.error(f"❌ Patient responsibility estimation failed: {e}", exc_info=True)
+        except _HANDLED_ERRORS as e:
+            logger.error("❌ Patient responsibility estimation failed: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return {
                 'found': False,
                 'message': f"Error estimating patient responsibility: {str(e)}"
             }
+    
+    @_with_session
+    async def estimate_patient_responsibility_bulk(
+        self,
+        charges: Sequence[float],
+        coverage_id: str,
+        db_session: Optional[AsyncSession] = None
+    ) -> Dict[str, Any]:
+        """
+        Quote many charge amounts against one coverage
+        
+        The coverage is loaded once and every charge goes through
+        estimate_responsibility_batch (parallel Numba loop when available).
+        
+        Args:
+            charges: Total charges, one per quote (e.g. procedure bundles)
+            coverage_id: Coverage ID
+            db_session: Database session (opened from the module pool if omitted)
+        
+        Returns:
+            Per-quote arrays keyed like the estimate_patient_responsibility
+            estimate, plus the remaining deductible and out-of-pocket room
+        """
+        logger.info(f"💰 Estimating patient responsibility for {len(charges)} quotes")
+        
+        try:
+            coverage = (await db_session.execute(
+                select(*_estimate_columns()).where(Coverage.id == int(coverage_id))
+            )).first()
+            if not coverage:
+                return {
+                    'found': False,
+                    'message': f"❌ Coverage not found: {coverage_id}"
+                }
+        
+        except _HANDLED_ERRORS as e:
+            logger.error("❌ Bulk responsibility estimation failed: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
+            return {
+                'found': False,
+                'message': f"Error estimating patient responsibility: {str(e)}"
+            }
+        
+        count = len(charges)
+        copay = float(coverage.copay or 0)
+        columns = estimate_responsibility_batch(
+            charges,
+            [copay] * count,
+            [float(coverage.deductible or 0)] * count,
+            [float(coverage.deductible_met or 0)] * count,
+            [float(coverage.out_of_pocket_max or 'inf')] * count,
+            [float(coverage.out_of_pocket_met or 0)] * count
+        )
+        
+        return {
+            'found': True,
+            'copay': copay,
+            'estimates': dict(zip(_BULK_ESTIMATE_KEYS, columns))
+        }
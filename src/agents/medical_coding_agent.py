@@ -3,20 +3,72 @@ Medical Coding Agent
 Helps users find ICD-10 and CPT codes using AI and database search
 """
 
+import asyncio
+import functools
+import itertools
 import logging
-from typing import List, Dict, Any, Optional
+import operator
+import re
+from typing import Iterable, List, Dict, Any, Optional
 from datetime import datetime
 
+from cachetools import LRUCache, TTLCache
 from praisonai_agents import Agent, Task
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_, func
 
 from src.models.medical_codes import ICD10Code, CPTCode, MedicalNecessityRule
-from src.services.medical_codes_service import MedicalCodesService
+from src.services.medical_codes_service import CodeIndex, MedicalCodesService
 
 logger = logging.getLogger(__name__)
 
 
+# Queries that look like (the start of) a code rather than a description
+_ICD10_CODE_QUERY = re.compile(r'[A-Z]\d[0-9A-Z.]*')
+_CPT_CODE_QUERY = re.compile(r'\d[0-9A-Z]{0,4}')
+
+# Keyword extraction: words of 4+ letters, minus common filler words
+_KEYWORD_TOKEN = re.compile(r'[A-Za-z]{4,}')
+_STOP_WORDS = frozenset({'the', 'a', 'an', 'in', 'on', 'at', 'for', 'with', 'of', 'to', 'and', 'or'})
+
+# Per-row search result templates; branches are resolved into the
+# icon/extra arguments so each row is a single format call
+_ICD10_ROW = "**{idx}. {code}** {icon}\n   {description}\n   Category: {category}\n{extra}\n".format
+_ICD10_NOT_BILLABLE = "   ⚠️ Not billable - use more specific code\n"
+_CPT_ROW = "**{idx}. {code}** - {category}\n   {description}\n{extra}\n".format
+
+
+@functools.lru_cache(maxsize=1024)
+def _keywords(text: str) -> tuple:
+    """
+    Up to five keywords from text, memoized since users often resubmit the
+    same clinical description while refining a query
+    """
+    # Simple keyword extraction (in production, use NLP)
+    words = (match.group().lower() for match in _KEYWORD_TOKEN.finditer(text))
+    return tuple(itertools.islice((w for w in words if w not in _STOP_WORDS), 5))
+
+
+def _plural(count: int) -> str:
+    """Noun suffix for count"""
+    return "" if count == 1 else "s"
+
+
+def _dedup_top(results: Iterable[Dict[str, Any]], n: int) -> List[Dict[str, Any]]:
+    """First n results with distinct codes, in order; stops once n are found"""
+    seen = set()
+    top = []
+    for result in results:
+        code = result['code']
+        if code in seen:
+            continue
+        seen.add(code)
+        top.append(result)
+        if len(top) == n:
+            break
+    return top
+
+
 class MedicalCodingAgent:
     """
     AI-powered medical coding agent
@@ -30,13 +82,34 @@ class MedicalCodingAgent:
     - Explain code meanings
     """
     
+    # get_code_details responses keyed by (code type, code), shared by all
+    # instances; cleared by MedicalCodesService.clear_code_cache() after a
+    # code table import
+    _details_cache: LRUCache = LRUCache(maxsize=4096)
+    
+    # Lazily loaded in-memory indexes per code system, shared by all
+    # instances. They expire together with the membership filters built
+    # from them, so the next search reloads both and picks up imported codes.
+    _code_indexes: TTLCache = TTLCache(maxsize=8, ttl=MedicalCodesService.CODE_FILTER_TTL)
+    
+    MedicalCodesService.register_code_cache(_details_cache)
+    MedicalCodesService.register_code_cache(_code_indexes)
+    _code_index_lock = asyncio.Lock()
+    
     def __init__(self):
         self.name = "Medical Coding Agent"
         self.agent_type = "coding"
         self.avatar = "🏥"
+    
+    @functools.cached_property
+    def agent(self) -> Agent:
+        """
+        PraisonAI agent, built on first use
         
-        # Initialize PraisonAI agent
-        self.agent = Agent(
+        Only suggest_codes needs the LLM agent, so search and validation
+        requests never pay for its construction.
+        """
+        return Agent(
             name="Medical Coding Specialist",
             role="Medical Coding Expert",
             goal="Help users find accurate ICD-10 and CPT codes for medical procedures and diagnoses",
@@ -69,7 +142,9 @@ class MedicalCodingAgent:
         
         try:
             service = MedicalCodesService(db_session)
-            results = await service.search_icd10_codes(query, limit=limit)
+            results = await self._search_local('icd10', query, service, limit)
+            if not results:
+                results = await service.search_icd10_codes(query, limit=limit)
             
             if not results:
                 return {
@@ -82,33 +157,25 @@ class MedicalCodingAgent:
                     'results': []
                 }
             
-            # Format results for display
-            formatted_results = []
-            for code in results:
-                formatted_results.append({
-                    'code': code['code'],
-                    'description': code['description'],
-                    'category': code['category'],
-                    'billable': code['billable'],
-                    'valid_for_coding': code['valid_for_coding']
-                })
-            
-            message = f"📋 **Found {len(results)} ICD-10 code{'' if len(results) == 1 else 's'}:**\n\n"
-            
-            for idx, code in enumerate(formatted_results, 1):
-                billable_icon = "✅" if code['billable'] else "⚠️"
-                message += f"**{idx}. {code['code']}** {billable_icon}\n"
-                message += f"   {code['description']}\n"
-                message += f"   Category: {code['category']}\n"
-                if not code['billable']:
-                    message += f"   ⚠️ Not billable - use more specific code\n"
-                message += "\n"
+            count = len(results)
+            header = f"📋 **Found {count} ICD-10 code{_plural(count)}:**\n\n"
+            rows = [
+                _ICD10_ROW(
+                    idx=idx,
+                    code=code['code'],
+                    icon="✅" if code['billable'] else "⚠️",
+                    description=code['description'],
+                    category=code['category'],
+                    extra="" if code['billable'] else _ICD10_NOT_BILLABLE
+                )
+                for idx, code in enumerate(results, 1)
+            ]
             
             return {
                 'found': True,
-                'message': message,
-                'results': formatted_results,
-                'count': len(results)
+                'message': header + "".join(rows),
+                'results': results,
+                'count': count
             }
         
         except Exception as e:
@@ -142,7 +209,9 @@ class MedicalCodingAgent:
         
         try:
             service = MedicalCodesService(db_session)
-            results = await service.search_cpt_codes(query, category=category, limit=limit)
+            results = await self._search_local('cpt', query, service, limit, category)
+            if not results:
+                results = await service.search_cpt_codes(query, category=category, limit=limit)
             
             if not results:
                 return {
@@ -155,31 +224,24 @@ class MedicalCodingAgent:
                     'results': []
                 }
             
-            # Format results
-            formatted_results = []
-            for code in results:
-                formatted_results.append({
-                    'code': code['code'],
-                    'description': code['description'],
-                    'category': code['category'],
-                    'rvu': code.get('rvu', 0),
-                    'work_rvu': code.get('work_rvu', 0)
-                })
-            
-            message = f"📋 **Found {len(results)} CPT code{'' if len(results) == 1 else 's'}:**\n\n"
-            
-            for idx, code in enumerate(formatted_results, 1):
-                message += f"**{idx}. {code['code']}** - {code['category']}\n"
-                message += f"   {code['description']}\n"
-                if code['rvu'] > 0:
-                    message += f"   RVU: {code['rvu']:.2f}\n"
-                message += "\n"
+            count = len(results)
+            header = f"📋 **Found {count} CPT code{_plural(count)}:**\n\n"
+            rows = [
+                _CPT_ROW(
+                    idx=idx,
+                    code=code['code'],
+                    category=code['category'],
+                    description=code['description'],
+                    extra=f"   RVU: {code['rvu']:.2f}\n" if code.get('rvu') else ""
+                )
+                for idx, code in enumerate(results, 1)
+            ]
             
             return {
                 'found': True,
-                'message': message,
-                'results': formatted_results,
-                'count': len(results)
+                'message': header + "".join(rows),
+                'results': results,
+                'count': count
             }
         
         except Exception as e:
@@ -190,6 +252,48 @@ class MedicalCodingAgent:
                 'results': []
             }
     
+    async def _search_local(
+        self,
+        code_type: str,
+        query: str,
+        service: MedicalCodesService,
+        limit: int,
+        category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the in-memory index for a code system, loading it on first use
+        
+        Code-like queries are treated as code prefixes, anything else as
+        description words.
+        """
+        index = self._code_indexes.get(code_type)
+        if index is None:
+            async with self._code_index_lock:
+                index = self._code_indexes.get(code_type)
+                if index is None:
+                    if code_type == 'icd10':
+                        rows = await service.load_all_icd10()
+                    else:
+                        rows = await service.load_all_cpt()
+                    index = self._code_indexes[code_type] = CodeIndex(
+                        rows, operator.itemgetter('code'), operator.itemgetter('description')
+                    )
+                    # The full code list doubles as the service's negative
+                    # lookup filter for validations
+                    MedicalCodesService.set_code_filter(code_type, index.codes)
+                    logger.info(f"📚 Indexed {len(rows)} {code_type.upper()} codes in memory")
+        
+        normalized = query.strip().upper()
+        code_query = _ICD10_CODE_QUERY if code_type == 'icd10' else _CPT_CODE_QUERY
+        if code_query.fullmatch(normalized):
+            matches = index.by_prefix(normalized)
+        else:
+            matches = index.by_words(query)
+        
+        if category:
+            matches = (row for row in matches if row['category'] == category)
+        return list(itertools.islice(matches, limit))
+    
     async def validate_code_pair(
         self,
         icd10_code: str,
@@ -212,9 +316,15 @@ class MedicalCodingAgent:
         try:
             service = MedicalCodesService(db_session)
             
-            # Validate both codes exist
-            icd_valid, icd_info = await service.validate_icd10_code(icd10_code)
-            cpt_valid, cpt_info = await service.validate_cpt_code(cpt_code)
+            # Validate both codes exist; the lookups are independent, so the
+            # CPT one runs concurrently on its own session
+            async with AsyncSession(db_session.bind, expire_on_commit=False) as cpt_session:
+                icd_info, cpt_info = await asyncio.gather(
+                    service.validate_icd10_code(icd10_code),
+                    MedicalCodesService(cpt_session).validate_cpt_code(cpt_code)
+                )
+            icd_valid = icd_info['valid']
+            cpt_valid = cpt_info['valid']
             
             if not icd_valid:
                 return {
@@ -233,30 +343,32 @@ class MedicalCodingAgent:
             # Check medical necessity
             is_necessary = await service.check_medical_necessity(icd10_code, cpt_code)
             
-            message = f"**Code Validation:**\n\n"
-            message += f"✅ **ICD-10:** {icd10_code}\n"
-            message += f"   {icd_info['description']}\n\n"
-            message += f"✅ **CPT:** {cpt_code}\n"
-            message += f"   {cpt_info['description']}\n\n"
+            parts = [
+                "**Code Validation:**\n\n",
+                f"✅ **ICD-10:** {icd10_code}\n",
+                f"   {icd_info['description']}\n\n",
+                f"✅ **CPT:** {cpt_code}\n",
+                f"   {cpt_info['description']}\n\n"
+            ]
             
             if is_necessary:
-                message += "✅ **Medical Necessity:** SUPPORTED\n"
-                message += "This code combination is medically appropriate and should be covered."
+                parts.append("✅ **Medical Necessity:** SUPPORTED\n")
+                parts.append("This code combination is medically appropriate and should be covered.")
             else:
-                message += "⚠️ **Medical Necessity:** NOT VERIFIED\n"
-                message += "This combination may require additional documentation or may not be covered.\n\n"
+                parts.append("⚠️ **Medical Necessity:** NOT VERIFIED\n")
+                parts.append("This combination may require additional documentation or may not be covered.\n\n")
                 
                 # Get suggested procedures
                 suggestions = await service.get_suggested_procedures(icd10_code)
                 if suggestions:
-                    message += "**Suggested procedures for this diagnosis:**\n"
-                    for sugg in suggestions[:3]:
-                        message += f"• {sugg['code']} - {sugg['description']}\n"
+                    parts.append("**Suggested procedures for this diagnosis:**\n")
+                    for sugg in itertools.islice(suggestions, 3):
+                        parts.append(f"• {sugg['code']} - {sugg['description']}\n")
             
             return {
                 'valid': True,
                 'medically_necessary': is_necessary,
-                'message': message,
+                'message': "".join(parts),
                 'details': {
                     'icd10': icd_info,
                     'cpt': cpt_info,
@@ -308,50 +420,51 @@ class MedicalCodingAgent:
             # For now, extract keywords manually
             keywords = self._extract_keywords(clinical_description)
             
-            service = MedicalCodesService(db_session)
-            
-            # Search for relevant codes
-            icd_results = []
-            cpt_results = []
-            
-            for keyword in keywords[:3]:  # Top 3 keywords
-                icd = await service.search_icd10_codes(keyword, limit=3)
-                cpt = await service.search_cpt_codes(keyword, limit=3)
-                icd_results.extend(icd)
-                cpt_results.extend(cpt)
+            # Search for relevant codes: one query per code system over the
+            # top 3 keywords, run concurrently. AsyncSession is not safe for
+            # concurrent use, so the CPT search gets its own session.
+            async with AsyncSession(db_session.bind, expire_on_commit=False) as cpt_session:
+                icd_results, cpt_results = await asyncio.gather(
+                    MedicalCodesService(db_session).search_icd10_codes_multi(keywords[:3], limit=15),
+                    MedicalCodesService(cpt_session).search_cpt_codes_multi(keywords[:3], limit=15)
+                )
             
-            # Remove duplicates
-            icd_unique = {code['code']: code for code in icd_results}.values()
-            cpt_unique = {code['code']: code for code in cpt_results}.values()
+            # Remove duplicates, keeping the top 5 of each
+            icd_unique = _dedup_top(icd_results, 5)
+            cpt_unique = _dedup_top(cpt_results, 5)
             
-            message = f"💡 **Code Suggestions:**\n\n"
-            message += f"Based on: _{clinical_description[:100]}..._\n\n"
+            parts = [
+                "💡 **Code Suggestions:**\n\n",
+                f"Based on: _{clinical_description[:100]}..._\n\n"
+            ]
             
             if icd_unique:
-                message += "**ICD-10 Diagnosis Codes:**\n"
-                for idx, code in enumerate(list(icd_unique)[:5], 1):
-                    message += f"{idx}. **{code['code']}** - {code['description']}\n"
-                message += "\n"
+                parts.append("**ICD-10 Diagnosis Codes:**\n")
+                for idx, code in enumerate(icd_unique, 1):
+                    parts.append(f"{idx}. **{code['code']}** - {code['description']}\n")
+                parts.append("\n")
             
             if cpt_unique:
-                message += "**CPT Procedure Codes:**\n"
-                for idx, code in enumerate(list(cpt_unique)[:5], 1):
-                    message += f"{idx}. **{code['code']}** - {code['description']}\n"
-                message += "\n"
+                parts.append("**CPT Procedure Codes:**\n")
+                for idx, code in enumerate(cpt_unique, 1):
+                    parts.append(f"{idx}. **{code['code']}** - {code['description']}\n")
+                parts.append("\n")
             
             if not icd_unique and not cpt_unique:
-                message += "⚠️ No matching codes found. Try:\n"
-                message += "• Being more specific\n"
-                message += "• Using medical terminology\n"
-                message += "• Describing the condition differently\n"
+                parts.append(
+                    "⚠️ No matching codes found. Try:\n"
+                    "• Being more specific\n"
+                    "• Using medical terminology\n"
+                    "• Describing the condition differently\n"
+                )
             else:
-                message += "💡 **Tip:** Validate code combinations for medical necessity before billing."
+                parts.append("💡 **Tip:** Validate code combinations for medical necessity before billing.")
             
             return {
                 'found': len(icd_unique) > 0 or len(cpt_unique) > 0,
-                'message': message,
-                'icd10_codes': list(icd_unique),
-                'cpt_codes': list(cpt_unique)
+                'message': "".join(parts),
+                'icd10_codes': icd_unique,
+                'cpt_codes': cpt_unique
             }
         
         except Exception as e:
@@ -365,13 +478,7 @@ class MedicalCodingAgent:
     
     def _extract_keywords(self, text: str) -> List[str]:
         """Extract medical keywords from text"""
-        # Simple keyword extraction (in production, use NLP)
-        common_words = {'the', 'a', 'an', 'in', 'on', 'at', 'for', 'with', 'of', 'to', 'and', 'or'}
-        
-        words = text.lower().split()
-        keywords = [w for w in words if len(w) > 3 and w not in common_words]
-        
-        return keywords[:5]
+        return list(_keywords(text))
     
     async def get_code_details(
         self,
@@ -392,65 +499,26 @@ class MedicalCodingAgent:
         """
         logger.info(f"📖 Getting details for {code_type.upper()} code: {code}")
         
-        try:
-            service = MedicalCodesService(db_session)
-            
-            if code_type.lower() == 'icd10':
-                is_valid, info = await service.validate_icd10_code(code)
-                
-                if not is_valid:
-                    return {
-                        'found': False,
-                        'message': f"❌ ICD-10 code **{code}** not found in database."
-                    }
-                
-                message = f"📖 **ICD-10 Code Details:**\n\n"
-                message += f"**Code:** {info['code']}\n"
-                message += f"**Description:** {info['description']}\n"
-                message += f"**Category:** {info['category']}\n"
-                message += f"**Subcategory:** {info.get('subcategory', 'N/A')}\n"
-                message += f"**Billable:** {'✅ Yes' if info['billable'] else '⚠️ No'}\n"
-                message += f"**Valid for Coding:** {'✅ Yes' if info['valid_for_coding'] else '❌ No'}\n\n"
-                
-                if not info['billable']:
-                    message += "⚠️ **Note:** This code is not billable. You need to use a more specific code.\n"
-                
-                # Get related procedures
-                suggestions = await service.get_suggested_procedures(code)
-                if suggestions:
-                    message += f"\n**Common procedures for this diagnosis:**\n"
-                    for sugg in suggestions[:5]:
-                        message += f"• {sugg['code']} - {sugg['description']}\n"
-            
-            elif code_type.lower() == 'cpt':
-                is_valid, info = await service.validate_cpt_code(code)
-                
-                if not is_valid:
-                    return {
-                        'found': False,
-                        'message': f"❌ CPT code **{code}** not found in database."
-                    }
-                
-                message = f"📖 **CPT Code Details:**\n\n"
-                message += f"**Code:** {info['code']}\n"
-                message += f"**Description:** {info['description']}\n"
-                message += f"**Category:** {info['category']}\n"
-                message += f"**RVU:** {info.get('rvu', 0):.2f}\n"
-                message += f"**Facility RVU:** {info.get('facility_rvu', 0):.2f}\n"
-                message += f"**Non-Facility RVU:** {info.get('non_facility_rvu', 0):.2f}\n"
-            
-            else:
-                return {
-                    'found': False,
-                    'message': f"❌ Invalid code type: {code_type}. Must be 'icd10' or 'cpt'."
-                }
-            
+        normalized_type = code_type.lower()
+        handler = self._DETAIL_HANDLERS.get(normalized_type)
+        if handler is None:
             return {
-                'found': True,
-                'message': message,
-                'details': info
+                'found': False,
+                'message': f"❌ Invalid code type: {code_type}. Must be 'icd10' or 'cpt'."
             }
         
+        cache_key = (normalized_type, code.strip().upper())
+        cached = self._details_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
+        try:
+            details = await handler(self, MedicalCodesService(db_session), code)
+            if details['found']:
+                self._details_cache[cache_key] = details
+                return dict(details)
+            return details
+        
         except Exception as e:
             logger.error(f"❌ Failed to get code details: {e}", exc_info=True)
             return {
@@ -458,6 +526,71 @@ class MedicalCodingAgent:
                 'message': f"Error retrieving code details: {str(e)}"
             }
     
+    async def _icd10_details(self, service: MedicalCodesService, code: str) -> Dict[str, Any]:
+        """get_code_details response for an ICD-10 code"""
+        info = await service.validate_icd10_code(code)
+        
+        if not info['valid']:
+            return {
+                'found': False,
+                'message': f"❌ ICD-10 code **{code}** not found in database."
+            }
+        
+        parts = [
+            "📖 **ICD-10 Code Details:**\n\n",
+            f"**Code:** {info['code']}\n",
+            f"**Description:** {info['description']}\n",
+            f"**Category:** {info['category']}\n",
+            f"**Subcategory:** {info.get('subcategory', 'N/A')}\n",
+            f"**Billable:** {'✅ Yes' if info['billable'] else '⚠️ No'}\n",
+            f"**Valid for Coding:** {'✅ Yes' if info['valid_for_coding'] else '❌ No'}\n\n"
+        ]
+        
+        if not info['billable']:
+            parts.append("⚠️ **Note:** This code is not billable. You need to use a more specific code.\n")
+        
+        # Get related procedures
+        suggestions = await service.get_suggested_procedures(code)
+        if suggestions:
+            parts.append("\n**Common procedures for this diagnosis:**\n")
+            for sugg in itertools.islice(suggestions, 5):
+                parts.append(f"• {sugg['code']} - {sugg['description']}\n")
+        
+        return {
+            'found': True,
+            'message': "".join(parts),
+            'details': info
+        }
+    
+    async def _cpt_details(self, service: MedicalCodesService, code: str) -> Dict[str, Any]:
+        """get_code_details response for a CPT code"""
+        info = await service.validate_cpt_code(code)
+        
+        if not info['valid']:
+            return {
+                'found': False,
+                'message': f"❌ CPT code **{code}** not found in database."
+            }
+        
+        parts = [
+            "📖 **CPT Code Details:**\n\n",
+            f"**Code:** {info['code']}\n",
+            f"**Description:** {info['description']}\n",
+            f"**Category:** {info['category']}\n",
+            f"**RVU:** {info.get('rvu', 0):.2f}\n",
+            f"**Facility RVU:** {info.get('facility_rvu', 0):.2f}\n",
+            f"**Non-Facility RVU:** {info.get('non_facility_rvu', 0):.2f}\n"
+        ]
+        
+        return {
+            'found': True,
+            'message': "".join(parts),
+            'details': info
+        }
+    
+    # get_code_details dispatch by lower-cased code type
+    _DETAIL_HANDLERS = {'icd10': _icd10_details, 'cpt': _cpt_details}
+    
     async def batch_validate(
         self,
         icd10_codes: List[str],
@@ -484,41 +617,44 @@ class MedicalCodingAgent:
                 cpt_codes=cpt_codes
             )
             
-            message = f"📋 **Batch Validation Results:**\n\n"
+            parts = ["📋 **Batch Validation Results:**\n\n"]
+            
+            # Valid counts for the summary are tallied while formatting
+            icd_valid = 0
+            cpt_valid = 0
             
             # ICD-10 results
             if icd10_codes:
-                message += "**ICD-10 Codes:**\n"
+                parts.append("**ICD-10 Codes:**\n")
+                icd_results = results['icd10']
                 for code in icd10_codes:
-                    result = results['icd10'].get(code, {})
-                    if result.get('valid'):
-                        message += f"✅ {code} - Valid\n"
+                    if icd_results.get(code, {}).get('valid'):
+                        icd_valid += 1
+                        parts.append(f"✅ {code} - Valid\n")
                     else:
-                        message += f"❌ {code} - Invalid\n"
-                message += "\n"
+                        parts.append(f"❌ {code} - Invalid\n")
+                parts.append("\n")
             
             # CPT results
             if cpt_codes:
-                message += "**CPT Codes:**\n"
+                parts.append("**CPT Codes:**\n")
+                cpt_results = results['cpt']
                 for code in cpt_codes:
-                    result = results['cpt'].get(code, {})
-                    if result.get('valid'):
-                        message += f"✅ {code} - Valid\n"
+                    if cpt_results.get(code, {}).get('valid'):
+                        cpt_valid += 1
+                        parts.append(f"✅ {code} - Valid\n")
                     else:
-                        message += f"❌ {code} - Invalid\n"
-                message += "\n"
+                        parts.append(f"❌ {code} - Invalid\n")
+                parts.append("\n")
             
             # Summary
-            icd_valid = sum(1 for r in results['icd10'].values() if r.get('valid'))
-            cpt_valid = sum(1 for r in results['cpt'].values() if r.get('valid'))
-            
-            message += f"**Summary:**\n"
-            message += f"• ICD-10: {icd_valid}/{len(icd10_codes)} valid\n"
-            message += f"• CPT: {cpt_valid}/{len(cpt_codes)} valid\n"
+            parts.append("**Summary:**\n")
+            parts.append(f"• ICD-10: {icd_valid}/{len(icd10_codes)} valid\n")
+            parts.append(f"• CPT: {cpt_valid}/{len(cpt_codes)} valid\n")
             
             return {
                 'success': True,
-                'message': message,
+                'message': "".join(parts),
                 'results': results,
                 'summary': {
                     'icd10_valid': icd_valid,
@@ -2,20 +2,51 @@
 Payment Posting Agent
 Processes ERAs, posts payments, reconciles accounts, and identifies variances
 """
-from praisonaiagents import Agent, Task, Tool
-from typing import Dict, Any, List, Optional
+from praisonaiagents import Agent, Task
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
+from enum import Enum
 from pydantic import BaseModel, Field
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
+from cachetools import LRUCache
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import hashlib
+import io
 import json
 import logging
+import os
+import threading
+
+try:
+    from praisonaiagents import Tool
+except ImportError:
+    class Tool:
+        """Minimal stand-in so the tools can parse and post ERAs without praisonaiagents' Tool"""
+        name = ""
+        description = ""
+        
+        def __init__(self, *args, **kwargs):
+            pass
+
+try:
+    from blake3 import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 
 # ===== Data Models =====
 
-class PaymentType(str):
+class PaymentType(str, Enum):
     """Payment types"""
     PATIENT = "patient"
     INSURANCE = "insurance"
@@ -24,7 +55,7 @@ class PaymentType(str):
     WRITEOFF = "writeoff"
 
 
-class AdjustmentReason(str):
+class AdjustmentReason(str, Enum):
     """Adjustment reason codes"""
     CONTRACTUAL = "contractual_adjustment"
     DEDUCTIBLE = "patient_deductible"
@@ -121,6 +152,93 @@ class ReconciliationReport(BaseModel):
         }
 
 
+# ===== X12 Parsing =====
+
+def _iter_segments(content: Union[str, bytes]) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yield (segment ID, elements) for each '~'-terminated segment of an 835
+    
+    Walks the content once with find() rather than splitting it into a list
+    of every segment up front, so only one segment is materialized at a
+    time. Uploaded files can be passed as UTF-8 bytes; each segment is then
+    decoded as it is reached instead of decoding the whole file.
+    """
+    is_bytes = isinstance(content, bytes)
+    find = content.find
+    terminator = b'~' if is_bytes else '~'
+    pos = 0
+    end = len(content)
+    while pos <= end:
+        stop = find(terminator, pos)
+        if stop < 0:
+            stop = end
+        segment = content[pos:stop]
+        if is_bytes:
+            segment = segment.decode('utf-8')
+        segments = segment.split('*')
+        yield segments[0], segments
+        pos = stop + 1
+
+
+def _content_digest(content: Union[str, bytes]) -> bytes:
+    """128-bit digest of ERA content, with BLAKE3 when installed"""
+    data = content if isinstance(content, bytes) else content.encode()
+    if BLAKE3_AVAILABLE:
+        return blake3(data).digest(length=16)
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+# ===== Amount Columns =====
+
+_CENT = Decimal("0.01")
+_ZERO = Decimal("0")
+_VARIANCE_THRESHOLD = Decimal("1.00")  # 1 EGP
+
+
+def _to_dec(value: Any) -> Decimal:
+    """
+    Monetary value as a Decimal
+    
+    Decimals pass through and ints convert exactly; only floats (and
+    strings) go through str() so 0.1 stays 0.1 rather than its binary
+    expansion.
+    """
+    if type(value) is Decimal:
+        return value
+    if type(value) is int:
+        return Decimal(value)
+    return Decimal(str(value))
+
+
+def _cents(amount: Any) -> int:
+    """Monetary amount as integer cents"""
+    return int(_to_dec(amount).quantize(_CENT, ROUND_HALF_UP).scaleb(2))
+
+
+def _amount_columns(rows: List[Dict], fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Column per monetary field over rows, in integer cents
+    
+    Columns are int64 arrays so totals and comparisons are single NumPy
+    reductions, or lists of int when NumPy is not installed. Convert back
+    with _from_cents only where a Decimal leaves the tool.
+    """
+    columns = {field: [_cents(row.get(field) or 0) for row in rows] for field in fields}
+    if NUMPY_AVAILABLE:
+        return {field: np.asarray(column, dtype=np.int64) for field, column in columns.items()}
+    return columns
+
+
+def _total_cents(column: Any) -> int:
+    """Sum of an _amount_columns column"""
+    return int(column.sum()) if NUMPY_AVAILABLE else sum(column)
+
+
+def _from_cents(cents: int) -> Decimal:
+    """Integer cents back to a two-place Decimal"""
+    return Decimal(cents).scaleb(-2)
+
+
 # ===== Tools =====
 
 class ERAProcessingTool(Tool):
@@ -130,9 +248,25 @@ class ERAProcessingTool(Tool):
     description = """Parse ERA file and extract payment information for posting.
     Returns structured payment data ready for posting."""
     
+    # Stored ERAs by content digest -> (parsed ERA, era_id), shared by all
+    # instances. Replays and retries of the same file skip parsing and get
+    # the original era_id back instead of being stored (and posted) twice.
+    # Cached ERAs are shared, so treat them as read-only.
+    _processed: LRUCache = LRUCache(maxsize=256)
+    _processed_lock = threading.Lock()
+    
     def __init__(self, db_session):
         super().__init__()
         self.db = db_session
+        
+        # Segment ID -> bound handler; segments without one are skipped
+        self._segment_handlers = {
+            "BPR": self._handle_bpr,
+            "N1": self._handle_n1,
+            "CLP": self._handle_clp,
+            "SVC": self._handle_svc,
+            "CAS": self._handle_cas,
+        }
     
     def _run(self, query: str) -> Dict[str, Any]:
         """Process ERA file"""
@@ -141,6 +275,20 @@ class ERAProcessingTool(Tool):
             era_content = data.get("era_content", "")
             era_format = data.get("format", "835")  # X12 835 standard
             
+            content_hash = _content_digest(era_content)
+            with self._processed_lock:
+                processed = self._processed.get(content_hash)
+            if processed is not None:
+                parsed_era, era_id = processed
+                return {
+                    "status": "success",
+                    "era": parsed_era,
+                    "era_id": era_id,
+                    "claims_count": len(parsed_era["claims"]),
+                    "total_amount": float(parsed_era["check_amount"]),
+                    "duplicate": True
+                }
+            
             # Parse ERA content
             if era_format == "835":
                 parsed_era = self._parse_x12_835(era_content)
@@ -158,9 +306,13 @@ class ERAProcessingTool(Tool):
                     "error": "ERA validation failed",
                     "details": validation["errors"]
                 }
+            # Parser bookkeeping for _validate_era, not part of the ERA
+            parsed_era.pop("_paid_cents", None)
             
             # Store ERA
-            era_id = self._store_era(parsed_era)
+            era_id = self._store_era(parsed_era, content_hash)
+            with self._processed_lock:
+                self._processed[content_hash] = (parsed_era, era_id)
             
             return {
                 "status": "success",
@@ -177,81 +329,84 @@ class ERAProcessingTool(Tool):
                 "error": str(e)
             }
     
-    def _parse_x12_835(self, content: str) -> Dict[str, Any]:
+    def _parse_x12_835(self, content: Union[str, bytes]) -> Dict[str, Any]:
         """Parse X12 835 ERA format"""
         # Simplified parser - in production, use a library like pyx12
-        lines = content.strip().split('~')
-        
         era_data = {
             "payer_id": "",
             "payer_name": "",
             "check_number": "",
             "check_date": datetime.now(),
             "check_amount": Decimal("0.00"),
-            "claims": []
+            "claims": [],
+            # Running total of claim paid amounts for _validate_era
+            "_paid_cents": 0
         }
         
-        current_claim = None
-        
-        for line in lines:
-            segments = line.split('*')
-            segment_id = segments[0] if segments else ""
-            
-            # BPR - Financial Information
-            if segment_id == "BPR":
-                era_data["check_amount"] = Decimal(segments[2])
-                era_data["check_date"] = self._parse_date(segments[16])
-                
-            # N1 - Payer Identification
-            elif segment_id == "N1" and segments[1] == "PR":
-                era_data["payer_name"] = segments[2]
-                era_data["payer_id"] = segments[4] if len(segments) > 4 else ""
-            
-            # CLP - Claim Payment Information
-            elif segment_id == "CLP":
-                if current_claim:
-                    era_data["claims"].append(current_claim)
-                
-                current_claim = {
-                    "claim_id": segments[1],
-                    "claim_status": segments[2],
-                    "billed_amount": Decimal(segments[3]),
-                    "paid_amount": Decimal(segments[4]),
-                    "patient_responsibility": Decimal(segments[5]) if len(segments) > 5 else Decimal("0"),
-                    "service_lines": []
-                }
-            
-            # SVC - Service Payment Information
-            elif segment_id == "SVC" and current_claim:
-                service_line = {
-                    "procedure_code": segments[1].split(':')[1] if ':' in segments[1] else segments[1],
-                    "billed_amount": Decimal(segments[2]),
-                    "paid_amount": Decimal(segments[3]),
-                    "units": int(segments[5]) if len(segments) > 5 else 1
-                }
-                current_claim["service_lines"].append(service_line)
-            
-            # CAS - Claim Adjustment
-            elif segment_id == "CAS" and current_claim:
-                adjustment = {
-                    "group_code": segments[1],
-                    "reason_code": segments[2],
-                    "amount": Decimal(segments[3])
-                }
-                if "adjustments" not in current_claim:
-                    current_claim["adjustments"] = []
-                current_claim["adjustments"].append(adjustment)
+        # Claim that SVC/CAS segments currently attach to
+        state = {"claim": None}
+        handlers = self._segment_handlers
         
-        # Add last claim
-        if current_claim:
-            era_data["claims"].append(current_claim)
+        for segment_id, segments in _iter_segments(content.strip()):
+            handler = handlers.get(segment_id)
+            if handler is not None:
+                handler(segments, era_data, state)
         
         return era_data
     
+    def _handle_bpr(self, segments: List[str], era_data: Dict, state: Dict) -> None:
+        """BPR - Financial Information"""
+        era_data["check_amount"] = Decimal(segments[2])
+        era_data["check_date"] = self._parse_date(segments[16])
+    
+    def _handle_n1(self, segments: List[str], era_data: Dict, state: Dict) -> None:
+        """N1 - Payer Identification"""
+        if segments[1] == "PR":
+            era_data["payer_name"] = segments[2]
+            era_data["payer_id"] = segments[4] if len(segments) > 4 else ""
+    
+    def _handle_clp(self, segments: List[str], era_data: Dict, state: Dict) -> None:
+        """CLP - Claim Payment Information"""
+        claim = {
+            "claim_id": segments[1],
+            "claim_status": segments[2],
+            "billed_amount": Decimal(segments[3]),
+            "paid_amount": Decimal(segments[4]),
+            "patient_responsibility": Decimal(segments[5]) if len(segments) > 5 else Decimal("0"),
+            "service_lines": []
+        }
+        era_data["claims"].append(claim)
+        era_data["_paid_cents"] += _cents(claim["paid_amount"])
+        state["claim"] = claim
+    
+    def _handle_svc(self, segments: List[str], era_data: Dict, state: Dict) -> None:
+        """SVC - Service Payment Information"""
+        claim = state["claim"]
+        if claim:
+            procedure = segments[1]
+            claim["service_lines"].append({
+                "procedure_code": procedure.split(':')[1] if ':' in procedure else procedure,
+                "billed_amount": Decimal(segments[2]),
+                "paid_amount": Decimal(segments[3]),
+                "units": int(segments[5]) if len(segments) > 5 else 1
+            })
+    
+    def _handle_cas(self, segments: List[str], era_data: Dict, state: Dict) -> None:
+        """CAS - Claim Adjustment"""
+        claim = state["claim"]
+        if claim:
+            claim.setdefault("adjustments", []).append({
+                "group_code": segments[1],
+                "reason_code": segments[2],
+                "amount": Decimal(segments[3])
+            })
+    
     def _parse_date(self, date_str: str) -> datetime:
         """Parse date from ERA format"""
         try:
-            # Common formats: CCYYMMDD
+            # Common formats: CCYYMMDD, sliced directly when it has that shape
+            if len(date_str) == 8 and date_str.isascii() and date_str.isdigit():
+                return datetime(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:]))
             return datetime.strptime(date_str, "%Y%m%d")
         except:
             return datetime.now()
@@ -269,27 +424,40 @@ class ERAProcessingTool(Tool):
         if not era_data.get("claims"):
             errors.append("No claims found in ERA")
         
-        # Validate total
-        claims_total = sum(
-            Decimal(str(claim.get("paid_amount", 0)))
-            for claim in era_data.get("claims", [])
-        )
+        # Validate total, in cents; one cent of rounding is tolerated. The
+        # parsers accumulate it while reading CLP segments.
+        claims_total_cents = era_data.get("_paid_cents")
+        if claims_total_cents is None:
+            paid = _amount_columns(era_data.get("claims", []), ("paid_amount",))["paid_amount"]
+            claims_total_cents = _total_cents(paid)
         
-        if abs(claims_total - era_data.get("check_amount", 0)) > Decimal("0.01"):
-            errors.append(f"Check amount mismatch: {era_data.get('check_amount')} vs {claims_total}")
+        if abs(claims_total_cents - _cents(era_data.get("check_amount") or 0)) > 1:
+            errors.append(
+                f"Check amount mismatch: {era_data.get('check_amount')} vs {_from_cents(claims_total_cents)}"
+            )
         
         return {
             "valid": len(errors) == 0,
             "errors": errors
         }
     
-    def _store_era(self, era_data: Dict) -> str:
+    def _store_era(self, era_data: Dict, content_hash: bytes) -> str:
         """Store ERA in database"""
-        era_id = f"ERA-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        # In production, save to database
+        # The digest suffix keeps ERAs stored within the same second apart
+        era_id = f"ERA-{datetime.now().strftime('%Y%m%d%H%M%S')}-{content_hash[:4].hex()}"
+        # In production, save to database with a UNIQUE content_hash column,
+        # INSERT ... ON CONFLICT (content_hash) DO NOTHING RETURNING era_id,
+        # so a file already stored by another process is not stored again
         return era_id
 
 
+_COPY_POSTINGS = (
+    "COPY payment_postings (posting_id, era_id, claim_id, payment_type, payment_date, "
+    "payment_amount, payment_method, check_number, adjustments, patient_balance, "
+    "insurance_balance, total_balance, posted_by, posted_at) FROM STDIN WITH CSV"
+)
+
+
 class PaymentPostingTool(Tool):
     """Post payments and adjustments to patient accounts"""
     
@@ -308,7 +476,7 @@ class PaymentPostingTool(Tool):
             
             claim_id = data["claim_id"]
             payment_type = data["payment_type"]
-            payment_amount = Decimal(str(data["payment_amount"]))
+            payment_amount = _to_dec(data["payment_amount"])
             payment_date = datetime.fromisoformat(data.get("payment_date", datetime.now().isoformat()))
             adjustments = data.get("adjustments", [])
             
@@ -352,7 +520,7 @@ class PaymentPostingTool(Tool):
                 "new_insurance_balance": float(new_balances["insurance"]),
                 "total_balance": float(new_balances["total"]),
                 "variance": variance,
-                "posting_details": posting.dict()
+                "posting_details": PaymentPosting(**posting).model_dump(mode="json")
             }
             
         except Exception as e:
@@ -380,24 +548,30 @@ class PaymentPostingTool(Tool):
         payment_date: datetime,
         adjustments: List[Dict],
         data: Dict
-    ) -> PaymentPosting:
-        """Create payment posting record"""
+    ) -> Dict[str, Any]:
+        """
+        Create payment posting record
+        
+        Postings are plain dicts with the PaymentPosting fields; the model is
+        only built where a posting leaves the tool.
+        """
         posting_id = f"POST-{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
-        return PaymentPosting(
-            posting_id=posting_id,
-            claim_id=claim_id,
-            payment_type=payment_type,
-            payment_date=payment_date,
-            payment_amount=amount,
-            payment_method=data.get("payment_method", "check"),
-            check_number=data.get("check_number"),
-            adjustments=adjustments,
-            patient_balance=Decimal("0"),  # Will be updated
-            insurance_balance=Decimal("0"),  # Will be updated
-            total_balance=Decimal("0"),  # Will be updated
-            posted_by=data.get("posted_by", "system")
-        )
+        return {
+            "posting_id": posting_id,
+            "claim_id": claim_id,
+            "payment_type": payment_type,
+            "payment_date": payment_date,
+            "payment_amount": amount,
+            "payment_method": data.get("payment_method", "check"),
+            "check_number": data.get("check_number"),
+            "adjustments": adjustments,
+            "patient_balance": _ZERO,  # Will be updated
+            "insurance_balance": _ZERO,  # Will be updated
+            "total_balance": _ZERO,  # Will be updated
+            "posted_by": data.get("posted_by", "system"),
+            "posted_at": datetime.now()
+        }
     
     def _update_balances(
         self,
@@ -417,7 +591,7 @@ class PaymentPostingTool(Tool):
         
         # Apply adjustments
         for adj in adjustments:
-            adj_amount = Decimal(str(adj.get("amount", 0)))
+            adj_amount = _to_dec(adj.get("amount", 0))
             adj_reason = adj.get("reason", "")
             
             if "contractual" in adj_reason.lower():
@@ -443,12 +617,12 @@ class PaymentPostingTool(Tool):
         adjustments: List[Dict]
     ) -> Optional[Dict[str, Any]]:
         """Check for payment variance"""
-        expected = current_balance.get("insurance", Decimal("0"))
+        expected = current_balance.get("insurance", _ZERO)
         actual = payment_amount
         
         variance = expected - actual
         
-        if abs(variance) > Decimal("1.00"):  # Threshold: 1 EGP
+        if abs(variance) > _VARIANCE_THRESHOLD:
             return {
                 "has_variance": True,
                 "expected": float(expected),
@@ -459,14 +633,110 @@ class PaymentPostingTool(Tool):
         
         return {"has_variance": False}
     
-    def _save_posting(self, posting: PaymentPosting, balances: Dict) -> str:
+    def post_era(self, era_id: str, era: Dict[str, Any], posted_by: str = "system") -> List[str]:
+        """
+        Post the insurance payment of every claim in a processed ERA
+        
+        All postings are built first and written with one post_era_batch
+        call instead of one save per claim.
+        
+        Returns:
+            Posting IDs, in claim order
+        """
+        postings = self._era_postings(era_id, era, posted_by)
+        self.post_era_batch(era_id, postings)
+        return [posting["posting_id"] for posting in postings]
+    
+    def _era_postings(
+        self,
+        era_id: str,
+        era: Dict[str, Any],
+        posted_by: str
+    ) -> List[Dict[str, Any]]:
+        """Insurance postings, with updated balances, for the claims of an ERA"""
+        details = {
+            "check_number": era.get("check_number") or None,
+            "posted_by": posted_by
+        }
+        postings = []
+        for line, claim in enumerate(era["claims"], 1):
+            adjustments = claim.get("adjustments", [])
+            posting = self._create_posting(
+                claim["claim_id"],
+                PaymentType.INSURANCE,
+                claim["paid_amount"],
+                era["check_date"],
+                adjustments,
+                details
+            )
+            # Postings of one ERA are created within the same second
+            posting["posting_id"] = f"POST-{era_id}-{line:05d}"
+            
+            balances = self._update_balances(
+                self._get_claim_balance(claim["claim_id"]),
+                claim["paid_amount"],
+                PaymentType.INSURANCE,
+                adjustments
+            )
+            posting["patient_balance"] = balances["patient"]
+            posting["insurance_balance"] = balances["insurance"]
+            posting["total_balance"] = balances["total"]
+            postings.append(posting)
+        
+        return postings
+    
+    def post_era_batch(self, era_id: str, postings: List[Dict[str, Any]]) -> None:
+        """
+        Write an ERA's postings with a single COPY in one transaction
+        
+        COPY is one round trip for the whole batch, where per-posting
+        INSERTs cost one each.
+        """
+        self._copy_postings([(era_id, posting) for posting in postings])
+    
+    def _copy_postings(self, rows: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """COPY (era_id, posting) rows into payment_postings in one transaction"""
+        if not rows:
+            return
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for era_id, posting in rows:
+            writer.writerow((
+                posting["posting_id"],
+                era_id,
+                posting["claim_id"],
+                posting["payment_type"],
+                posting["payment_date"].isoformat(),
+                posting["payment_amount"],
+                posting["payment_method"],
+                posting["check_number"],
+                json.dumps(posting["adjustments"], default=str),
+                posting["patient_balance"],
+                posting["insurance_balance"],
+                posting["total_balance"],
+                posting["posted_by"],
+                posting["posted_at"].isoformat()
+            ))
+        buffer.seek(0)
+        
+        try:
+            # COPY goes through the raw psycopg2 connection of the session
+            with self.db.connection().connection.cursor() as cursor:
+                cursor.copy_expert(_COPY_POSTINGS, buffer)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+    
+    def _save_posting(self, posting: Dict[str, Any], balances: Dict) -> str:
         """Save posting to database"""
-        posting.patient_balance = balances["patient"]
-        posting.insurance_balance = balances["insurance"]
-        posting.total_balance = balances["total"]
+        posting["patient_balance"] = balances["patient"]
+        posting["insurance_balance"] = balances["insurance"]
+        posting["total_balance"] = balances["total"]
         
         # In production, save to database
-        return posting.posting_id
+        return posting["posting_id"]
 
 
 class ReconciliationTool(Tool):
@@ -493,18 +763,14 @@ class ReconciliationTool(Tool):
             payments = self._get_payments(start_date, end_date, payer_id)
             
             # Analyze variances
-            variances = []
-            for payment in payments:
-                variance = self._analyze_variance(payment)
-                if variance:
-                    variances.append(variance)
+            variances = self._analyze_variances(payments)
             
             # Generate report
             report = self._generate_report(payments, variances)
             
             return {
                 "status": "success",
-                "report": report.dict(),
+                "report": report.model_dump(mode="json"),
                 "total_claims": len(payments),
                 "claims_with_variance": len(variances),
                 "variance_percentage": report.variance_percentage
@@ -527,35 +793,69 @@ class ReconciliationTool(Tool):
         # In production, query from database
         return []
     
-    def _analyze_variance(self, payment: Dict) -> Optional[PaymentVariance]:
-        """Analyze payment variance"""
-        expected = Decimal(str(payment.get("expected_amount", 0)))
-        actual = Decimal(str(payment.get("paid_amount", 0)))
-        variance = expected - actual
+    def _analyze_variances(self, payments: List[Dict]) -> List[PaymentVariance]:
+        """
+        Variances of 1.00 or more across payments
+        
+        Variances and their percentages are computed over integer-cent
+        columns in one pass; a PaymentVariance is only built for the
+        payments that are flagged.
+        """
+        columns = _amount_columns(payments, ("expected_amount", "paid_amount"))
+        expected = columns["expected_amount"]
+        actual = columns["paid_amount"]
         
-        if abs(variance) < Decimal("1.00"):
-            return None
+        if NUMPY_AVAILABLE:
+            variance = expected - actual
+            flagged = np.flatnonzero(np.abs(variance) >= 100)
+            flagged_expected = expected[flagged]
+            percentages = np.where(
+                flagged_expected > 0,
+                variance[flagged] * 100.0 / np.maximum(flagged_expected, 1),
+                0.0
+            ).tolist()
+            flagged = flagged.tolist()
+        else:
+            flagged = [i for i, (e, a) in enumerate(zip(expected, actual)) if abs(e - a) >= 100]
+            percentages = [
+                (expected[i] - actual[i]) * 100 / expected[i] if expected[i] > 0 else 0.0
+                for i in flagged
+            ]
+        
+        return [
+            self._variance_record(payments[i], int(expected[i]), int(actual[i]), percentage)
+            for i, percentage in zip(flagged, percentages)
+        ]
+    
+    def _variance_record(
+        self,
+        payment: Dict,
+        expected_cents: int,
+        actual_cents: int,
+        percentage: float
+    ) -> PaymentVariance:
+        """PaymentVariance for a payment whose variance is at least 1.00"""
+        expected = _from_cents(expected_cents)
+        actual = _from_cents(actual_cents)
+        variance = expected - actual
         
         # Categorize variance
         if variance > 0:
             category = "underpayment"
             action = "Follow up with payer for additional payment"
-        elif variance < 0:
+        else:
             category = "overpayment"
             action = "Verify payment, may need to refund"
-        else:
-            category = "correct"
-            action = "None"
         
         return PaymentVariance(
             claim_id=payment["claim_id"],
             expected_amount=expected,
             actual_amount=actual,
             variance_amount=variance,
-            variance_percentage=float((variance / expected * 100) if expected > 0 else 0),
+            variance_percentage=percentage,
             variance_category=category,
             reason=payment.get("variance_reason", "Unknown"),
-            requires_followup=abs(variance) > Decimal("50.00"),
+            requires_followup=abs(expected_cents - actual_cents) > 5000,
             recommended_action=action
         )
     
@@ -565,12 +865,18 @@ class ReconciliationTool(Tool):
         variances: List[PaymentVariance]
     ) -> ReconciliationReport:
         """Generate reconciliation report"""
-        total_expected = sum(Decimal(str(p.get("expected_amount", 0))) for p in payments)
-        total_posted = sum(Decimal(str(p.get("paid_amount", 0))) for p in payments)
+        columns = _amount_columns(payments, ("expected_amount", "paid_amount"))
+        total_expected = _from_cents(_total_cents(columns["expected_amount"]))
+        total_posted = _from_cents(_total_cents(columns["paid_amount"]))
         total_variance = total_expected - total_posted
         
-        underpayments = [v for v in variances if v.variance_category == "underpayment"]
-        overpayments = [v for v in variances if v.variance_category == "overpayment"]
+        underpayments: List[PaymentVariance] = []
+        overpayments: List[PaymentVariance] = []
+        for variance in variances:
+            if variance.variance_category == "underpayment":
+                underpayments.append(variance)
+            else:
+                overpayments.append(variance)
         
         return ReconciliationReport(
             report_date=datetime.now(),
@@ -585,6 +891,144 @@ class ReconciliationTool(Tool):
         )
 
 
+# ===== Batch Ingest =====
+
+def _parse_era_file(path: str) -> Tuple[bytes, Dict[str, Any]]:
+    """Read and parse one 835 file; runs in a worker process"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    era = ERAProcessingTool(None)._parse_x12_835(content)
+    return _content_digest(content), era
+
+
+def process_era_batch(
+    paths: List[str],
+    era_tool: ERAProcessingTool,
+    posting_tool: PaymentPostingTool,
+    posted_by: str = "system",
+    max_workers: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Ingest a batch of 835 files, e.g. a nightly remittance drop
+    
+    Parsing is pure, so files are parsed in a process pool. Duplicate
+    checks, validation and storage run here on the tools' sessions, and
+    the postings of every accepted ERA go out in a single COPY. If that
+    COPY fails, each ERA is copied on its own so one bad file only fails
+    itself. An ERA is only remembered as processed once its postings are
+    committed, so a failed file is processed again on retry.
+    
+    Returns:
+        One result per path, in order, shaped like ERAProcessingTool._run
+    """
+    if not paths:
+        return []
+    
+    results = []
+    # Content digest -> (ERA, era_id, posting rows, results reporting it)
+    # for the ERAs accepted in this batch
+    accepted: Dict[bytes, Tuple[Dict[str, Any], str, List, List[Dict[str, Any]]]] = {}
+    
+    workers = min(max_workers or os.cpu_count() or 1, len(paths))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_parse_era_file, path) for path in paths]
+        
+        for path, future in zip(paths, futures):
+            try:
+                content_hash, era = future.result()
+            except Exception as e:
+                logger.error(f"ERA parsing failed for {path}: {e}", exc_info=True)
+                results.append({"path": path, "status": "error", "error": str(e)})
+                continue
+            
+            with era_tool._processed_lock:
+                processed = era_tool._processed.get(content_hash)
+            if processed is None and content_hash in accepted:
+                processed = accepted[content_hash]
+            if processed is not None:
+                result = {
+                    "path": path,
+                    "status": "success",
+                    "era_id": processed[1],
+                    "claims_count": len(processed[0]["claims"]),
+                    "duplicate": True
+                }
+                results.append(result)
+                if content_hash in accepted:
+                    accepted[content_hash][3].append(result)
+                continue
+            
+            validation = era_tool._validate_era(era)
+            if not validation["valid"]:
+                results.append({
+                    "path": path,
+                    "status": "error",
+                    "error": "ERA validation failed",
+                    "details": validation["errors"]
+                })
+                continue
+            era.pop("_paid_cents", None)
+            
+            era_id = era_tool._store_era(era, content_hash)
+            postings = posting_tool._era_postings(era_id, era, posted_by)
+            result = {
+                "path": path,
+                "status": "success",
+                "era_id": era_id,
+                "claims_count": len(era["claims"]),
+                "total_amount": float(era["check_amount"]),
+                "posting_ids": [posting["posting_id"] for posting in postings]
+            }
+            results.append(result)
+            accepted[content_hash] = (
+                era, era_id, [(era_id, posting) for posting in postings], [result]
+            )
+    
+    for content_hash in _copy_accepted_postings(accepted, posting_tool):
+        era, era_id = accepted[content_hash][:2]
+        with era_tool._processed_lock:
+            era_tool._processed[content_hash] = (era, era_id)
+    return results
+
+
+def _copy_accepted_postings(
+    accepted: Dict[bytes, Tuple[Dict[str, Any], str, List, List[Dict[str, Any]]]],
+    posting_tool: PaymentPostingTool
+) -> List[bytes]:
+    """
+    COPY the postings of process_era_batch's accepted ERAs
+    
+    All of them go in one COPY; if it fails they are retried one ERA per
+    COPY, and the results of an ERA whose COPY still fails become errors.
+    
+    Returns:
+        Digests of the ERAs whose postings were committed
+    """
+    try:
+        posting_tool._copy_postings([row for _, _, rows, _ in accepted.values() for row in rows])
+        return list(accepted)
+    except Exception as e:
+        if len(accepted) == 1:
+            failed = {next(iter(accepted)): e}
+        else:
+            logger.warning(f"Batch posting COPY failed, retrying per ERA: {e}")
+            failed = {}
+            for content_hash, (_, _, rows, _) in accepted.items():
+                try:
+                    posting_tool._copy_postings(rows)
+                except Exception as era_error:
+                    failed[content_hash] = era_error
+    
+    for content_hash, error in failed.items():
+        era_id = accepted[content_hash][1]
+        logger.error(f"Posting failed for {era_id}: {error}")
+        for result in accepted[content_hash][3]:
+            result.pop("posting_ids", None)
+            result.pop("duplicate", None)
+            result.update(status="error", error=f"Posting failed: {error}")
+    return [content_hash for content_hash in accepted if content_hash not in failed]
+
+
 # ===== Agent Definition =====
 
 def create_payment_posting_agent(tools: List[Tool]) -> Agent:
@@ -1,14 +1,27 @@
 """
 Main FastAPI application
 """
+import asyncio
+import contextlib
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from src.agents import insurance_verification_agent
 from src.api.routes import chat, medical_codes, analytics
+from src.services import database
+
+try:
+    import orjson  # noqa: F401
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 app = FastAPI(
     title="HealthFlow RCM System",
     description="Healthcare Revenue Cycle Management with AI Agents",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
 )
 
 # CORS middleware
@@ -26,6 +39,50 @@ app.include_router(medical_codes.router, prefix="/api/v1/medical-codes", tags=["
 app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["analytics"])
 
 
+@app.on_event("startup")
+async def start_verification_flush():
+    # Agent calls made without a db_session, including the background
+    # flush of queued coverage verifications, use the app's async pool
+    insurance_verification_agent.configure_sessionmaker(database.AsyncSessionLocal)
+    await insurance_verification_agent.warm_pool(database.async_engine)
+    app.state.verification_flush = asyncio.create_task(
+        chat.chat_orchestrator.agents['verification'].flush_periodically()
+    )
+
+
+@app.on_event("startup")
+async def start_kpi_refresh():
+    app.state.kpi_refresh = asyncio.create_task(analytics.refresh_kpi_rollup_periodically())
+
+
+@app.on_event("startup")
+async def start_code_preload():
+    app.state.code_preload = asyncio.create_task(analytics.warm_code_cache_periodically())
+
+
+@app.on_event("shutdown")
+async def stop_code_preload():
+    app.state.code_preload.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await app.state.code_preload
+
+
+@app.on_event("shutdown")
+async def stop_kpi_refresh():
+    app.state.kpi_refresh.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await app.state.kpi_refresh
+
+
+@app.on_event("shutdown")
+async def stop_verification_flush():
+    app.state.verification_flush.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await app.state.verification_flush
+    await chat.chat_orchestrator.shutdown()
+    await database.async_engine.dispose()
+
+
 @app.get("/")
 async def root():
     return {
@@ -8,15 +8,53 @@ Complete implementation for Phase 3
 # src/api/routes/analytics.py
 # ============================================
 
+import asyncio
+import itertools
+import json
+import logging
+import operator
+from functools import lru_cache
+
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import case, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pydantic import BaseModel
 from decimal import Decimal
+import redis
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from config.settings import settings
+from src.models.rcm_models import DailyKPIRollup
+from src.services.database import AsyncSessionLocal, SessionLocal, get_async_db_session
+from src.services.medical_codes_service import CodeIndex
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"])
 
+# KPI responses are cached in Redis for a minute. Keys carry a version that
+# refresh_kpi_rollup bumps, so a refreshed rollup is never served stale.
+_KPI_CACHE_TTL = 60  # seconds
+_KPI_VERSION_KEY = "kpi:version"
+
+
+@lru_cache(maxsize=1)
+def _redis_client() -> aioredis.Redis:
+    """Shared async Redis client for the KPI and medical code caches"""
+    return aioredis.from_url(settings.redis_url)
+
 
 class KPIMetrics(BaseModel):
     """Key Performance Indicators"""
@@ -87,10 +125,21 @@ async def get_kpis(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     payer_id: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """Get key performance indicators"""
     
+    cache = _redis_client()
+    cache_key = None
+    try:
+        version = await cache.get(_KPI_VERSION_KEY) or b"0"
+        cache_key = f"kpi:{version.decode()}:{start_date or ''}:{end_date or ''}:{payer_id or ''}"
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return _json_loads(cached)
+    except RedisError as e:
+        logger.warning(f"KPI cache unavailable: {e}")
+    
     # Set default date range (last 30 days)
     if not end_date:
         end_date = datetime.now()
@@ -102,64 +151,90 @@ async def get_kpis(
     else:
         start_date = datetime.fromisoformat(start_date)
     
-    # Query claims in date range
-    query = db.query(ClaimRecord).filter(
-        ClaimRecord.submission_date.between(start_date, end_date)
+    # Claim totals come from the daily rollup: at most days x payers rows
+    # instead of every claim. Days are whole submission dates.
+    claims_stmt = select(
+        func.coalesce(func.sum(DailyKPIRollup.charges), 0),
+        func.coalesce(func.sum(DailyKPIRollup.payments), 0),
+        func.coalesce(func.sum(DailyKPIRollup.submitted), 0),
+        func.coalesce(func.sum(DailyKPIRollup.approved), 0),
+        func.coalesce(func.sum(DailyKPIRollup.denied), 0),
+        func.coalesce(func.sum(DailyKPIRollup.pending), 0),
+        func.coalesce(func.sum(DailyKPIRollup.paid), 0),
+        func.coalesce(func.sum(DailyKPIRollup.collection_days), 0)
+    ).where(
+        DailyKPIRollup.day.between(start_date.date(), end_date.date())
     )
     
     if payer_id:
-        query = query.filter(ClaimRecord.insurance_company == payer_id)
+        claims_stmt = claims_stmt.where(DailyKPIRollup.payer_id == payer_id)
+    
+    # Appeal data
+    appeals_stmt = select(
+        func.count(),
+        func.sum(case((AppealRecord.status == 'won', 1), else_=0))
+    ).select_from(AppealRecord).where(
+        AppealRecord.appeal_date.between(start_date, end_date)
+    )
+    
+    # Workflow time
+    workflows_stmt = select(
+        func.avg(func.coalesce(WorkflowStateModel.total_execution_time_ms, 0))
+    ).where(
+        WorkflowStateModel.started_at.between(start_date, end_date),
+        WorkflowStateModel.status == WorkflowStatus.COMPLETED
+    )
+    
+    # The aggregates are independent, so they run concurrently. AsyncSession
+    # is not safe for concurrent use: each query gets its own session and
+    # the request session is left for Days in A/R.
+    #
+    # A cache miss therefore holds four pooled connections at once, so
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW bounds concurrent cold KPI requests
+    # to a quarter of the pool (7 with the 20 + 10 defaults, beyond which
+    # requests wait up to DB_POOL_TIMEOUT). Cache hits use none.
+    async with AsyncSession(db.bind, expire_on_commit=False) as claims_db, \
+            AsyncSession(db.bind, expire_on_commit=False) as appeals_db, \
+            AsyncSession(db.bind, expire_on_commit=False) as workflows_db:
+        claims_result, appeals_result, workflows_result, days_in_ar = await asyncio.gather(
+            claims_db.execute(claims_stmt),
+            appeals_db.execute(appeals_stmt),
+            workflows_db.execute(workflows_stmt),
+            calculate_days_in_ar(db, end_date)
+        )
     
-    claims = query.all()
+    row = claims_result.one()
+    total_charges, total_payments = row[0], row[1]
+    (claims_submitted, claims_approved, claims_denied, claims_pending,
+     paid_count, collection_days) = (int(value) for value in row[2:])
     
     # Calculate metrics
-    total_charges = sum(c.total_charges or 0 for c in claims)
-    total_payments = sum(c.actual_payment or 0 for c in claims)
     total_adjustments = total_charges - total_payments
     
-    claims_submitted = len(claims)
-    claims_approved = sum(1 for c in claims if c.status == 'approved')
-    claims_denied = sum(1 for c in claims if c.status == 'denied')
-    claims_pending = sum(1 for c in claims if c.status == 'pending')
-    
     # Quality metrics
     clean_claim_rate = (claims_approved / claims_submitted * 100) if claims_submitted > 0 else 0
     denial_rate = (claims_denied / claims_submitted * 100) if claims_submitted > 0 else 0
     
-    # Get appeal data
-    appeals = db.query(AppealRecord).filter(
-        AppealRecord.appeal_date.between(start_date, end_date)
-    ).all()
-    
+    appeals_total, appeals_won = appeals_result.one()
     appeal_success_rate = (
-        sum(1 for a in appeals if a.status == 'won') / len(appeals) * 100
-        if appeals else 0
+        int(appeals_won or 0) / appeals_total * 100
+        if appeals_total else 0
     )
     
-    # Calculate Days in A/R
-    days_in_ar = calculate_days_in_ar(db, end_date)
-    
     # Avg collection time
-    paid_claims = [c for c in claims if c.actual_payment > 0]
     avg_collection_time = (
-        sum((c.payment_date - c.submission_date).days for c in paid_claims if c.payment_date) /
-        len(paid_claims)
-        if paid_claims else 0
+        float(collection_days or 0) / paid_count
+        if paid_count else 0
     )
     
     # Avg workflow time
-    workflows = db.query(WorkflowStateModel).filter(
-        WorkflowStateModel.started_at.between(start_date, end_date),
-        WorkflowStateModel.status == WorkflowStatus.COMPLETED
-    ).all()
-    
+    avg_execution_ms = workflows_result.scalar()
     avg_workflow_time = (
-        sum(w.total_execution_time_ms or 0 for w in workflows) /
-        len(workflows) / 60000  # Convert to minutes
-        if workflows else 0
+        float(avg_execution_ms) / 60000  # Convert to minutes
+        if avg_execution_ms is not None else 0
     )
     
-    return KPIMetrics(
+    metrics = KPIMetrics(
         total_charges=Decimal(str(total_charges)),
         total_payments=Decimal(str(total_payments)),
         total_adjustments=Decimal(str(total_adjustments)),
@@ -176,6 +251,171 @@ async def get_kpis(
         avg_collection_time_days=avg_collection_time,
         avg_workflow_time_minutes=avg_workflow_time
     )
+    
+    if cache_key is not None:
+        try:
+            await cache.setex(
+                cache_key,
+                _KPI_CACHE_TTL,
+                _json_dumps(metrics.model_dump(mode="json"))
+            )
+        except RedisError as e:
+            logger.warning(f"KPI cache write failed: {e}")
+    
+    return metrics
+
+
+KPI_REFRESH_INTERVAL = 3600  # seconds
+
+# Claims changed up to this long before the previous refresh are picked up
+# again: covers transactions that committed after it started and clock
+# skew between the app (updated_at) and the database (refreshed_at)
+KPI_REFRESH_OVERLAP = timedelta(minutes=5)
+
+# Rows are deleted and re-inserted rather than upserted, so a (day, payer)
+# whose claims moved away does not keep its old totals. Concurrent
+# refreshes (one per app worker) are serialized by a transaction-scoped
+# advisory lock instead of colliding on the inserts.
+_LOCK_KPI_ROLLUP = text("SELECT pg_advisory_xact_lock(hashtext('daily_kpi_rollup'))")
+
+_LAST_KPI_REFRESH = text("SELECT MAX(refreshed_at) FROM daily_kpi_rollup")
+
+# Submission days with a claim updated or paid since :since; NULL :since
+# selects every day (empty rollup)
+_CHANGED_KPI_DAYS = text("""
+    SELECT DISTINCT CAST(submission_date AS DATE)
+    FROM claims
+    WHERE submission_date IS NOT NULL
+      AND (CAST(:since AS TIMESTAMP) IS NULL
+           OR updated_at >= :since
+           OR payment_date >= :since)
+""")
+
+# Same aggregation as the backfill in migration 008_daily_kpi_rollup
+_KPI_ROLLUP_SELECT = """
+    INSERT INTO daily_kpi_rollup
+        (day, payer_id, charges, payments, submitted, approved, denied, pending,
+         paid, collection_days, refreshed_at)
+    SELECT CAST(submission_date AS DATE),
+           COALESCE(insurance_company, ''),
+           COALESCE(SUM(total_charges), 0),
+           COALESCE(SUM(actual_payment), 0),
+           COUNT(*),
+           COUNT(*) FILTER (WHERE status = 'approved'),
+           COUNT(*) FILTER (WHERE status = 'denied'),
+           COUNT(*) FILTER (WHERE status = 'pending'),
+           COUNT(*) FILTER (WHERE actual_payment > 0),
+           COALESCE(SUM(FLOOR(EXTRACT(EPOCH FROM payment_date - submission_date) / 86400))
+                    FILTER (WHERE actual_payment > 0 AND payment_date IS NOT NULL), 0),
+           NOW() AT TIME ZONE 'UTC'
+    FROM claims
+    WHERE {where}
+    GROUP BY 1, 2
+"""
+
+_DELETE_KPI_RANGE = text("""
+    DELETE FROM daily_kpi_rollup
+    WHERE day >= :start_day AND day < :end_day
+""")
+
+_INSERT_KPI_RANGE = text(_KPI_ROLLUP_SELECT.format(
+    where="submission_date >= :start_day AND submission_date < :end_day"
+))
+
+_DELETE_KPI_DAYS = text("DELETE FROM daily_kpi_rollup WHERE day = ANY(:days)")
+
+_INSERT_KPI_DAYS = text(_KPI_ROLLUP_SELECT.format(
+    where="CAST(submission_date AS DATE) = ANY(:days)"
+))
+
+
+def _bump_kpi_version() -> None:
+    """Retire cached KPI responses built from the previous rollup"""
+    try:
+        redis.Redis.from_url(settings.redis_url).incr(_KPI_VERSION_KEY)
+    except RedisError as e:
+        logger.warning(f"KPI cache invalidation failed: {e}")
+
+
+def refresh_kpi_rollup(db: Session, start_day: date, end_day: date) -> None:
+    """
+    Recompute daily_kpi_rollup rows for submission days start_day..end_day
+    
+    For rebuilding a known range by hand; the background job uses
+    refresh_changed_kpi_rollup. The range is replaced in one transaction,
+    so readers see either the old or the new rows.
+    """
+    params = {
+        'start_day': start_day,
+        'end_day': end_day + timedelta(days=1)
+    }
+    try:
+        db.execute(_LOCK_KPI_ROLLUP)
+        db.execute(_DELETE_KPI_RANGE, params)
+        db.execute(_INSERT_KPI_RANGE, params)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    _bump_kpi_version()
+
+
+def refresh_changed_kpi_rollup(db: Session) -> int:
+    """
+    Recompute the rollup days that have claim changes since the last refresh
+    
+    Payments and denials typically land weeks after submission, so the
+    days to refresh are found from claims.updated_at / payment_date rather
+    than a fixed recent window. The last refresh time is read from the
+    rollup itself, so restarts neither miss changes nor rebuild everything;
+    an empty rollup is rebuilt in full.
+    
+    Returns:
+        Number of submission days recomputed
+    """
+    try:
+        db.execute(_LOCK_KPI_ROLLUP)
+        last_refresh = db.execute(_LAST_KPI_REFRESH).scalar()
+        since = last_refresh - KPI_REFRESH_OVERLAP if last_refresh else None
+        days = db.execute(_CHANGED_KPI_DAYS, {'since': since}).scalars().all()
+        if days:
+            db.execute(_DELETE_KPI_DAYS, {'days': days})
+            db.execute(_INSERT_KPI_DAYS, {'days': days})
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    if days:
+        _bump_kpi_version()
+    return len(days)
+
+
+def _refresh_changed_kpi_rollup() -> int:
+    """refresh_changed_kpi_rollup on a new session"""
+    db = SessionLocal()
+    try:
+        return refresh_changed_kpi_rollup(db)
+    finally:
+        db.close()
+
+
+async def refresh_kpi_rollup_periodically(interval: float = KPI_REFRESH_INTERVAL) -> None:
+    """
+    Refresh changed KPI rollup days now and every interval seconds until cancelled
+    
+    Started as a background task on app startup. The refresh uses a sync
+    session, so it runs in a worker thread.
+    """
+    while True:
+        try:
+            days = await asyncio.to_thread(_refresh_changed_kpi_rollup)
+            if days:
+                logger.info(f"✅ Refreshed KPI rollup for {days} days")
+        except Exception as e:
+            logger.error(f"❌ KPI rollup refresh failed: {e}")
+        await asyncio.sleep(interval)
 
 
 @router.get("/payer-performance", response_model=List[PayerPerformance])
@@ -210,7 +450,8 @@ async def get_denial_analytics(
 # src/services/medical_code_service.py
 # ============================================
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Awaitable, Callable, Type
+from cachetools import TTLCache
 from sqlalchemy import or_, and_
 from fhir.resources.codeableconcept import CodeableConcept
 from fhir.resources.coding import Coding
@@ -241,13 +482,136 @@ class CPTCode(BaseModel):
     valid_until: Optional[datetime] = None
 
 
+def _valid_on(code: BaseModel, when: datetime) -> bool:
+    """Whether an ICD10Code/CPTCode is in effect at when"""
+    return code.valid_from <= when and (code.valid_until is None or code.valid_until > when)
+
+
+# Code and description of an ICD10Code/CPTCode, for CodeIndex
+_CODE_FIELDS = (operator.attrgetter('code'), operator.attrgetter('description'))
+
+
 class MedicalCodeService:
     """Service for medical code lookup and validation"""
     
-    def __init__(self, db_session: Session, fhir_terminology_url: Optional[str] = None):
+    # Lookups are cached in Redis, shared by every worker, behind a small
+    # per-process L1. Searches expire after an hour; single codes are
+    # reference data and keep for a day. Empty results (unknown code, no
+    # match) only keep for a minute, so a newly imported code shows up.
+    SEARCH_TTL = 3600  # seconds
+    CODE_TTL = 86400  # seconds
+    NEGATIVE_TTL = 60  # seconds
+    _local: TTLCache = TTLCache(maxsize=1024, ttl=60)
+    
+    # Whole reference tables by code, once warm_cache has run; reloaded
+    # every PRELOAD_REFRESH by warm_code_cache_periodically so imported
+    # codes show up
+    PRELOAD_REFRESH = 3600  # seconds
+    _icd10_by_code: Optional[Dict[str, ICD10Code]] = None
+    _cpt_by_code: Optional[Dict[str, CPTCode]] = None
+    _icd10_index: Optional[CodeIndex] = None
+    _cpt_index: Optional[CodeIndex] = None
+    
+    def __init__(
+        self,
+        db_session: AsyncSession,
+        fhir_terminology_url: Optional[str] = None,
+        redis_client: Optional[aioredis.Redis] = None
+    ):
         self.db = db_session
         self.fhir_url = fhir_terminology_url
-        self.cache = {}  # In-memory cache
+        self.redis = redis_client if redis_client is not None else _redis_client()
+    
+    async def warm_cache(self) -> None:
+        """
+        Load every ICD-10 and CPT code into memory, e.g. at startup
+        
+        Both tables are small and near-static. Once loaded, get_icd10 and
+        get_cpt are dict lookups, and searches run against an in-memory word
+        index; neither touches Redis or the database. A search the index
+        finds nothing for falls back to the database.
+        """
+        icd10 = await self.db.execute(select(ICD10CodeModel))
+        icd10_by_code = {row.code: ICD10Code.from_orm(row) for row in icd10.scalars()}
+        cpt = await self.db.execute(select(CPTCodeModel))
+        cpt_by_code = {row.code: CPTCode.from_orm(row) for row in cpt.scalars()}
+        
+        cls = type(self)
+        cls._icd10_by_code = icd10_by_code
+        cls._cpt_by_code = cpt_by_code
+        cls._icd10_index = CodeIndex(icd10_by_code.values(), *_CODE_FIELDS)
+        cls._cpt_index = CodeIndex(cpt_by_code.values(), *_CODE_FIELDS)
+    
+    @staticmethod
+    def _search_preloaded(
+        index: CodeIndex,
+        query: str,
+        category: Optional[str],
+        limit: int
+    ) -> List[BaseModel]:
+        """
+        Active codes matching query from a warm_cache index
+        
+        Codes starting with the query come first, then codes whose
+        description has every query word, the last one as a prefix.
+        """
+        if not query.strip():
+            return []
+        
+        now = datetime.now()
+        seen = set()
+        results = []
+        for entry in itertools.chain(
+            index.by_prefix(query.strip().upper()),
+            index.by_words(query, prefix_last_word=True)
+        ):
+            if entry.code in seen:
+                continue
+            seen.add(entry.code)
+            if (not category or entry.category == category) and _valid_on(entry, now):
+                results.append(entry)
+                if len(results) == limit:
+                    break
+        return results
+    
+    async def _cached(
+        self,
+        key: str,
+        ttl: int,
+        loader: Callable[[], Awaitable[List[BaseModel]]],
+        model: Type[BaseModel]
+    ) -> List[BaseModel]:
+        """
+        Code list for key from the L1 cache, then Redis, then loader
+        
+        Cached lists are shared between callers, so treat them as read-only.
+        Redis errors are logged and fall through to the loader.
+        """
+        codes = self._local.get(key)
+        if codes is not None:
+            return codes
+        
+        try:
+            cached = await self.redis.get(key)
+        except RedisError as e:
+            logger.warning(f"Medical code cache unavailable: {e}")
+            cached = None
+        
+        if cached is not None:
+            codes = [model(**data) for data in _json_loads(cached)]
+        else:
+            codes = await loader()
+            try:
+                await self.redis.set(
+                    key,
+                    _json_dumps([code.model_dump(mode="json") for code in codes]),
+                    ex=ttl if codes else min(ttl, self.NEGATIVE_TTL)
+                )
+            except RedisError as e:
+                logger.warning(f"Medical code cache write failed: {e}")
+        
+        self._local[key] = codes
+        return codes
     
     async def search_icd10(
         self,
@@ -256,54 +620,83 @@ class MedicalCodeService:
         limit: int = 20
     ) -> List[ICD10Code]:
         """Search ICD-10 codes"""
+        if self._icd10_index is not None:
+            results = self._search_preloaded(self._icd10_index, query, category, limit)
+            if results:
+                return results
         
-        # Check cache first
-        cache_key = f"icd10:{query}:{category}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        # Not preloaded, or nothing in memory: the database also matches
+        # codes by substring and descriptions with stemming
+        return await self._cached(
+            f"icd10:{query}:{category}:{limit}",
+            self.SEARCH_TTL,
+            lambda: self._search_icd10_db(query, category, limit),
+            ICD10Code
+        )
+    
+    async def _search_icd10_db(
+        self,
+        query: str,
+        category: Optional[str],
+        limit: int
+    ) -> List[ICD10Code]:
+        """
+        Search ICD-10 codes in the database
+        
+        Descriptions are matched with full-text search and codes by
+        substring, so both sides are served by GIN indexes rather than a
+        sequential ILIKE scan.
+        """
         
-        # Query database
-        db_query = self.db.query(ICD10CodeModel).filter(
+        now = datetime.now()
+        stmt = select(ICD10CodeModel).where(
             or_(
                 ICD10CodeModel.code.ilike(f"%{query}%"),
-                ICD10CodeModel.description.ilike(f"%{query}%")
+                func.to_tsvector('english', ICD10CodeModel.description).op('@@')(
+                    func.plainto_tsquery('english', query)
+                )
             )
         )
         
         if category:
-            db_query = db_query.filter(ICD10CodeModel.category == category)
+            stmt = stmt.where(ICD10CodeModel.category == category)
         
         # Only active codes
-        db_query = db_query.filter(
-            ICD10CodeModel.valid_from <= datetime.now(),
+        stmt = stmt.where(
+            ICD10CodeModel.valid_from <= now,
             or_(
                 ICD10CodeModel.valid_until.is_(None),
-                ICD10CodeModel.valid_until > datetime.now()
+                ICD10CodeModel.valid_until > now
             )
         )
         
-        results = db_query.limit(limit).all()
-        
-        codes = [ICD10Code.from_orm(r) for r in results]
-        
-        # Cache results
-        self.cache[cache_key] = codes
-        
-        return codes
+        result = await self.db.execute(stmt.limit(limit))
+        return [ICD10Code.from_orm(r) for r in result.scalars()]
     
     async def get_icd10(self, code: str, service_date: datetime) -> Optional[ICD10Code]:
         """Get specific ICD-10 code valid for service date"""
+        if self._icd10_by_code is not None:
+            found = self._icd10_by_code.get(code)
+            return found if found is not None and _valid_on(found, service_date) else None
         
-        result = self.db.query(ICD10CodeModel).filter(
-            ICD10CodeModel.code == code,
-            ICD10CodeModel.valid_from <= service_date,
-            or_(
-                ICD10CodeModel.valid_until.is_(None),
-                ICD10CodeModel.valid_until > service_date
-            )
-        ).first()
+        # Codes are unique, so the row is cached per code and the validity
+        # window is checked here for each service date
+        codes = await self._cached(
+            f"icd10:code:{code}",
+            self.CODE_TTL,
+            lambda: self._get_icd10_db(code),
+            ICD10Code
+        )
+        return codes[0] if codes and _valid_on(codes[0], service_date) else None
+    
+    async def _get_icd10_db(self, code: str) -> List[ICD10Code]:
+        """ICD-10 code row as a one-item list, empty when unknown"""
+        result = await self.db.execute(
+            select(ICD10CodeModel).where(ICD10CodeModel.code == code)
+        )
+        row = result.scalar_one_or_none()
         
-        return ICD10Code.from_orm(result) if result else None
+        return [ICD10Code.from_orm(row)] if row else []
     
     async def search_cpt(
         self,
@@ -312,48 +705,74 @@ class MedicalCodeService:
         limit: int = 20
     ) -> List[CPTCode]:
         """Search CPT codes"""
+        if self._cpt_index is not None:
+            results = self._search_preloaded(self._cpt_index, query, category, limit)
+            if results:
+                return results
         
-        cache_key = f"cpt:{query}:{category}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-        
-        db_query = self.db.query(CPTCodeModel).filter(
+        # Not preloaded, or nothing in memory: the database also matches
+        # codes by substring and descriptions with stemming
+        return await self._cached(
+            f"cpt:{query}:{category}:{limit}",
+            self.SEARCH_TTL,
+            lambda: self._search_cpt_db(query, category, limit),
+            CPTCode
+        )
+    
+    async def _search_cpt_db(
+        self,
+        query: str,
+        category: Optional[str],
+        limit: int
+    ) -> List[CPTCode]:
+        """Search CPT codes in the database"""
+        now = datetime.now()
+        stmt = select(CPTCodeModel).where(
             or_(
                 CPTCodeModel.code.ilike(f"%{query}%"),
-                CPTCodeModel.description.ilike(f"%{query}%")
+                func.to_tsvector('english', CPTCodeModel.description).op('@@')(
+                    func.plainto_tsquery('english', query)
+                )
             )
         )
         
         if category:
-            db_query = db_query.filter(CPTCodeModel.category == category)
+            stmt = stmt.where(CPTCodeModel.category == category)
         
-        db_query = db_query.filter(
-            CPTCodeModel.valid_from <= datetime.now(),
+        # Only active codes
+        stmt = stmt.where(
+            CPTCodeModel.valid_from <= now,
             or_(
                 CPTCodeModel.valid_until.is_(None),
-                CPTCodeModel.valid_until > datetime.now()
+                CPTCodeModel.valid_until > now
             )
         )
         
-        results = db_query.limit(limit).all()
-        codes = [CPTCode.from_orm(r) for r in results]
-        
-        self.cache[cache_key] = codes
-        return codes
+        result = await self.db.execute(stmt.limit(limit))
+        return [CPTCode.from_orm(r) for r in result.scalars()]
     
     async def get_cpt(self, code: str, service_date: datetime) -> Optional[CPTCode]:
         """Get specific CPT code valid for service date"""
+        if self._cpt_by_code is not None:
+            found = self._cpt_by_code.get(code)
+            return found if found is not None and _valid_on(found, service_date) else None
         
-        result = self.db.query(CPTCodeModel).filter(
-            CPTCodeModel.code == code,
-            CPTCodeModel.valid_from <= service_date,
-            or_(
-                CPTCodeModel.valid_until.is_(None),
-                CPTCodeModel.valid_until > service_date
-            )
-        ).first()
+        codes = await self._cached(
+            f"cpt:code:{code}",
+            self.CODE_TTL,
+            lambda: self._get_cpt_db(code),
+            CPTCode
+        )
+        return codes[0] if codes and _valid_on(codes[0], service_date) else None
+    
+    async def _get_cpt_db(self, code: str) -> List[CPTCode]:
+        """CPT code row as a one-item list, empty when unknown"""
+        result = await self.db.execute(
+            select(CPTCodeModel).where(CPTCodeModel.code == code)
+        )
+        row = result.scalar_one_or_none()
         
-        return CPTCode.from_orm(result) if result else None
+        return [CPTCode.from_orm(row)] if row else []
     
     async def validate_code_pair(
         self,
@@ -363,9 +782,15 @@ class MedicalCodeService:
     ) -> Dict[str, Any]:
         """Validate diagnosis-procedure code pair"""
         
-        # Get codes
-        diagnosis = await self.get_icd10(icd10_code, service_date)
-        procedure = await self.get_cpt(cpt_code, service_date)
+        # Get codes concurrently. AsyncSession is not safe for concurrent
+        # use, so the CPT lookup gets its own session; neither session checks
+        # out a connection when the code is cached.
+        async with AsyncSession(self.db.bind, expire_on_commit=False) as cpt_db:
+            cpt_service = MedicalCodeService(cpt_db, self.fhir_url, self.redis)
+            diagnosis, procedure = await asyncio.gather(
+                self.get_icd10(icd10_code, service_date),
+                cpt_service.get_cpt(cpt_code, service_date)
+            )
         
         if not diagnosis:
             return {
@@ -401,3 +826,20 @@ class MedicalCodeService:
         """Check medical necessity for ICD-10 and CPT combination"""
         # Placeholder implementation
         return {"medically_necessary": True, "confidence": "high"}
+
+
+async def warm_code_cache_periodically(interval: float = MedicalCodeService.PRELOAD_REFRESH) -> None:
+    """
+    Preload the code tables now and every interval seconds until cancelled
+    
+    Started as a background task on app startup. Each pass builds new
+    tables and indexes and swaps them in, so lookups never see a partial
+    load; a failed pass keeps serving the previous tables.
+    """
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await MedicalCodeService(db).warm_cache()
+        except Exception as e:
+            logger.error(f"❌ Medical code preload failed: {e}")
+        await asyncio.sleep(interval)
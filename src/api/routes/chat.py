@@ -10,6 +10,7 @@ from datetime import datetime
 import json
 import asyncio
 import logging
+import time
 import uuid
 
 from pydantic import BaseModel, Field
@@ -21,6 +22,16 @@ from src.core.auth import get_current_user, get_current_user_ws
 from src.models.user import User
 from src.models.chat import ChatMessage, Conversation
 
+try:
+    import orjson
+    
+    def _json_text(data: Any) -> str:
+        return orjson.dumps(data).decode()
+except ImportError:
+    def _json_text(data: Any) -> str:
+        # Same output as WebSocket.send_json
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/chat", tags=["chat"])
@@ -28,6 +39,9 @@ router = APIRouter(prefix="/api/v1/chat", tags=["chat"])
 # Initialize orchestrator
 chat_orchestrator = ChatOrchestrator()
 
+# Suggested gap between consecutive agent messages of one reply
+AGENT_MESSAGE_DELAY_MS = 300
+
 
 # ============================================================================
 # CONNECTION MANAGER
@@ -38,6 +52,8 @@ class ConnectionManager:
     
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        # connected_at/last_activity are epoch seconds; metadata_snapshot()
+        # formats them, so sends never format timestamps for bookkeeping
         self.user_metadata: Dict[str, Dict[str, Any]] = {}
         self.message_queues: Dict[str, asyncio.Queue] = {}
     
@@ -45,10 +61,11 @@ class ConnectionManager:
         """Connect user to WebSocket"""
         await websocket.accept()
         self.active_connections[user_id] = websocket
+        now = time.time()
         self.user_metadata[user_id] = {
-            'connected_at': datetime.utcnow().isoformat(),
+            'connected_at': now,
             'message_count': 0,
-            'last_activity': datetime.utcnow().isoformat()
+            'last_activity': now
         }
         self.message_queues[user_id] = asyncio.Queue()
         logger.info(f"✅ User {user_id} connected to chat WebSocket")
@@ -65,15 +82,62 @@ class ConnectionManager:
     
     async def send_message(self, user_id: str, message: Dict[str, Any]):
         """Send message to specific user"""
-        if user_id in self.active_connections:
+        websocket = self.active_connections.get(user_id)
+        if websocket is not None:
             try:
-                await self.active_connections[user_id].send_json(message)
-                self.user_metadata[user_id]['message_count'] += 1
-                self.user_metadata[user_id]['last_activity'] = datetime.utcnow().isoformat()
+                await websocket.send_json(message)
+                meta = self.user_metadata[user_id]
+                meta['message_count'] += 1
+                meta['last_activity'] = time.time()
             except Exception as e:
                 logger.error(f"❌ Failed to send message to {user_id}: {e}")
                 self.disconnect(user_id)
     
+    async def send_serialized(self, user_id: str, payload: str):
+        """Send an already serialized JSON message to a specific user"""
+        websocket = self.active_connections.get(user_id)
+        if websocket is not None:
+            try:
+                await websocket.send_text(payload)
+                meta = self.user_metadata[user_id]
+                meta['message_count'] += 1
+                meta['last_activity'] = time.time()
+            except Exception as e:
+                logger.error(f"❌ Failed to send message to {user_id}: {e}")
+                self.disconnect(user_id)
+    
+    async def broadcast(self, message: Dict[str, Any]) -> int:
+        """
+        Send a message to every connected user concurrently
+        
+        The message is serialized once and sent as a text frame, as
+        send_json would; users whose send fails are disconnected.
+        
+        Returns:
+            Number of users the message was delivered to
+        """
+        payload = _json_text(message)
+        connections = list(self.active_connections.items())
+        results = await asyncio.gather(
+            *(websocket.send_text(payload) for _, websocket in connections),
+            return_exceptions=True
+        )
+        
+        now = time.time()
+        delivered = 0
+        for (user_id, _), result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Failed to send message to {user_id}: {result}")
+                self.disconnect(user_id)
+                continue
+            meta = self.user_metadata.get(user_id)
+            if meta is not None:
+                meta['message_count'] += 1
+                meta['last_activity'] = now
+            delivered += 1
+        
+        return delivered
+    
     async def send_typing_indicator(
         self,
         user_id: str,
@@ -99,6 +163,17 @@ class ConnectionManager:
     def get_connection_count(self) -> int:
         """Get number of active connections"""
         return len(self.active_connections)
+    
+    def metadata_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """User metadata with ISO-8601 timestamps"""
+        return {
+            user_id: {
+                'connected_at': datetime.utcfromtimestamp(meta['connected_at']).isoformat(),
+                'message_count': meta['message_count'],
+                'last_activity': datetime.utcfromtimestamp(meta['last_activity']).isoformat()
+            }
+            for user_id, meta in self.user_metadata.items()
+        }
 
 
 manager = ConnectionManager()
@@ -141,6 +216,49 @@ class ConversationResponse(BaseModel):
     status: str
 
 
+# Welcome message, serialized once; only the ID and timestamp change per
+# connection
+_WELCOME_MESSAGE = _json_text({
+    'type': 'agent_message',
+    'message_id': '__MESSAGE_ID__',
+    'agent_name': 'HealthFlow Assistant',
+    'agent_type': 'system',
+    'agent_avatar': '🏥',
+    'message': (
+        '👋 **Welcome to HealthFlow RCM!**\n\n'
+        'I\'m your AI assistant for complete revenue cycle management. '
+        'I can help you with:\n\n'
+        '• 📝 **Patient Registration** - Register new patients and verify demographics\n'
+        '• 💳 **Insurance Verification** - Check coverage and eligibility in real-time\n'
+        '• 🔐 **Prior Authorization** - Submit and track authorization requests\n'
+        '• 🏥 **Medical Coding** - Find ICD-10 and CPT codes with AI assistance\n'
+        '• 📋 **Claim Submission** - Submit claims to HCX platform\n'
+        '• 🔍 **Claim Status** - Track claim progress and status\n'
+        '• ⚠️ **Denial Management** - Analyze denials and generate appeals\n'
+        '• 💰 **Payment Posting** - Post payments and reconcile accounts\n'
+        '• 📊 **Analytics & Reports** - View dashboards and generate reports\n\n'
+        '**You can:**\n'
+        '✅ Type your message\n'
+        '🎤 Use voice input (click microphone icon)\n'
+        '📎 Upload documents (ID cards, bills, EOBs)\n\n'
+        '**Try saying:**\n'
+        '• "Register patient Ahmed Mohamed"\n'
+        '• "Check insurance eligibility"\n'
+        '• "Find ICD-10 code for diabetes"\n'
+        '• "Submit claim for patient"\n\n'
+        'What would you like to do today?'
+    ),
+    'actions': [
+        {'label': '📝 Register Patient', 'action': 'register_patient', 'icon': '📝'},
+        {'label': '💳 Verify Insurance', 'action': 'verify_insurance', 'icon': '💳'},
+        {'label': '🏥 Find Medical Code', 'action': 'search_medical_code', 'icon': '🏥'},
+        {'label': '📋 Create Claim', 'action': 'create_claim', 'icon': '📋'},
+        {'label': '📊 View Dashboard', 'action': 'view_dashboard', 'icon': '📊'},
+    ],
+    'timestamp': '__TIMESTAMP__'
+})
+
+
 # ============================================================================
 # WEBSOCKET ENDPOINT
 # ============================================================================
@@ -166,45 +284,12 @@ async def websocket_endpoint(
     
     try:
         # Send welcome message
-        await manager.send_message(user_id, {
-            'type': 'agent_message',
-            'message_id': str(uuid.uuid4()),
-            'agent_name': 'HealthFlow Assistant',
-            'agent_type': 'system',
-            'agent_avatar': '🏥',
-            'message': (
-                '👋 **Welcome to HealthFlow RCM!**\n\n'
-                'I\'m your AI assistant for complete revenue cycle management. '
-                'I can help you with:\n\n'
-                '• 📝 **Patient Registration** - Register new patients and verify demographics\n'
-                '• 💳 **Insurance Verification** - Check coverage and eligibility in real-time\n'
-                '• 🔐 **Prior Authorization** - Submit and track authorization requests\n'
-                '• 🏥 **Medical Coding** - Find ICD-10 and CPT codes with AI assistance\n'
-                '• 📋 **Claim Submission** - Submit claims to HCX platform\n'
-                '• 🔍 **Claim Status** - Track claim progress and status\n'
-                '• ⚠️ **Denial Management** - Analyze denials and generate appeals\n'
-                '• 💰 **Payment Posting** - Post payments and reconcile accounts\n'
-                '• 📊 **Analytics & Reports** - View dashboards and generate reports\n\n'
-                '**You can:**\n'
-                '✅ Type your message\n'
-                '🎤 Use voice input (click microphone icon)\n'
-                '📎 Upload documents (ID cards, bills, EOBs)\n\n'
-                '**Try saying:**\n'
-                '• "Register patient Ahmed Mohamed"\n'
-                '• "Check insurance eligibility"\n'
-                '• "Find ICD-10 code for diabetes"\n'
-                '• "Submit claim for patient"\n\n'
-                'What would you like to do today?'
-            ),
-            'actions': [
-                {'label': '📝 Register Patient', 'action': 'register_patient', 'icon': '📝'},
-                {'label': '💳 Verify Insurance', 'action': 'verify_insurance', 'icon': '💳'},
-                {'label': '🏥 Find Medical Code', 'action': 'search_medical_code', 'icon': '🏥'},
-                {'label': '📋 Create Claim', 'action': 'create_claim', 'icon': '📋'},
-                {'label': '📊 View Dashboard', 'action': 'view_dashboard', 'icon': '📊'},
-            ],
-            'timestamp': datetime.utcnow().isoformat()
-        })
+        await manager.send_serialized(
+            user_id,
+            _WELCOME_MESSAGE
+            .replace('__MESSAGE_ID__', str(uuid.uuid4()), 1)
+            .replace('__TIMESTAMP__', datetime.utcnow().isoformat(), 1)
+        )
         
         # Main message loop
         while True:
@@ -241,8 +326,9 @@ async def websocket_endpoint(
                     db_session=db
                 )
                 
-                # Send agent responses
-                for response in responses:
+                # Send agent responses right away; pacing between them is
+                # left to the client via display_delay_ms
+                for index, response in enumerate(responses):
                     await manager.send_message(user_id, {
                         'type': 'agent_message',
                         'message_id': str(uuid.uuid4()),
@@ -253,11 +339,9 @@ async def websocket_endpoint(
                         'data': response.data,
                         'actions': response.actions,
                         'workflow_id': response.workflow_id,
+                        'display_delay_ms': AGENT_MESSAGE_DELAY_MS if index else 0,
                         'timestamp': datetime.utcnow().isoformat()
                     })
-                    
-                    # Small delay between messages for better UX
-                    await asyncio.sleep(0.3)
                 
             except Exception as e:
                 logger.error(f"❌ Error processing message: {e}", exc_info=True)
@@ -452,7 +536,7 @@ async def get_active_users(
     return {
         'active_users': manager.get_active_users(),
         'count': manager.get_connection_count(),
-        'metadata': manager.user_metadata,
+        'metadata': manager.metadata_snapshot(),
         'timestamp': datetime.utcnow().isoformat()
     }
 
@@ -473,12 +557,11 @@ async def broadcast_message(
     }
     
     # Send to all connected users
-    for user_id in manager.get_active_users():
-        await manager.send_message(user_id, broadcast_data)
+    recipients = await manager.broadcast(broadcast_data)
     
     return {
         'success': True,
-        'recipients': manager.get_connection_count(),
+        'recipients': recipients,
         'message': 'Broadcast sent successfully'
     }
 
@@ -1,7 +1,7 @@
 """
 Claim data models
 """
-from sqlalchemy import Column, String, Integer, DateTime, Numeric, Boolean, Text, JSON, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Numeric, Boolean, Text, JSON, ForeignKey, Computed
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from src.services.database import Base
@@ -39,7 +39,8 @@ class ClaimItem(Base):
     description = Column(Text)
     quantity = Column(Integer, default=1)
     unit_price = Column(Numeric(10, 2))
-    total_price = Column(Numeric(10, 2))
+    # Generated by the database so every writer agrees on the line total
+    total_price = Column(Numeric(10, 2), Computed("unit_price * quantity", persisted=True))
     modifiers = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
 
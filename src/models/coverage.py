@@ -14,6 +14,7 @@ class Coverage(Base):
     patient_id = Column(String(50), ForeignKey('patients.patient_id'), nullable=False, index=True)
     insurance_company = Column(String(100), nullable=False)
     policy_number = Column(String(100), nullable=False)
+    subscriber_id = Column(String(100))
     group_number = Column(String(100))
     plan_name = Column(String(200))
     coverage_type = Column(String(50))  # primary, secondary, etc.
@@ -26,6 +27,8 @@ class Coverage(Base):
     out_of_pocket_met = Column(Numeric(10, 2))
     coverage_details = Column(JSON)
     active = Column(Boolean, default=True)
+    last_verified = Column(DateTime)
+    verification_status = Column(String(50))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
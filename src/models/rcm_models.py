@@ -2,7 +2,7 @@
 RCM Data Models
 Core database models for claims, eligibility, and workflow tracking
 """
-from sqlalchemy import Column, String, Integer, DateTime, Numeric, Boolean, Text, JSON, ForeignKey
+from sqlalchemy import Column, String, Integer, Date, DateTime, Numeric, Boolean, Text, JSON, ForeignKey
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from src.services.database import Base
@@ -29,6 +29,23 @@ class ClaimRecord(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class DailyKPIRollup(Base):
+    """Claim KPI totals per submission day and payer, refreshed from claims"""
+    __tablename__ = "daily_kpi_rollup"
+    
+    day = Column(Date, primary_key=True)
+    payer_id = Column(String(100), primary_key=True)  # claims.insurance_company, '' when unset
+    charges = Column(Numeric(14, 2), nullable=False, default=0)
+    payments = Column(Numeric(14, 2), nullable=False, default=0)
+    submitted = Column(Integer, nullable=False, default=0)
+    approved = Column(Integer, nullable=False, default=0)
+    denied = Column(Integer, nullable=False, default=0)
+    pending = Column(Integer, nullable=False, default=0)
+    paid = Column(Integer, nullable=False, default=0)
+    collection_days = Column(Integer, nullable=False, default=0)  # summed over paid claims
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class EligibilityCheck(Base):
     """Insurance eligibility check records"""
     __tablename__ = "eligibility_checks"
@@ -50,6 +50,13 @@ class ChatOrchestrator:
             'payment': PaymentPostingAgent()
         }
     
+    async def shutdown(self) -> None:
+        """Write work the agents still hold in memory; call on app shutdown"""
+        try:
+            await self.agents['verification'].flush_verifications()
+        except Exception as e:
+            logger.error(f"❌ Failed to flush coverage verifications on shutdown: {e}")
+    
     async def process_message(
         self,
         user_id: str,
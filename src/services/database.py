@@ -3,10 +3,11 @@ Database Service - SQLAlchemy Setup
 Provides database connection and session management
 """
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
-from typing import Generator
+from typing import AsyncGenerator, Generator
 import logging
 
 from config.settings import settings
@@ -31,6 +32,20 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Async engine and session factory for async routes, with the same pool
+# settings as the sync engine
+async_engine = create_async_engine(
+    settings.async_database_url,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    echo=settings.DB_ECHO,
+    pool_pre_ping=True,
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -72,6 +87,19 @@ def get_db_session() -> Session:
         pass  # Session will be closed by FastAPI
 
 
+async def get_async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async database session for FastAPI dependency injection
+    
+    Usage with FastAPI:
+        @app.get("/items")
+        async def get_items(db: AsyncSession = Depends(get_async_db_session)):
+            return (await db.execute(select(Item))).scalars().all()
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """Initialize database - create all tables"""
     logger.info("Initializing database...")
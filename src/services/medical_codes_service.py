@@ -2,21 +2,190 @@
 Medical codes service with validation and search
 Week 1-2 Implementation
 """
-from typing import List, Optional, Dict, Any
+import asyncio
+import bisect
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 from datetime import datetime
+from cachetools import LRUCache, TTLCache
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, text
+from sqlalchemy import select, func, or_, text, bindparam
 import logging
 
+try:
+    from rbloom import Bloom
+    RBLOOM_AVAILABLE = True
+except ImportError:
+    RBLOOM_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Description words for the in-memory code index
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+class CodeIndex:
+    """
+    In-memory prefix and keyword index over one code table
+    
+    Code prefixes are answered by bisecting the sorted code list, keyword
+    queries by intersecting per-word postings of description words. Both
+    return entries in code order. Words are matched exactly (the last one
+    optionally as a prefix), not stemmed, so callers fall back to the
+    database full-text search when nothing matches.
+    
+    Shared by MedicalCodingAgent (row dicts) and the analytics
+    MedicalCodeService (code models); code and description read the two
+    fields from an entry.
+    """
+    
+    __slots__ = ('entries', 'codes', 'postings', 'words')
+    
+    def __init__(
+        self,
+        entries: Iterable[Any],
+        code: Callable[[Any], str],
+        description: Callable[[Any], str]
+    ):
+        self.entries = sorted(entries, key=lambda entry: code(entry).upper())
+        self.codes = [code(entry).upper() for entry in self.entries]
+        postings: Dict[str, List[int]] = {}
+        for idx, entry in enumerate(self.entries):
+            for word in set(_WORD.findall(description(entry).lower())):
+                postings.setdefault(word, []).append(idx)
+        self.postings = {word: tuple(ids) for word, ids in postings.items()}
+        self.words = sorted(self.postings)
+    
+    def by_prefix(self, prefix: str) -> Iterator[Any]:
+        """Entries whose code starts with prefix (upper-case)"""
+        start = bisect.bisect_left(self.codes, prefix)
+        for idx in range(start, len(self.codes)):
+            if not self.codes[idx].startswith(prefix):
+                break
+            yield self.entries[idx]
+    
+    def by_words(self, query: str, prefix_last_word: bool = False) -> Iterator[Any]:
+        """
+        Entries whose description contains every word of query
+        
+        With prefix_last_word the last word also matches longer words it
+        starts, for search-as-you-type.
+        """
+        words = _WORD.findall(query.lower())
+        if not words:
+            return iter(())
+        
+        matches = None
+        if prefix_last_word:
+            last = words.pop()
+            start = bisect.bisect_left(self.words, last)
+            end = bisect.bisect_left(self.words, last + "\uffff")
+            matches = set().union(*(self.postings[word] for word in self.words[start:end]))
+        
+        for ids in sorted((self.postings.get(word, ()) for word in set(words)), key=len):
+            if matches is None:
+                matches = set(ids)
+            else:
+                matches.intersection_update(ids)
+            if not matches:
+                break
+        return (self.entries[idx] for idx in sorted(matches))
+
+
+def _icd10_info(row) -> Dict[str, Any]:
+    """Validation result for an icd10_codes row"""
+    return {
+        'valid': True,
+        'code': row[0],
+        'description': row[1],
+        'billable': row[2],
+        'category': row[3],
+        'subcategory': row[4]
+    }
+
+
+def _cpt_info(row) -> Dict[str, Any]:
+    """Validation result for a cpt_codes row"""
+    return {
+        'valid': True,
+        'code': row[0],
+        'description': row[1],
+        'category': row[2],
+        'modifier_allowed': row[3],
+        'base_rate': float(row[4]) if row[4] else None,
+        'rvu': float(row[5]) if row[5] else None
+    }
+
 
 class MedicalCodesService:
     """Service for medical code operations"""
     
+    # Validation results keyed by (code system, normalized code), shared
+    # by every service instance. Found codes are kept until evicted (code
+    # tables only grow on import); "not found" results expire after
+    # NEGATIVE_TTL, since imports run in other processes and cannot clear
+    # this cache, so a newly imported code shows up within a minute.
+    NEGATIVE_TTL = 60  # seconds
+    _validation_cache: LRUCache = LRUCache(maxsize=4096)
+    _not_found_cache: TTLCache = TTLCache(maxsize=4096, ttl=NEGATIVE_TTL)
+    
+    # Per code system membership filters, installed by MedicalCodingAgent
+    # whenever it (re)builds its code index; a code not in the filter is
+    # invalid without a database lookup. A bloom filter (0.1% false
+    # positives, which fall through to the query) when rbloom is installed,
+    # otherwise an exact frozenset. Filters expire after CODE_FILTER_TTL so
+    # codes imported since are looked up again until the next rebuild.
+    CODE_FILTER_TTL = 3600  # seconds
+    _code_filters: TTLCache = TTLCache(maxsize=8, ttl=CODE_FILTER_TTL)
+    
+    # Caches built from the code tables outside this service, cleared
+    # together with its own
+    _dependent_caches: List[Any] = []
+    
     def __init__(self, db_session: AsyncSession):
         self.db = db_session
     
+    @classmethod
+    def register_code_cache(cls, cache: Any) -> None:
+        """Have clear_code_cache() also clear cache (anything with .clear())"""
+        cls._dependent_caches.append(cache)
+    
+    @classmethod
+    def clear_code_cache(cls) -> None:
+        """Drop cached validations, e.g. after a code table import"""
+        cls._validation_cache.clear()
+        cls._not_found_cache.clear()
+        cls._code_filters.clear()
+        for cache in cls._dependent_caches:
+            cache.clear()
+    
+    @classmethod
+    def _cached_validation(cls, key: tuple) -> Optional[Dict[str, Any]]:
+        """Cached validation result for key, found or not, if any"""
+        cached = cls._validation_cache.get(key)
+        if cached is None:
+            cached = cls._not_found_cache.get(key)
+        return cached
+    
+    @classmethod
+    def _cache_validation(cls, key: tuple, info: Dict[str, Any]) -> None:
+        """Cache a validation result; not-found results only for NEGATIVE_TTL"""
+        if info['valid']:
+            cls._validation_cache[key] = info
+        else:
+            cls._not_found_cache[key] = info
+    
+    @classmethod
+    def set_code_filter(cls, code_type: str, codes: Iterable[str]) -> None:
+        """Install the membership filter for a code system from all its codes"""
+        codes = list(codes)
+        if RBLOOM_AVAILABLE:
+            code_filter = Bloom(max(len(codes), 1), 0.001)
+            code_filter.update(codes)
+        else:
+            code_filter = frozenset(codes)
+        cls._code_filters[code_type] = code_filter
+    
     async def validate_icd10_code(self, code: str) -> Dict[str, Any]:
         """
         Validate an ICD-10 diagnosis code
@@ -30,6 +199,19 @@ class MedicalCodesService:
                 'category': str
             }
         """
+        key = ('icd10', code.strip().upper())
+        cached = self._cached_validation(key)
+        if cached is not None:
+            return dict(cached)
+        
+        code_filter = self._code_filters.get('icd10')
+        if code_filter is not None and key[1] not in code_filter:
+            return {
+                'valid': False,
+                'code': code,
+                'error': f'ICD-10 code {code} not found'
+            }
+        
         result = await self.db.execute(
             text("""
                 SELECT code, description, is_billable, category, subcategory
@@ -42,20 +224,16 @@ class MedicalCodesService:
         row = result.fetchone()
         
         if row:
-            return {
-                'valid': True,
-                'code': row[0],
-                'description': row[1],
-                'billable': row[2],
-                'category': row[3],
-                'subcategory': row[4]
-            }
+            info = _icd10_info(row)
         else:
-            return {
+            info = {
                 'valid': False,
                 'code': code,
                 'error': f'ICD-10 code {code} not found'
             }
+        
+        self._cache_validation(key, info)
+        return dict(info)
     
     async def validate_cpt_code(self, code: str) -> Dict[str, Any]:
         """
@@ -71,6 +249,19 @@ class MedicalCodesService:
                 'base_rate': float
             }
         """
+        key = ('cpt', code.strip())
+        cached = self._cached_validation(key)
+        if cached is not None:
+            return dict(cached)
+        
+        code_filter = self._code_filters.get('cpt')
+        if code_filter is not None and key[1] not in code_filter:
+            return {
+                'valid': False,
+                'code': code,
+                'error': f'CPT code {code} not found'
+            }
+        
         result = await self.db.execute(
             text("""
                 SELECT code, description, category, modifier_allowed, base_rate, rvu
@@ -83,21 +274,100 @@ class MedicalCodesService:
         row = result.fetchone()
         
         if row:
-            return {
-                'valid': True,
-                'code': row[0],
-                'description': row[1],
-                'category': row[2],
-                'modifier_allowed': row[3],
-                'base_rate': float(row[4]) if row[4] else None,
-                'rvu': float(row[5]) if row[5] else None
-            }
+            info = _cpt_info(row)
         else:
-            return {
+            info = {
                 'valid': False,
                 'code': code,
                 'error': f'CPT code {code} not found'
             }
+        
+        self._cache_validation(key, info)
+        return dict(info)
+    
+    async def batch_validate_codes(
+        self,
+        icd10_codes: List[str],
+        cpt_codes: List[str]
+    ) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Validate many ICD-10 and CPT codes with one IN query per code system
+        
+        The two queries run concurrently when both lists are non-empty, and
+        their rows are streamed in batches so large audit lists never hold
+        a full buffered result set.
+        
+        Returns:
+            {
+                'icd10': {code: validation result},
+                'cpt': {code: validation result}
+            }
+            keyed by the codes as given, with results shaped like
+            validate_icd10_code / validate_cpt_code
+        """
+        if icd10_codes and cpt_codes:
+            # AsyncSession is not safe for concurrent use, so the CPT query
+            # runs on its own session alongside the ICD-10 one
+            async with AsyncSession(self.db.bind, expire_on_commit=False) as cpt_session:
+                icd10_found, cpt_found = await asyncio.gather(
+                    self._find_icd10_codes(self.db, icd10_codes),
+                    self._find_cpt_codes(cpt_session, cpt_codes)
+                )
+        else:
+            icd10_found = await self._find_icd10_codes(self.db, icd10_codes) if icd10_codes else {}
+            cpt_found = await self._find_cpt_codes(self.db, cpt_codes) if cpt_codes else {}
+        
+        icd10_results = {}
+        for code in icd10_codes:
+            info = icd10_found.get(code.strip().upper())
+            if info is None:
+                info = {'valid': False, 'code': code, 'error': f'ICD-10 code {code} not found'}
+            self._cache_validation(('icd10', code.strip().upper()), info)
+            icd10_results[code] = dict(info)
+        
+        cpt_results = {}
+        for code in cpt_codes:
+            info = cpt_found.get(code.strip())
+            if info is None:
+                info = {'valid': False, 'code': code, 'error': f'CPT code {code} not found'}
+            self._cache_validation(('cpt', code.strip()), info)
+            cpt_results[code] = dict(info)
+        
+        return {'icd10': icd10_results, 'cpt': cpt_results}
+    
+    @staticmethod
+    async def _find_icd10_codes(
+        session: AsyncSession,
+        codes: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Validation results for the ICD-10 codes that exist, by upper-cased code"""
+        result = await session.stream(
+            text("""
+                SELECT code, description, is_billable, category, subcategory
+                FROM icd10_codes
+                WHERE UPPER(code) IN :codes
+            """).bindparams(bindparam('codes', expanding=True))
+                .execution_options(yield_per=1000),
+            {'codes': list({code.strip().upper() for code in codes})}
+        )
+        return {row[0].upper(): _icd10_info(row) async for row in result}
+    
+    @staticmethod
+    async def _find_cpt_codes(
+        session: AsyncSession,
+        codes: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Validation results for the CPT codes that exist, by code"""
+        result = await session.stream(
+            text("""
+                SELECT code, description, category, modifier_allowed, base_rate, rvu
+                FROM cpt_codes
+                WHERE code IN :codes
+            """).bindparams(bindparam('codes', expanding=True))
+                .execution_options(yield_per=1000),
+            {'codes': list({code.strip() for code in codes})}
+        )
+        return {row[0]: _cpt_info(row) async for row in result}
     
     async def search_icd10_codes(
         self, 
@@ -168,6 +438,119 @@ class MedicalCodesService:
             for row in result.fetchall()
         ]
     
+    async def search_icd10_codes_multi(
+        self,
+        keywords: List[str],
+        limit: int = 15
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search for ICD-10 codes matching any of several keywords
+        
+        One query replaces a search_icd10_codes call per keyword; results
+        are ranked together, so each code appears once.
+        """
+        if not keywords:
+            return []
+        
+        result = await self.db.execute(
+            text("""
+                SELECT code, description, category, is_billable,
+                       ts_rank(to_tsvector('english', description), query) as rank
+                FROM icd10_codes, 
+                     websearch_to_tsquery('english', :query) query
+                WHERE to_tsvector('english', description) @@ query
+                ORDER BY rank DESC
+                LIMIT :limit
+            """),
+            {'query': ' OR '.join(keywords), 'limit': limit}
+        )
+        
+        return [
+            {
+                'code': row[0],
+                'description': row[1],
+                'category': row[2],
+                'billable': row[3],
+                'relevance': float(row[4])
+            }
+            for row in result.fetchall()
+        ]
+    
+    async def search_cpt_codes_multi(
+        self,
+        keywords: List[str],
+        limit: int = 15
+    ) -> List[Dict[str, Any]]:
+        """Full-text search for CPT codes matching any of several keywords"""
+        if not keywords:
+            return []
+        
+        result = await self.db.execute(
+            text("""
+                SELECT code, description, category, base_rate,
+                       ts_rank(to_tsvector('english', description), query) as rank
+                FROM cpt_codes, 
+                     websearch_to_tsquery('english', :query) query
+                WHERE to_tsvector('english', description) @@ query
+                ORDER BY rank DESC
+                LIMIT :limit
+            """),
+            {'query': ' OR '.join(keywords), 'limit': limit}
+        )
+        
+        return [
+            {
+                'code': row[0],
+                'description': row[1],
+                'category': row[2],
+                'base_rate': float(row[3]) if row[3] else None,
+                'relevance': float(row[4])
+            }
+            for row in result.fetchall()
+        ]
+    
+    async def load_all_icd10(self) -> List[Dict[str, Any]]:
+        """All ICD-10 codes in search-result shape, for in-memory indexing"""
+        result = await self.db.execute(
+            text("""
+                SELECT code, description, category, is_billable
+                FROM icd10_codes
+                ORDER BY code
+            """)
+        )
+        
+        return [
+            {
+                'code': row[0],
+                'description': row[1],
+                'category': row[2],
+                'billable': row[3],
+                'relevance': 1.0
+            }
+            for row in result.fetchall()
+        ]
+    
+    async def load_all_cpt(self) -> List[Dict[str, Any]]:
+        """All CPT codes in search-result shape, for in-memory indexing"""
+        result = await self.db.execute(
+            text("""
+                SELECT code, description, category, base_rate
+                FROM cpt_codes
+                ORDER BY code
+            """)
+        )
+        
+        return [
+            {
+                'code': row[0],
+                'description': row[1],
+                'category': row[2],
+                'base_rate': float(row[3]) if row[3] else None,
+                'relevance': 1.0
+            }
+            for row in result.fetchall()
+        ]
+    
     async def check_medical_necessity(
         self,
         cpt_code: str,
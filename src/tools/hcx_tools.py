@@ -10,7 +10,7 @@ Fixes:
 import httpx
 import json
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from typing import Dict, Any, Optional
 from praisonaiagents import Tool
 from fhir.resources.coverageeligibilityrequest import CoverageEligibilityRequest
@@ -23,6 +23,7 @@ from fhir.resources.reference import Reference
 from fhir.resources.identifier import Identifier
 from fhir.resources.money import Money
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -31,6 +32,8 @@ from tenacity import (
 )
 import logging
 
+from src.models.coverage import Coverage
+
 logger = logging.getLogger(__name__)
 
 
@@ -236,6 +239,59 @@ class HCXEligibilityTool(Tool):
                 "message": str(e)
             }
     
+    async def check_eligibility(
+        self,
+        patient_id: str,
+        coverage_id: Optional[str] = None,
+        service_date: Optional[date] = None,
+        db_session: Optional[AsyncSession] = None,
+        coverage: Optional[Coverage] = None
+    ) -> Dict[str, Any]:
+        """
+        Check eligibility for a stored coverage record
+        
+        Args:
+            patient_id: Patient ID
+            coverage_id: Coverage ID, looked up when coverage is not given
+            service_date: Date of service (defaults to today)
+            db_session: Database session used for the lookup
+            coverage: Already-loaded coverage (ORM object or row); skips
+                the database round-trip
+        
+        Returns:
+            {'success': bool, 'eligibility_data': {...}} or
+            {'success': False, 'error': str}
+        """
+        if coverage is None:
+            if db_session is None:
+                raise ValueError("Either coverage or db_session is required")
+            coverage = await db_session.get(Coverage, coverage_id)
+            if coverage is None:
+                return {'success': False, 'error': f"Coverage not found: {coverage_id}"}
+        
+        query = {
+            'patient_id': patient_id,
+            'insurance_company': coverage.insurance_company,
+            'policy_number': coverage.policy_number,
+        }
+        if service_date is not None:
+            query['service_date'] = service_date.isoformat()
+        
+        response = await self._run(json.dumps(query))
+        if response.get('status') != 'success':
+            return {'success': False, 'error': response.get('message', 'Unknown error')}
+        
+        # _parse_response reports 0.0 when the payer sent no copay benefit,
+        # so the copay on file is kept in that case
+        return {
+            'success': True,
+            'eligibility_data': {
+                'is_active': response['eligible'],
+                'copay_amount': response['copay'] or coverage.copay,
+                'requires_authorization': response['requires_preauth'],
+            }
+        }
+    
     def _create_fhir_request(self, data: Dict) -> CoverageEligibilityRequest:
         """Create complete FHIR CoverageEligibilityRequest"""
         request_id = str(uuid.uuid4())
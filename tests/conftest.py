@@ -262,8 +262,7 @@ async def sample_claim(
             procedure_description=cpt_code.description,
             service_date=date.today(),
             quantity=1.0,
-            unit_price=200.0,
-            total_price=200.0
+            unit_price=200.0
         )
         db_session.add(item)
     
@@ -425,6 +424,28 @@ def mock_openai_response():
     }
 
 
+# ============================================================================
+# SHARED CACHE FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def clear_code_cache():
+    """Start and end a test with empty MedicalCodesService caches"""
+    from src.services.medical_codes_service import MedicalCodesService
+    MedicalCodesService.clear_code_cache()
+    yield
+    MedicalCodesService.clear_code_cache()
+
+
+@pytest.fixture
+def clear_processed_eras():
+    """Start and end a test without cached ERAs"""
+    from src.agents.payment_posting import ERAProcessingTool
+    ERAProcessingTool._processed.clear()
+    yield
+    ERAProcessingTool._processed.clear()
+
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -5,6 +5,9 @@ Week 3-4 Implementation
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 
+# Code validations are cached per process; start every test empty
+pytestmark = pytest.mark.usefixtures("clear_code_cache")
+
 
 @pytest.mark.integration
 class TestMedicalCodesIntegration:
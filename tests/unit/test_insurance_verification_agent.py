@@ -0,0 +1,192 @@
+"""
+Unit tests for the insurance verification agent
+"""
+import pytest
+from unittest.mock import Mock, AsyncMock, MagicMock
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """Verification agent with the HCX client and PraisonAI agent mocked out"""
+    from src.agents import insurance_verification_agent as module
+    monkeypatch.setattr(module, "_get_hcx_tools", lambda: (Mock(), Mock()))
+    monkeypatch.setattr(module, "_get_verification_agent", Mock)
+    return module.InsuranceVerificationAgent()
+
+
+def _session_returning(rows):
+    """Mock AsyncSession whose execute() result yields rows"""
+    mock_session = MagicMock()
+    mock_result = MagicMock()
+    mock_result.all.return_value = rows
+    mock_session.execute = AsyncMock(return_value=mock_result)
+    return mock_session
+
+
+@pytest.mark.unit
+class TestCheckAuthorizationRequirementsBulk:
+    """Test InsuranceVerificationAgent.check_authorization_requirements_bulk"""
+    
+    @pytest.mark.asyncio
+    async def test_string_coverage_ids_are_found(self, agent):
+        """Test string coverage ids match the integer primary keys"""
+        mock_session = _session_returning([(1, "Misr Insurance"), (2, "AXA Egypt")])
+        
+        results = await agent.check_authorization_requirements_bulk(
+            [
+                ("outpatient", ["99213"], "1"),
+                ("emergency", ["99285"], "2"),
+                ("outpatient", ["99213"], "1"),
+            ],
+            db_session=mock_session
+        )
+        
+        assert [r['found'] for r in results] == [True, True, True]
+        assert results[0]['requires_authorization'] is False
+        assert "Misr Insurance" in results[0]['message']
+        assert results[1]['procedures_requiring_auth'] == ["99285"]
+        assert "AXA Egypt" in results[1]['message']
+        mock_session.execute.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_missing_coverage(self, agent):
+        """Test only the unknown coverage reports not found"""
+        mock_session = _session_returning([(1, "Misr Insurance")])
+        
+        results = await agent.check_authorization_requirements_bulk(
+            [("outpatient", ["99213"], "1"), ("outpatient", ["99213"], "7")],
+            db_session=mock_session
+        )
+        
+        assert results[0]['found'] is True
+        assert results[1] == {'found': False, 'message': "❌ Coverage not found: 7"}
+    
+    @pytest.mark.asyncio
+    async def test_non_numeric_coverage_id(self, agent):
+        """Test a malformed coverage id is reported instead of raised"""
+        mock_session = _session_returning([])
+        
+        results = await agent.check_authorization_requirements_bulk(
+            [("outpatient", ["99213"], "abc")],
+            db_session=mock_session
+        )
+        
+        assert results[0]['found'] is False
+        assert results[0]['message'].startswith("Error checking authorization")
+        mock_session.execute.assert_not_awaited()
+
+
+@pytest.mark.unit
+class TestCoverageLookups:
+    """Test the single-coverage lookups share a request session safely"""
+    
+    @pytest.mark.asyncio
+    async def test_authorization_then_estimate_on_one_session(self, agent):
+        """Test both lookups select columns instead of caching partial entities"""
+        from decimal import Decimal
+        mock_session = MagicMock()
+        mock_session.get = AsyncMock(side_effect=AssertionError("entity lookup"))
+        mock_session.scalar = AsyncMock(return_value="Misr Insurance")
+        mock_result = MagicMock()
+        mock_result.first.return_value = Mock(
+            copay=Decimal("50.00"),
+            deductible=Decimal("1000.00"),
+            deductible_met=Decimal("1000.00"),
+            out_of_pocket_max=None,
+            out_of_pocket_met=None
+        )
+        mock_session.execute = AsyncMock(return_value=mock_result)
+        
+        auth = await agent.check_authorization_requirements(
+            "outpatient", ["99213"], "1", db_session=mock_session
+        )
+        estimate = await agent.estimate_patient_responsibility(
+            1000.0, "1", db_session=mock_session
+        )
+        
+        assert auth['found'] is True
+        assert "Misr Insurance" in auth['message']
+        assert estimate['found'] is True
+        assert estimate['estimate']['copay'] == 50.0
+        mock_session.get.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_estimate_missing_coverage(self, agent):
+        """Test an unknown coverage id reports not found"""
+        mock_session = MagicMock()
+        mock_result = MagicMock()
+        mock_result.first.return_value = None
+        mock_session.execute = AsyncMock(return_value=mock_result)
+        
+        result = await agent.estimate_patient_responsibility(
+            1000.0, "7", db_session=mock_session
+        )
+        
+        assert result == {'found': False, 'message': "❌ Coverage not found: 7"}
+
+
+@pytest.mark.unit
+class TestVerificationFlush:
+    """Test batched coverage verification writes"""
+    
+    @pytest.fixture
+    def flush_session(self, monkeypatch):
+        """Session handed out by the module session factory"""
+        from src.agents import insurance_verification_agent as module
+        mock_session = MagicMock()
+        mock_session.execute = AsyncMock()
+        mock_session.commit = AsyncMock()
+        factory = MagicMock()
+        factory.return_value.__aenter__ = AsyncMock(return_value=mock_session)
+        factory.return_value.__aexit__ = AsyncMock(return_value=False)
+        monkeypatch.setattr(module, "_sessionmaker", factory)
+        return mock_session
+    
+    @pytest.mark.asyncio
+    async def test_flush_uses_its_own_session(self, agent, flush_session):
+        """Test the shared queue is committed on a session of its own"""
+        from datetime import datetime
+        agent._pending_verifications = [(1, datetime(2025, 1, 1)), (2, datetime(2025, 1, 1))]
+        
+        assert await agent.flush_verifications() == 2
+        
+        assert agent._pending_verifications == []
+        flush_session.commit.assert_awaited_once()
+        rows = flush_session.execute.await_args.args[1]
+        assert [row['id'] for row in rows] == [1, 2]
+    
+    @pytest.mark.asyncio
+    async def test_failed_flush_requeues_up_to_limit(self, agent, flush_session, monkeypatch):
+        """Test a failing flush keeps only the newest queued updates"""
+        from datetime import datetime
+        from sqlalchemy.exc import OperationalError
+        from src.agents import insurance_verification_agent as module
+        monkeypatch.setattr(module, "VERIFICATION_QUEUE_LIMIT", 3)
+        flush_session.execute.side_effect = OperationalError("UPDATE", {}, Exception("down"))
+        agent._pending_verifications = [(i, datetime(2025, 1, 1)) for i in range(5)]
+        
+        with pytest.raises(OperationalError):
+            await agent.flush_verifications()
+        
+        assert [coverage_id for coverage_id, _ in agent._pending_verifications] == [2, 3, 4]
+    
+    @pytest.mark.asyncio
+    async def test_periodic_flush_survives_unexpected_errors(self, agent, monkeypatch):
+        """Test the background flush keeps running after a non-database error"""
+        import asyncio
+        from datetime import datetime
+        calls = []
+        
+        async def failing_flush():
+            calls.append(1)
+            if len(calls) == 2:
+                raise asyncio.CancelledError
+            raise RuntimeError("boom")
+        
+        monkeypatch.setattr(agent, "flush_verifications", failing_flush)
+        agent._pending_verifications = [(1, datetime(2025, 1, 1))]
+        
+        with pytest.raises(asyncio.CancelledError):
+            await agent.flush_periodically(interval=0)
+        
+        assert len(calls) == 2
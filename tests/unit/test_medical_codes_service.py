@@ -6,6 +6,9 @@ import pytest
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from datetime import datetime
 
+# Code validations are cached per process; start every test empty
+pytestmark = pytest.mark.usefixtures("clear_code_cache")
+
 
 @pytest.mark.unit
 class TestMedicalCodesService:
@@ -269,6 +272,110 @@ class TestMedicalCodesService:
         results = await service.search_icd10_codes("diabetes", limit=5)
         
         assert len(results) == 5
+    
+    @pytest.mark.asyncio
+    async def test_validate_code_cache_hit(self):
+        """Test repeated validations are served from the cache"""
+        mock_session = MagicMock()
+        mock_result = MagicMock()
+        mock_result.fetchone.return_value = ("E11.9", "Type 2 diabetes mellitus without complications", True, "Endocrine", "Diabetes")
+        mock_session.execute = AsyncMock(return_value=mock_result)
+        
+        from src.services.medical_codes_service import MedicalCodesService
+        first = await MedicalCodesService(mock_session).validate_icd10_code("E11.9")
+        first['description'] = "changed by caller"
+        
+        # Another instance, with the key normalized the same way
+        second = await MedicalCodesService(mock_session).validate_icd10_code(" e11.9")
+        
+        assert mock_session.execute.await_count == 1
+        assert second['valid'] is True
+        assert second['description'] == "Type 2 diabetes mellitus without complications"
+    
+    @pytest.mark.asyncio
+    async def test_validate_code_cache_miss(self):
+        """Test uncached codes and cleared caches go to the database"""
+        mock_session = MagicMock()
+        mock_result = MagicMock()
+        mock_result.fetchone.return_value = None
+        mock_session.execute = AsyncMock(return_value=mock_result)
+        
+        from src.services.medical_codes_service import MedicalCodesService
+        service = MedicalCodesService(mock_session)
+        
+        await service.validate_cpt_code("00000")
+        await service.validate_cpt_code("00001")
+        assert mock_session.execute.await_count == 2
+        
+        MedicalCodesService.clear_code_cache()
+        result = await service.validate_cpt_code("00000")
+        
+        assert mock_session.execute.await_count == 3
+        assert result['valid'] is False
+    
+    @pytest.mark.asyncio
+    async def test_not_found_result_expires(self, monkeypatch):
+        """Test a code imported after a failed lookup validates once the miss expires"""
+        from cachetools import TTLCache
+        from src.services.medical_codes_service import MedicalCodesService
+        now = [0.0]
+        monkeypatch.setattr(
+            MedicalCodesService, "_not_found_cache",
+            TTLCache(maxsize=16, ttl=MedicalCodesService.NEGATIVE_TTL, timer=lambda: now[0])
+        )
+        mock_session = MagicMock()
+        mock_result = MagicMock()
+        mock_result.fetchone.side_effect = [
+            None,
+            ("99499", "Unlisted evaluation and management service", "E/M", True, 100, 1.0)
+        ]
+        mock_session.execute = AsyncMock(return_value=mock_result)
+        service = MedicalCodesService(mock_session)
+        
+        assert (await service.validate_cpt_code("99499"))['valid'] is False
+        assert (await service.validate_cpt_code("99499"))['valid'] is False
+        assert mock_session.execute.await_count == 1
+        
+        now[0] += MedicalCodesService.NEGATIVE_TTL
+        result = await service.validate_cpt_code("99499")
+        
+        assert mock_session.execute.await_count == 2
+        assert result['valid'] is True
+    
+    @pytest.mark.asyncio
+    async def test_code_filter_rejects_without_query(self):
+        """Test codes missing from the membership filter skip the database"""
+        mock_session = MagicMock()
+        mock_session.execute = AsyncMock()
+        
+        from src.services.medical_codes_service import MedicalCodesService
+        MedicalCodesService.set_code_filter('cpt', ["99213"])
+        result = await MedicalCodesService(mock_session).validate_cpt_code("12345")
+        
+        assert result['valid'] is False
+        mock_session.execute.assert_not_awaited()
+    
+    @pytest.mark.asyncio
+    async def test_code_filter_expires(self, monkeypatch):
+        """Test an expired membership filter no longer rejects codes"""
+        from cachetools import TTLCache
+        from src.services.medical_codes_service import MedicalCodesService
+        now = [0.0]
+        monkeypatch.setattr(
+            MedicalCodesService, "_code_filters",
+            TTLCache(maxsize=8, ttl=MedicalCodesService.CODE_FILTER_TTL, timer=lambda: now[0])
+        )
+        mock_session = MagicMock()
+        mock_result = MagicMock()
+        mock_result.fetchone.return_value = ("99499", "Unlisted evaluation and management service", "E/M", True, 100, 1.0)
+        mock_session.execute = AsyncMock(return_value=mock_result)
+        MedicalCodesService.set_code_filter('cpt', ["99213"])
+        
+        now[0] += MedicalCodesService.CODE_FILTER_TTL
+        result = await MedicalCodesService(mock_session).validate_cpt_code("99499")
+        
+        assert result['valid'] is True
+        mock_session.execute.assert_awaited_once()
 
 
 @pytest.mark.unit
@@ -311,3 +418,39 @@ class TestMedicalCodesValidation:
         assert not (17 >= age_min and 17 <= age_max)
         assert not (66 >= age_min and 66 <= age_max)
 
+
+
+@pytest.mark.unit
+class TestCodeIndex:
+    """Test the in-memory code search index"""
+    
+    @pytest.fixture
+    def index(self):
+        from operator import itemgetter
+        from src.services.medical_codes_service import CodeIndex
+        rows = [
+            {'code': "E11.65", 'description': "Type 2 diabetes mellitus with hyperglycemia"},
+            {'code': "E11.9", 'description': "Type 2 diabetes mellitus without complications"},
+            {'code': "E10.9", 'description': "Type 1 diabetes mellitus without complications"},
+            {'code': "I10", 'description': "Essential (primary) hypertension"},
+        ]
+        return CodeIndex(rows, itemgetter('code'), itemgetter('description'))
+    
+    def test_by_prefix(self, index):
+        """Test code prefixes return matching codes in code order"""
+        assert [row['code'] for row in index.by_prefix("E11")] == ["E11.65", "E11.9"]
+        assert list(index.by_prefix("Z")) == []
+    
+    def test_by_words(self, index):
+        """Test every query word must appear in the description"""
+        codes = [row['code'] for row in index.by_words("diabetes without")]
+        
+        assert codes == ["E10.9", "E11.9"]
+        assert list(index.by_words("diabetes hypertension")) == []
+        assert list(index.by_words("diab")) == []
+    
+    def test_by_words_last_word_prefix(self, index):
+        """Test the last word matches as a prefix for typeahead"""
+        codes = [row['code'] for row in index.by_words("type 2 diab", prefix_last_word=True)]
+        
+        assert codes == ["E11.65", "E11.9"]
@@ -0,0 +1,300 @@
+"""
+Unit tests for payment posting ERA parsing, validation and reconciliation
+"""
+import json
+import pytest
+from datetime import datetime
+from decimal import Decimal
+
+# Stored ERAs are shared per process; start every test without them
+pytestmark = pytest.mark.usefixtures("clear_processed_eras")
+
+
+SAMPLE_835 = (
+    "ISA*00*          *00*          *ZZ*PAYER01        *ZZ*PROVIDER01     *240115*1200*^*00501*000000001*0*P*:~"
+    "BPR*I*150.00*C*ACH*CCP*01*999999999*DA*123456*1234567890**01*888888888*DA*98765*20240115~"
+    "TRN*1*CHK12345*1234567890~"
+    "N1*PR*MISR INSURANCE*XV*PAYER01~"
+    "N1*PE*HEALTHFLOW CLINIC*XX*1234567890~"
+    "CLP*CLM-001*1*200.00*100.00*20.00~"
+    "CAS*CO*45*60.00~"
+    "CAS*PR*1*20.00~"
+    "SVC*HC:99213*120.00*60.00**2~"
+    "SVC*HC:85025*80.00*40.00~"
+    "CLP*CLM-002*1*80.00*50.00~"
+    "SVC*99214*80.00*50.00~"
+    "SE*12*0001~"
+)
+
+# Output of the original split()-based parser for SAMPLE_835
+BASELINE_ERA = {
+    'payer_id': 'PAYER01',
+    'payer_name': 'MISR INSURANCE',
+    'check_number': '',
+    'check_date': datetime(2024, 1, 15),
+    'check_amount': Decimal('150.00'),
+    'claims': [
+        {
+            'claim_id': 'CLM-001',
+            'claim_status': '1',
+            'billed_amount': Decimal('200.00'),
+            'paid_amount': Decimal('100.00'),
+            'patient_responsibility': Decimal('20.00'),
+            'service_lines': [
+                {'procedure_code': '99213', 'billed_amount': Decimal('120.00'), 'paid_amount': Decimal('60.00'), 'units': 2},
+                {'procedure_code': '85025', 'billed_amount': Decimal('80.00'), 'paid_amount': Decimal('40.00'), 'units': 1},
+            ],
+            'adjustments': [
+                {'group_code': 'CO', 'reason_code': '45', 'amount': Decimal('60.00')},
+                {'group_code': 'PR', 'reason_code': '1', 'amount': Decimal('20.00')},
+            ],
+        },
+        {
+            'claim_id': 'CLM-002',
+            'claim_status': '1',
+            'billed_amount': Decimal('80.00'),
+            'paid_amount': Decimal('50.00'),
+            'patient_responsibility': Decimal('0'),
+            'service_lines': [
+                {'procedure_code': '99214', 'billed_amount': Decimal('80.00'), 'paid_amount': Decimal('50.00'), 'units': 1},
+            ],
+        },
+    ],
+}
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "pure-python"])
+def numpy_mode(request, monkeypatch):
+    """Run a test with and without the NumPy amount columns"""
+    from src.agents import payment_posting
+    if request.param:
+        pytest.importorskip("numpy")
+    monkeypatch.setattr(payment_posting, "NUMPY_AVAILABLE", request.param)
+    return request.param
+
+
+@pytest.mark.unit
+class TestERAParsing:
+    """Test X12 835 parsing"""
+    
+    @pytest.mark.parametrize("content", [SAMPLE_835, SAMPLE_835.encode()], ids=["str", "bytes"])
+    def test_parse_matches_baseline(self, content):
+        """Test parsed ERA matches the original parser's output"""
+        from src.agents.payment_posting import ERAProcessingTool
+        
+        era = ERAProcessingTool(None)._parse_x12_835(content)
+        
+        assert era.pop('_paid_cents') == 15000
+        assert era == BASELINE_ERA
+    
+    def test_parse_date(self):
+        """Test ERA date parsing"""
+        from src.agents.payment_posting import ERAProcessingTool
+        tool = ERAProcessingTool(None)
+        
+        assert tool._parse_date("20240229") == datetime(2024, 2, 29)
+        assert isinstance(tool._parse_date("2024-02"), datetime)
+
+
+@pytest.mark.unit
+class TestERAValidation:
+    """Test ERA validation"""
+    
+    def _era(self, check_amount, *paid_amounts):
+        return {
+            'payer_id': 'PAYER01',
+            'check_amount': Decimal(check_amount),
+            'claims': [{'paid_amount': Decimal(paid)} for paid in paid_amounts],
+        }
+    
+    @pytest.mark.parametrize("check_amount", ["150.00", "150.01", "149.99"])
+    def test_total_within_one_cent(self, check_amount, numpy_mode):
+        """Test a claims total within one cent of the check is accepted"""
+        from src.agents.payment_posting import ERAProcessingTool
+        
+        validation = ERAProcessingTool(None)._validate_era(self._era(check_amount, "100.00", "50.00"))
+        
+        assert validation == {'valid': True, 'errors': []}
+    
+    @pytest.mark.parametrize("check_amount", ["150.02", "149.98"])
+    def test_total_mismatch(self, check_amount, numpy_mode):
+        """Test a claims total two cents off the check is rejected"""
+        from src.agents.payment_posting import ERAProcessingTool
+        
+        validation = ERAProcessingTool(None)._validate_era(self._era(check_amount, "100.00", "50.00"))
+        
+        assert validation['valid'] is False
+        assert validation['errors'] == [f"Check amount mismatch: {check_amount} vs 150.00"]
+    
+    def test_uses_parser_running_total(self):
+        """Test the parser's running total is used instead of the claims"""
+        from src.agents.payment_posting import ERAProcessingTool
+        era = self._era("150.00", "100.00", "50.00")
+        era['_paid_cents'] = 14000
+        
+        validation = ERAProcessingTool(None)._validate_era(era)
+        
+        assert validation['errors'] == ["Check amount mismatch: 150.00 vs 140.00"]
+    
+    def test_missing_fields(self):
+        """Test an empty ERA reports every missing field"""
+        from src.agents.payment_posting import ERAProcessingTool
+        
+        validation = ERAProcessingTool(None)._validate_era({'claims': []})
+        
+        assert validation['valid'] is False
+        assert validation['errors'] == ["Missing payer ID", "Missing check amount", "No claims found in ERA"]
+
+
+@pytest.mark.unit
+class TestERAProcessing:
+    """Test ERAProcessingTool._run"""
+    
+    def test_run_returns_era_without_parser_fields(self):
+        """Test the returned ERA carries no internal bookkeeping keys"""
+        from src.agents.payment_posting import ERAProcessingTool
+        
+        result = ERAProcessingTool(None)._run(json.dumps({"era_content": SAMPLE_835}))
+        
+        assert result['status'] == "success"
+        assert result['era'] == BASELINE_ERA
+        assert result['claims_count'] == 2
+        assert result['total_amount'] == 150.0
+        assert 'duplicate' not in result
+    
+    def test_duplicate_returns_original_era_id(self):
+        """Test replaying the same file returns the stored ERA"""
+        from src.agents.payment_posting import ERAProcessingTool
+        
+        first = ERAProcessingTool(None)._run(json.dumps({"era_content": SAMPLE_835}))
+        second = ERAProcessingTool(None)._run(json.dumps({"era_content": SAMPLE_835}))
+        
+        assert second['duplicate'] is True
+        assert second['era_id'] == first['era_id']
+        assert second['era'] == BASELINE_ERA
+    
+    def test_invalid_era_is_not_cached(self):
+        """Test a rejected ERA is processed again on retry"""
+        from src.agents.payment_posting import ERAProcessingTool
+        content = SAMPLE_835.replace("BPR*I*150.00", "BPR*I*175.00")
+        
+        first = ERAProcessingTool(None)._run(json.dumps({"era_content": content}))
+        second = ERAProcessingTool(None)._run(json.dumps({"era_content": content}))
+        
+        assert first['status'] == second['status'] == "error"
+        assert 'duplicate' not in second
+
+
+@pytest.mark.unit
+class TestVarianceAnalysis:
+    """Test ReconciliationTool._analyze_variances"""
+    
+    PAYMENTS = [
+        {'claim_id': 'CLM-001', 'expected_amount': Decimal('100.00'), 'paid_amount': Decimal('80.00')},
+        {'claim_id': 'CLM-002', 'expected_amount': Decimal('50.00'), 'paid_amount': Decimal('49.01')},
+        {'claim_id': 'CLM-003', 'expected_amount': Decimal('200.00'), 'paid_amount': Decimal('260.00'),
+         'variance_reason': 'Duplicate payment'},
+        {'claim_id': 'CLM-004', 'expected_amount': 0, 'paid_amount': 5},
+    ]
+    
+    def test_flags_variances_of_one_or_more(self, numpy_mode):
+        """Test variances under 1.00 are ignored and the rest categorized"""
+        from src.agents.payment_posting import ReconciliationTool
+        
+        variances = ReconciliationTool(None)._analyze_variances(self.PAYMENTS)
+        
+        assert [v.claim_id for v in variances] == ['CLM-001', 'CLM-003', 'CLM-004']
+        under, over, unexpected = variances
+        
+        assert under.variance_category == "underpayment"
+        assert under.variance_amount == Decimal('20.00')
+        assert under.variance_percentage == pytest.approx(20.0)
+        assert under.requires_followup is False
+        
+        assert over.variance_category == "overpayment"
+        assert over.variance_amount == Decimal('-60.00')
+        assert over.variance_percentage == pytest.approx(-30.0)
+        assert over.requires_followup is True
+        assert over.reason == "Duplicate payment"
+        
+        assert unexpected.variance_percentage == 0.0
+        assert unexpected.actual_amount == Decimal('5.00')
+    
+    def test_no_payments(self, numpy_mode):
+        """Test an empty period has no variances"""
+        from src.agents.payment_posting import ReconciliationTool
+        
+        assert ReconciliationTool(None)._analyze_variances([]) == []
+
+
+@pytest.mark.unit
+class TestERABatch:
+    """Test process_era_batch"""
+    
+    def _write(self, tmp_path, *contents):
+        paths = []
+        for i, content in enumerate(contents):
+            path = tmp_path / f"{i}.835"
+            path.write_text(content)
+            paths.append(str(path))
+        return paths
+    
+    def _posting_tool(self, failing_claims=()):
+        """PaymentPostingTool whose COPY fails for rows of failing_claims"""
+        from src.agents.payment_posting import PaymentPostingTool
+        tool = PaymentPostingTool(None)
+        tool.copied = []
+        
+        def copy_postings(rows):
+            if any(posting["claim_id"] in failing_claims for _, posting in rows):
+                raise RuntimeError("bad row")
+            tool.copied.extend(posting["posting_id"] for _, posting in rows)
+        
+        tool._copy_postings = copy_postings
+        return tool
+    
+    def test_batch_posts_and_reports_duplicates(self, tmp_path):
+        """Test accepted ERAs are posted once and repeats reported as duplicates"""
+        from src.agents.payment_posting import ERAProcessingTool, process_era_batch
+        paths = self._write(tmp_path, SAMPLE_835, SAMPLE_835, "garbage")
+        posting_tool = self._posting_tool()
+        
+        results = process_era_batch(paths, ERAProcessingTool(None), posting_tool, max_workers=1)
+        
+        assert [r['status'] for r in results] == ["success", "success", "error"]
+        assert results[1]['duplicate'] is True
+        assert results[1]['era_id'] == results[0]['era_id']
+        assert posting_tool.copied == results[0]['posting_ids']
+    
+    def test_failed_copy_fails_only_its_file(self, tmp_path):
+        """Test one ERA with a bad row does not fail the rest of the batch"""
+        from src.agents.payment_posting import ERAProcessingTool, process_era_batch
+        bad = SAMPLE_835.replace("CLM-002", "CLM-BAD")
+        paths = self._write(tmp_path, SAMPLE_835, bad)
+        posting_tool = self._posting_tool(failing_claims={"CLM-BAD"})
+        
+        good_result, bad_result = process_era_batch(
+            paths, ERAProcessingTool(None), posting_tool, max_workers=1
+        )
+        
+        assert good_result['status'] == "success"
+        assert posting_tool.copied == good_result['posting_ids']
+        assert bad_result['status'] == "error"
+        assert "bad row" in bad_result['error']
+        assert 'posting_ids' not in bad_result
+    
+    def test_failed_copy_is_retried(self, tmp_path):
+        """Test an ERA whose postings failed is not treated as a duplicate"""
+        from src.agents.payment_posting import ERAProcessingTool, process_era_batch
+        paths = self._write(tmp_path, SAMPLE_835)
+        
+        failed, = process_era_batch(
+            paths, ERAProcessingTool(None), self._posting_tool(failing_claims={"CLM-001"}), max_workers=1
+        )
+        posting_tool = self._posting_tool()
+        retried, = process_era_batch(paths, ERAProcessingTool(None), posting_tool, max_workers=1)
+        
+        assert failed['status'] == "error"
+        assert retried['status'] == "success"
+        assert 'duplicate' not in retried
+        assert posting_tool.copied == retried['posting_ids']